@@ -0,0 +1,105 @@
+import asyncio
+import contextlib
+import math
+import os
+
+from search.deadline import Deadline
+from utils.metrics import Counter, register
+
+# Requests executing at once on the guarded routes
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+
+# Requests allowed to wait for a slot; beyond this they get 429 at once
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+
+# Longest wait for a slot before 503 (seconds; the deadline may cut it shorter)
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+
+# Client budget in ms, relative to arrival; SEARCH_DEADLINE_MS is the default
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+SEARCH_DEADLINE_MS = float(os.getenv("SEARCH_DEADLINE_MS", "0"))
+
+ADMISSIONS = register(Counter(
+    "case_search_admission_total",
+    "Admission decisions on guarded routes.",
+    ["outcome"],
+))
+
+
+class Rejected(Exception):
+    def __init__(self, status_code, reason, retry_after=1):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def request_deadline(headers, start=None):
+    """
+    Deadline from the request header (or the configured default), or None.
+    Header values that are not a finite, positive number of milliseconds
+    (garbage, "0", "nan", "inf") fall back to the default.
+    """
+    value = headers.get(DEADLINE_HEADER)
+    try:
+        timeout_ms = float(value) if value is not None else SEARCH_DEADLINE_MS
+    except ValueError:
+        timeout_ms = SEARCH_DEADLINE_MS
+    if not math.isfinite(timeout_ms) or timeout_ms <= 0:
+        timeout_ms = SEARCH_DEADLINE_MS
+    return Deadline.from_ms(timeout_ms, start=start)
+
+
+class AdmissionController:
+    """
+    Bounded concurrency plus a bounded wait queue, enforced on the event
+    loop before a request reaches the worker threadpool. Excess load is
+    turned away immediately (429) or after a short wait (503) instead of
+    piling up until clients time out.
+    """
+
+    def __init__(self, max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+                 max_queue=ADMISSION_MAX_QUEUE, queue_timeout=ADMISSION_QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = None  # created lazily inside the running loop
+
+    @contextlib.asynccontextmanager
+    async def admit(self, deadline=None):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        timeout = self.queue_timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining_ms() / 1000)
+        if timeout <= 0:
+            ADMISSIONS.inc(outcome="rejected_deadline")
+            raise Rejected(503, "Request deadline already passed")
+
+        # Event-loop only, so plain counters need no lock
+        if not self._slots.locked():
+            # Free slot: acquire() returns without suspending
+            await self._slots.acquire()
+        elif self.waiting >= self.max_queue:
+            ADMISSIONS.inc(outcome="rejected_queue_full")
+            raise Rejected(429, "Server busy, admission queue full")
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout)
+            except asyncio.TimeoutError:
+                ADMISSIONS.inc(outcome="rejected_queue_timeout")
+                raise Rejected(503, "Timed out waiting for a free search slot")
+            finally:
+                self.waiting -= 1
+
+        ADMISSIONS.inc(outcome="admitted")
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
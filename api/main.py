@@ -1,8 +1,15 @@
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Union
 import sys
 import os
+import json
+import random
+import time
+import threading
 import contextlib
 
 # Add project root to path so we can import modules
@@ -10,33 +17,318 @@ sys.path.append(
     os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 )
 
-from search.search_pipeline import CaseSearchPipeline
+# NOTE: the search pipeline (torch / sentence-transformers) is imported lazily
+# inside load_pipeline() so that importing this module stays cheap and the
+# import cost shows up as a timed startup phase.
+from api.admission import AdmissionController, Rejected, request_deadline
+from api.query_log import QUERY_LOG_PATH, QueryLog, frequent_queries, worker_log_path
 from database.db_connection import DatabaseConnection
+from search.deadline import DeadlineExceeded
+from search.semantic_search_db import SEARCH_NEGATIVE_WEIGHT
+from search.similarity_graph import MAX_GRAPH_NODES
+from utils.model_loading import configure_offline_mode
+from utils.text_preprocessing import extract_snippets
+from utils.metrics import (
+    REQUEST_SECONDS,
+    REQUESTS_TOTAL,
+    render_metrics,
+    timed,
+)
 
 # -----------------------------------------------------------------------------
 # Global State (Model Loading)
 # -----------------------------------------------------------------------------
 # We store the pipeline globally so we load models only once on startup
-pipeline_instance: Optional[CaseSearchPipeline] = None
+pipeline_instance = None
+ingestor_instance = None
+index_manager = None
+query_log = None
+
+# Set by api/server.py in each forked worker (None = plain uvicorn)
+server_worker_id = None
+server_worker_count = 1
+
+# Seconds between background index sync + compaction runs (0 disables)
+INDEX_COMPACT_INTERVAL = float(os.getenv("INDEX_COMPACT_INTERVAL", "600"))
+
+# Seconds between index syncs in pre-forked workers, which never compact:
+# cases added through another worker show up after at most this long
+INDEX_SYNC_INTERVAL = float(os.getenv("INDEX_SYNC_INTERVAL", "5"))
+_maintenance_stop = threading.Event()
+
+# Default cascade reranking settings for /search (budget 0 = no budget)
+SEARCH_CASCADE = os.getenv("SEARCH_CASCADE", "0") == "1"
+SEARCH_BUDGET_MS = float(os.getenv("SEARCH_BUDGET_MS", "0"))
+
+# Example case ids accepted per /search request (positive + negative)
+MAX_EXAMPLE_CASES = 20
+
+# Upper bound on /search top_k (every result is cross-encoded)
+SEARCH_MAX_TOP_K = 50
+
+# Upper bound on the cases one /search/range request may stream
+RANGE_SEARCH_MAX_RESULTS = int(os.getenv("RANGE_SEARCH_MAX_RESULTS", "10000"))
+
+# Routes behind admission control (bounded in-flight work + wait queue)
+ADMISSION_ROUTES = {"/search", "/search/range", "/graph"}
+admission = AdmissionController()
+
+# /cases/random probes this many random ids per requested case (id gaps)
+RANDOM_OVERSAMPLE = 3
+
+# Readiness bookkeeping exposed through /ready
+startup_state = {
+    "status": "loading",   # loading | ready | failed
+    "error": None,
+    "phases": {},          # phase name -> seconds
+}
+
+
+@contextlib.contextmanager
+def startup_phase(name):
+    """Times and logs a single startup phase."""
+    print(f"[STARTUP] {name}...")
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    startup_state["phases"][name] = round(elapsed, 3)
+    print(f"[STARTUP] {name} done in {elapsed:.2f}s")
+
+
+def load_pipeline(start_maintenance=True):
+    """
+    Imports and builds the search pipeline, then warms it up.
+    Runs in a background thread so liveness (/) answers immediately
+    while readiness (/ready) only flips once everything is warm.
+
+    api/server.py calls it in the parent process before forking instead
+    (start_maintenance=False: threads do not survive fork).
+    """
+    global pipeline_instance, ingestor_instance, index_manager
+
+    try:
+        total_start = time.perf_counter()
+        configure_offline_mode()
+
+        with startup_phase("import"):
+            from search.search_pipeline import CaseSearchPipeline
+            from search.semantic_search_db import SemanticSearcherDB
+            from rerank.cross_encoder_reranker import CrossEncoderReranker
+            from search.case_ingestor import CaseIngestor
+            from search.index_manager import IndexManager
+
+        with startup_phase("load_embedding_model"):
+            retriever = SemanticSearcherDB()
+
+        with startup_phase("load_index"):
+            index = retriever.load_index()
+        print(f"[STARTUP] Indexed {len(index)} cases")
+
+        with startup_phase("load_cross_encoder"):
+            reranker = CrossEncoderReranker()
+
+        pipeline = CaseSearchPipeline(retriever=retriever, reranker=reranker)
+
+        with startup_phase("warm_up"):
+            pipeline.warm_up()
+
+        # Replay the most frequent recent queries so a fresh deploy does not
+        # start with cold embedding / result caches
+        with startup_phase("warm_caches"):
+            warm_queries = frequent_queries()
+            for query in warm_queries:
+                pipeline.search(query)
+        print(f"[STARTUP] Warmed caches with {len(warm_queries)} logged queries")
+
+        pipeline_instance = pipeline
+        ingestor_instance = CaseIngestor(retriever, tokenizer=reranker.tokenizer)
+        index_manager = IndexManager(retriever)
+        startup_state["status"] = "ready"
+        total = time.perf_counter() - total_start
+        print(f"[STARTUP] Search pipeline ready in {total:.2f}s")
+    except Exception as e:
+        startup_state["status"] = "failed"
+        startup_state["error"] = str(e)
+        print(f"[STARTUP] Failed to load search pipeline: {e}")
+        return
+
+    if start_maintenance:
+        start_index_maintenance()
+
+
+def start_index_maintenance():
+    interval = INDEX_COMPACT_INTERVAL
+    if server_worker_id is not None:
+        # Pre-forked worker: the main segment stays shared with the other
+        # workers (a compaction would copy it into this one), and rows added
+        # through other workers arrive by syncing from the database
+        pipeline_instance.retriever.index.auto_compact = False
+        interval = INDEX_SYNC_INTERVAL
+    if interval > 0:
+        threading.Thread(
+            target=index_maintenance_loop, args=(interval,),
+            name="index-maintenance", daemon=True,
+        ).start()
+
+
+def run_index_maintenance():
+    """
+    Picks up out-of-band rows, then merges the live segment into main
+    (except in pre-forked workers, see start_index_maintenance).
+    """
+    retriever = pipeline_instance.retriever
+    synced = retriever.index.sync_from_database(retriever.db)
+    merged = retriever.index.compact() if server_worker_id is None else 0
+    return {"synced": synced, "compacted": merged, "size": len(retriever.index)}
+
+
+def index_maintenance_loop(interval):
+    while not _maintenance_stop.wait(interval):
+        if pipeline_instance is None:
+            continue
+        try:
+            result = run_index_maintenance()
+            if result["synced"] or result["compacted"] or server_worker_id is None:
+                print(f"[INDEX] Maintenance: {result}")
+        except Exception as e:
+            print(f"[INDEX] Maintenance failed: {e}")
+
 
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
-    global pipeline_instance
-    print("Loading AI Search Pipeline...")
-    pipeline_instance = CaseSearchPipeline()
-    print("Search Pipeline Loaded.")
+    global pipeline_instance, query_log
+    if QUERY_LOG_PATH:
+        # One file per pre-forked worker: rotation is not multi-process safe
+        query_log = QueryLog(path=(
+            QUERY_LOG_PATH if server_worker_id is None
+            else worker_log_path(QUERY_LOG_PATH, server_worker_id)
+        ))
+
+    if startup_state["status"] == "ready":
+        # Preloaded by api/server.py before this worker was forked
+        start_index_maintenance()
+    else:
+        loader = threading.Thread(
+            target=load_pipeline, name="pipeline-loader", daemon=True
+        )
+        loader.start()
     yield
     # Clean up if needed
+    _maintenance_stop.set()
+    if pipeline_instance is not None and pipeline_instance.retriever.index is not None:
+        pipeline_instance.retriever.index.close()
     pipeline_instance = None
+    if query_log is not None:
+        query_log.close()
+        query_log = None
 
 app = FastAPI(title="Case Similarity API", lifespan=lifespan)
 
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """
+    Sheds load on the expensive routes before it reaches the threadpool, and
+    attaches the request deadline (X-Request-Deadline-Ms) for the pipeline.
+    """
+    if request.url.path not in ADMISSION_ROUTES:
+        return await call_next(request)
+
+    deadline = request_deadline(request.headers)
+    request.state.deadline = deadline
+    slot = contextlib.AsyncExitStack()
+    try:
+        await slot.enter_async_context(admission.admit(deadline))
+    except Rejected as e:
+        return JSONResponse(
+            status_code=e.status_code,
+            content={"detail": e.reason},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        await slot.aclose()
+        raise
+
+    # Streamed routes (/search/range) do their work while the body is sent,
+    # so the slot is only released once the body is finished
+    async def release_after(body):
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            await slot.aclose()
+
+    response.body_iterator = release_after(response.body_iterator)
+    return response
+
+# Registered last so it wraps admission control and also counts rejections
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Use the route template (/cases/{case_id}) to keep label cardinality low
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", request.url.path)
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method, route=route_path, status=status,
+        )
+        REQUESTS_TOTAL.inc(
+            method=request.method, route=route_path, status=status
+        )
+
 # -----------------------------------------------------------------------------
 # Pydantic Models
 # -----------------------------------------------------------------------------
 class SearchRequest(BaseModel):
-    query: str
-    top_k: int = 5 
+    query: str = ""
+    top_k: int = Field(5, ge=1, le=SEARCH_MAX_TOP_K)
+    # When true the response becomes {"results": [...], "debug_timings": {...}}
+    debug_timings: bool = False
+    # Number of best-matching passages to return per result (0 = none)
+    snippets: int = Field(0, ge=0, le=20)
+    # Cascade reranking: skip / shrink / cut reranking to fit the budget
+    cascade: Optional[bool] = None
+    budget_ms: Optional[float] = None
+    # "More like these, unlike those": known cases as examples, with or
+    # without query text (query vector built from stored embeddings)
+    positive_case_ids: Optional[List[str]] = None
+    negative_case_ids: Optional[List[str]] = None
+    negative_weight: Optional[float] = Field(None, ge=0, le=2)
+
+class RangeSearchRequest(BaseModel):
+    # Query text and / or example cases, as for /search
+    query: str = ""
+    positive_case_ids: Optional[List[str]] = None
+    negative_case_ids: Optional[List[str]] = None
+    negative_weight: Optional[float] = Field(None, ge=0, le=2)
+    # Every case with cosine >= min_score, up to max_results
+    min_score: float
+    max_results: Optional[int] = None
+
+class GraphRequest(BaseModel):
+    # Either a free-text query (nodes = its top_k nearest cases) or explicit case_ids
+    query: Optional[str] = None
+    case_ids: Optional[List[str]] = None
+    top_k: int = Field(50, ge=1, le=MAX_GRAPH_NODES)
+    # Edge pruning: cosine threshold and / or k nearest neighbours per node
+    threshold: Optional[float] = Field(None, ge=-1, le=1)
+    k_neighbors: Optional[int] = Field(5, ge=1)
+
+class CaseIn(BaseModel):
+    case_id: str
+    text: str
+    decision: Optional[str] = None
+    decision_reason: Optional[str] = None
+    case_source: str = "api"
 
 class CaseData(BaseModel):
     case_id: str
@@ -55,48 +347,333 @@ class CaseData(BaseModel):
 
 @app.get("/")
 def read_root():
+    """Liveness: the process is up (models may still be loading)."""
     return {"status": "ok", "message": "Case Similarity API is running"}
 
-@app.post("/search", response_model=List[Dict[str, Any]])
-def search_cases(request: SearchRequest):
+@app.get("/ready")
+def read_ready():
+    """
+    Readiness: models are loaded and warmed up, safe to route traffic here.
+    """
+    if startup_state["status"] != "ready":
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "status": startup_state["status"],
+                "error": startup_state["error"],
+                "phases": startup_state["phases"],
+            },
+        )
+    return {"status": "ready", "phases": startup_state["phases"]}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """
+    Prometheus-style stage / request histograms and cache hit ratios.
+    """
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+def _resolve_examples(request):
+    """
+    (positive_ids, negative_ids, negative_weight) of a search request, or
+    400 / 404 when there is nothing to search for or ids are unknown.
+    """
+    positive_ids = list(dict.fromkeys(request.positive_case_ids or []))
+    negative_ids = list(dict.fromkeys(request.negative_case_ids or []))
+    if not request.query.strip() and not positive_ids:
+        raise HTTPException(
+            status_code=400, detail="Provide query text or positive_case_ids"
+        )
+    if len(positive_ids) + len(negative_ids) > MAX_EXAMPLE_CASES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_EXAMPLE_CASES} example cases per query"
+        )
+
+    index = pipeline_instance.retriever.index
+    unknown = [cid for cid in positive_ids + negative_ids if cid not in index]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown case_ids: {unknown}")
+
+    negative_weight = request.negative_weight
+    if negative_weight is None:
+        negative_weight = SEARCH_NEGATIVE_WEIGHT
+    return positive_ids, negative_ids, negative_weight
+
+@app.post("/search", response_model=Union[List[Dict[str, Any]], Dict[str, Any]])
+def search_cases(request: SearchRequest, http_request: Request):
     """
     Search for similar cases using the semantic search pipeline.
+
+    Returns the list of results. With `debug_timings` set, the response is
+    an object instead: {"results": [...], "debug_timings": {...},
+    "rerank": {...}} with per-stage timings (ms) and the reranking path.
+
+    An `X-Request-Deadline-Ms` header bounds the request: work stops at
+    the first stage boundary past it and 504 is returned.
+
+    `positive_case_ids` / `negative_case_ids` search by example, alone or
+    together with the query text; without text no reranking is done.
     """
-    if not request.query.strip():
-        raise HTTPException(status_code=400, detail="Query text cannot be empty")
-    
     if pipeline_instance is None:
         raise HTTPException(status_code=503, detail="Search service not initialized")
 
+    positive_ids, negative_ids, negative_weight = _resolve_examples(request)
+
     try:
-        # Note: The search method currently returns top 5 hardcoded in the pipeline file we saw earlier,
-        # or we might need to adjust the pipeline to accept top_k.
-        # Looking at previous view_file, pipeline.search(query) calls retrieve(top_k=10) and rerank(top_k=10) then returns [:5]
-        # We will just call search for now.
-        results = pipeline_instance.search(request.query)
-        return results
+        timings = {}
+        rerank_report = {}
+        cascade = SEARCH_CASCADE if request.cascade is None else request.cascade
+        budget_ms = request.budget_ms
+        if budget_ms is None and SEARCH_BUDGET_MS > 0:
+            budget_ms = SEARCH_BUDGET_MS
+        results = pipeline_instance.search(
+            request.query,
+            timings=timings,
+            cascade=cascade,
+            budget_ms=budget_ms,
+            report=rerank_report,
+            deadline=getattr(http_request.state, "deadline", None),
+            positive_ids=positive_ids,
+            negative_ids=negative_ids,
+            negative_weight=negative_weight,
+            top_k=request.top_k,
+        )
+
+        if request.snippets > 0:
+            with timed("snippets", timings):
+                for r in results:
+                    r["snippets"] = extract_snippets(
+                        r.get("full_text", ""), request.query, n=request.snippets
+                    )
+
+        with timed("serialization", timings):
+            payload = jsonable_encoder(results)
+
+        if query_log is not None:
+            query_log.record(
+                request.query,
+                params={
+                    "top_k": request.top_k,
+                    "snippets": request.snippets,
+                    "cascade": cascade,
+                    "budget_ms": budget_ms,
+                    "positive_case_ids": positive_ids,
+                    "negative_case_ids": negative_ids,
+                },
+                timings=timings,
+                result_ids=[r.get("case_id") for r in results],
+                rerank_path=rerank_report.get("path"),
+            )
+
+        if request.debug_timings:
+            payload = {
+                "results": payload,
+                "debug_timings": timings,
+                "rerank": rerank_report,
+            }
+
+        return JSONResponse(
+            content=payload,
+            headers={"X-Rerank-Path": rerank_report.get("path", "none")},
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         print(f"Error during search: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search/range")
+def range_search(request: RangeSearchRequest, http_request: Request):
+    """
+    Every case whose embedding cosine to the query is at least `min_score`,
+    streamed as NDJSON while the index is scanned block by block: one
+    {"case_id", "score"} line per case (best first within a block), then a
+    final {"done", "count", "truncated"} line. No reranking.
+
+    `truncated` means the scan stopped early: either max_results was hit,
+    in which case the streamed cases are the first matches in index order
+    (not necessarily the best-scoring ones), or the request deadline passed
+    (then "done" is false).
+    """
+    if pipeline_instance is None:
+        raise HTTPException(status_code=503, detail="Search service not initialized")
+    if not -1.0 <= request.min_score <= 1.0:
+        raise HTTPException(status_code=400, detail="min_score must be within [-1, 1]")
+
+    max_results = request.max_results or RANGE_SEARCH_MAX_RESULTS
+    if not 0 < max_results <= RANGE_SEARCH_MAX_RESULTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"max_results must be within [1, {RANGE_SEARCH_MAX_RESULTS}]",
+        )
+
+    positive_ids, negative_ids, negative_weight = _resolve_examples(request)
+    retriever = pipeline_instance.retriever
+    deadline = getattr(http_request.state, "deadline", None)
+
+    try:
+        if deadline is not None:
+            deadline.check("query_encoding")
+        query_embedding = None
+        if request.query.strip():
+            query_embedding = retriever.encode_query(request.query)
+        if positive_ids or negative_ids:
+            query_embedding = retriever.example_query_vector(
+                positive_ids, negative_ids, negative_weight, query_embedding
+            )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        print(f"Error during range search: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def stream():
+        count = 0
+        truncated = False
+        expired = False
+        with retriever.index.reading() as index:
+            # One hit past the cap tells whether the result was cut
+            for block in retriever.range_search(
+                query_embedding,
+                request.min_score,
+                max_results + 1,
+                exclude=positive_ids + negative_ids,
+                index=index,
+            ):
+                if count + len(block) > max_results:
+                    block = block[:max_results - count]
+                    truncated = True
+                count += len(block)
+                yield "".join(
+                    json.dumps({"case_id": case_id, "score": round(score, 4)}) + "\n"
+                    for case_id, score in block
+                )
+                # Checked before the next block is scanned
+                try:
+                    if deadline is not None:
+                        deadline.check("range_scan")
+                except DeadlineExceeded:
+                    expired = True
+                    break
+
+        trailer = {"done": not expired, "count": count, "truncated": truncated or expired}
+        if expired:
+            trailer["detail"] = "Request deadline exceeded"
+        yield json.dumps(trailer) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/graph", response_model=Dict[str, Any])
+def similarity_graph(request: GraphRequest, http_request: Request):
+    """
+    Builds a case similarity graph from the stored embeddings: true pairwise
+    cosine scores, pruned by threshold and / or k nearest neighbours.
+    Returns 504 once the request deadline has passed before a stage.
+    """
+    from search.similarity_graph import build_similarity_graph, fetch_case_decisions
+
+    if pipeline_instance is None:
+        raise HTTPException(status_code=503, detail="Search service not initialized")
+    deadline = getattr(http_request.state, "deadline", None)
+
+    retriever = pipeline_instance.retriever
+    # One index for the whole request, even if a rebuild swaps it meanwhile
+    index = retriever.index
+    query_scores = {}
+
+    if request.case_ids:
+        case_ids = list(dict.fromkeys(request.case_ids))
+    elif request.query and request.query.strip():
+        try:
+            if deadline is not None:
+                deadline.check("query_encoding")
+        except DeadlineExceeded as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        query_embedding = retriever.encode_query(request.query)
+        hits = index.search(query_embedding, top_k=request.top_k)
+        case_ids = [case_id for case_id, _ in hits]
+        query_scores = dict(hits)
+    else:
+        raise HTTPException(status_code=400, detail="Provide a query or case_ids")
+
+    if len(case_ids) > MAX_GRAPH_NODES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_GRAPH_NODES} nodes per graph"
+        )
+
+    try:
+        if deadline is not None:
+            deadline.check("similarity_graph")
+        found, vectors = index.get_vectors(case_ids)
+        edges = build_similarity_graph(
+            found, vectors,
+            threshold=request.threshold,
+            k_neighbors=request.k_neighbors,
+        )
+        decisions = fetch_case_decisions(retriever.db, found)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        print(f"Error building similarity graph: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    found_set = set(found)
+    return {
+        "nodes": [
+            {
+                "case_id": cid,
+                "decision": decisions.get(cid),
+                "query_score": query_scores.get(cid),
+            }
+            for cid in found
+        ],
+        "edges": [
+            {"source": found[i], "target": found[j], "weight": round(w, 4)}
+            for i, j, w in edges
+        ],
+        "missing": [cid for cid in case_ids if cid not in found_set],
+    }
+
 @app.get("/cases/random", response_model=List[Dict[str, Any]])
 def get_random_cases(limit: int = 10):
     """
     Fetch random cases for exploration.
+
+    Samples random surrogate ids (index lookups) instead of sorting the
+    whole table with ORDER BY RANDOM().
     """
     try:
         db = DatabaseConnection()
         conn = db.get_connection()
         cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT case_id, text, summary, decision
-            FROM cases
-            ORDER BY RANDOM()
-            LIMIT %s
-        """, (limit,))
-        
-        rows = cursor.fetchall()
+
+        cursor.execute("SELECT min(id) AS lo, max(id) AS hi FROM cases;")
+        bounds = cursor.fetchone()
+
+        rows = []
+        if bounds["hi"] is not None:
+            id_range = range(bounds["lo"], bounds["hi"] + 1)
+            probes = random.sample(id_range, min(limit * RANDOM_OVERSAMPLE, len(id_range)))
+            cursor.execute("""
+                SELECT case_id, text, summary, text_length, decision
+                FROM cases
+                WHERE id = ANY(%s)
+                LIMIT %s
+            """, (probes, limit))
+            rows = cursor.fetchall()
+
+        if len(rows) < limit:
+            # Tiny or very sparse table
+            cursor.execute("""
+                SELECT case_id, text, summary, text_length, decision
+                FROM cases
+                ORDER BY RANDOM()
+                LIMIT %s
+            """, (limit,))
+            rows = cursor.fetchall()
         
         # Convert RealDictRow or tuple to clean dict list
         # Assuming fetchall() returns list of dict-like objects if using RealDictCursor,
@@ -113,9 +690,14 @@ def get_random_cases(limit: int = 10):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/cases/{case_id}", response_model=Dict[str, Any])
-def get_case_details(case_id: str):
+def get_case_details(
+    case_id: str,
+    query: Optional[str] = None,
+    snippets: int = Query(3, ge=0, le=20),
+):
     """
     Get full details for a specific case.
+    If `query` is given, the best-matching passages are returned as `snippets`.
     """
     try:
         db = DatabaseConnection()
@@ -123,7 +705,7 @@ def get_case_details(case_id: str):
         cursor = conn.cursor()
         
         cursor.execute("""
-            SELECT case_id, text, summary, decision, decision_reason
+            SELECT case_id, text, summary, text_length, decision, decision_reason
             FROM cases
             WHERE case_id = %s
         """, (case_id,))
@@ -133,10 +715,116 @@ def get_case_details(case_id: str):
         
         if not row:
             raise HTTPException(status_code=404, detail="Case not found")
-            
-        return dict(row)
+
+        case = dict(row)
+        if query:
+            case["snippets"] = extract_snippets(case.get("text", ""), query, n=snippets)
+        return case
     except HTTPException:
         raise
     except Exception as e:
         print(f"Error fetching case {case_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/cases", response_model=Dict[str, Any])
+def add_case(case: CaseIn):
+    """
+    Adds one case: embeds it, stores it and makes it searchable immediately.
+    """
+    if ingestor_instance is None:
+        raise HTTPException(status_code=503, detail="Search service not initialized")
+
+    result = ingestor_instance.ingest([case.dict()])
+    if result["errors"]:
+        raise HTTPException(status_code=400, detail=result["errors"][0]["error"])
+    return result
+
+@app.post("/cases/bulk", response_model=Dict[str, Any])
+async def add_cases_bulk(request: Request):
+    """
+    Bulk upload as NDJSON (one case object per line). The body is streamed
+    and ingested in batches, so uploads of any size use bounded memory.
+    """
+    if ingestor_instance is None:
+        raise HTTPException(status_code=503, detail="Search service not initialized")
+
+    summary = {"inserted": 0, "skipped": 0, "duplicates": 0, "errors": []}
+    batch = []
+    line_no = 0
+
+    async def flush(records):
+        result = await run_in_threadpool(ingestor_instance.ingest, records)
+        summary["inserted"] += result["inserted"]
+        summary["skipped"] += result["skipped"]
+        summary["duplicates"] += result["duplicates"]
+        summary["errors"].extend(result["errors"])
+
+    def parse(line):
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            batch.append(record)
+        else:
+            summary["errors"].append({"line": line_no, "error": "invalid JSON object"})
+
+    buffer = b""
+    async for chunk in request.stream():
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            line_no += 1
+            parse(line)
+            if len(batch) >= ingestor_instance.batch_size:
+                await flush(batch)
+                batch = []
+
+    line_no += 1
+    parse(buffer)
+    if batch:
+        await flush(batch)
+
+    return summary
+
+@app.get("/admin/index", response_model=Dict[str, Any])
+def index_status():
+    """
+    The active index: generation (swaps since startup), version, size,
+    rebuild state and the outcome of the last rebuild. Under the pre-fork
+    server this is the index of the worker that answered (`worker`).
+    """
+    if index_manager is None:
+        raise HTTPException(status_code=503, detail="Search service not initialized")
+    return {**index_manager.status(), "worker": server_worker_id}
+
+@app.post("/admin/index/rebuild", status_code=202, response_model=Dict[str, Any])
+def rebuild_index():
+    """
+    Rebuilds the index from Postgres in the background and hot-swaps it in;
+    the current index keeps serving meanwhile. Poll GET /admin/index.
+
+    Not available with several pre-forked workers: it would rebuild only
+    the worker that took the request, into private memory.
+    """
+    if index_manager is None:
+        raise HTTPException(status_code=503, detail="Search service not initialized")
+    if server_worker_count > 1:
+        raise HTTPException(
+            status_code=501,
+            detail="Index rebuilds are per process; restart the pre-fork server instead",
+        )
+    if not index_manager.start_rebuild():
+        raise HTTPException(status_code=409, detail="An index rebuild is already running")
+    return index_manager.status()
+
+@app.post("/admin/index/compact", response_model=Dict[str, Any])
+def compact_index():
+    """
+    Syncs rows inserted outside the API and compacts the live index segment
+    (sync only in pre-forked workers).
+    """
+    if pipeline_instance is None:
+        raise HTTPException(status_code=503, detail="Search service not initialized")
+    return run_index_maintenance()
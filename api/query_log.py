@@ -0,0 +1,146 @@
+import glob
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from collections import Counter, deque
+
+from utils.text_preprocessing import normalize_query
+
+# Append-only JSONL log of /search requests ("" disables logging)
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "logs/query_log.jsonl")
+
+# Fraction of requests written to the log
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("QUERY_LOG_SAMPLE_RATE", "1.0"))
+
+# Rotation: size per file and number of rotated files kept
+QUERY_LOG_MAX_BYTES = int(os.getenv("QUERY_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+QUERY_LOG_BACKUPS = int(os.getenv("QUERY_LOG_BACKUPS", "5"))
+
+# Store the query text itself; without it entries can be counted but not
+# replayed or used for cache warming
+QUERY_LOG_TEXT = os.getenv("QUERY_LOG_TEXT", "1") == "1"
+
+# Startup warm-up: this many of the most frequent queries among the
+# newest QUERY_LOG_WARM_WINDOW entries are run once before /ready (0 disables)
+QUERY_LOG_WARM_QUERIES = int(os.getenv("QUERY_LOG_WARM_QUERIES", "50"))
+QUERY_LOG_WARM_WINDOW = int(os.getenv("QUERY_LOG_WARM_WINDOW", "20000"))
+
+
+def query_hash(query):
+    return hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+
+
+class QueryLog:
+    """
+    Sampled, rotating query log written off the request path.
+
+    Requests only enqueue a pre-formatted line (QueueHandler); a listener
+    thread owns the RotatingFileHandler and does all file I/O.
+    """
+
+    def __init__(self, path=QUERY_LOG_PATH, sample_rate=QUERY_LOG_SAMPLE_RATE,
+                 max_bytes=QUERY_LOG_MAX_BYTES, backups=QUERY_LOG_BACKUPS,
+                 include_text=QUERY_LOG_TEXT):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.include_text = include_text
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, file_handler)
+
+        self._logger = logging.getLogger(f"case_search.query_log.{id(self)}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._logger.addHandler(logging.handlers.QueueHandler(self._queue))
+
+        self._listener.start()
+
+    def record(self, query, params, timings, result_ids, rerank_path=None):
+        """Logs one search (subject to sampling). Never raises."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        try:
+            entry = {
+                "ts": round(time.time(), 3),
+                "query_hash": query_hash(query),
+                "params": params,
+                "timings": timings,
+                "result_ids": result_ids,
+                "rerank_path": rerank_path,
+            }
+            if self.include_text:
+                entry["query"] = normalize_query(query)
+            self._logger.info(json.dumps(entry, separators=(",", ":")))
+        except Exception as e:
+            print(f"[QUERY_LOG] Failed to record query: {e}")
+
+    def close(self):
+        """Flushes pending entries and stops the writer thread."""
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+
+
+def worker_log_path(path, worker_id):
+    """logs/query_log.jsonl -> logs/query_log.w3.jsonl"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.w{worker_id}{ext}"
+
+
+def _log_files_newest_first(path):
+    """The log and any per-worker logs: current files first, then rotated ones."""
+    root, ext = os.path.splitext(path)
+    bases = [path] + sorted(glob.glob(f"{glob.escape(root)}.w*{ext}"))
+    files = [
+        f"{base}.{i}" if i else base
+        for i in range(QUERY_LOG_BACKUPS + 1)
+        for base in bases
+    ]
+    return [f for f in files if os.path.exists(f)]
+
+
+def frequent_queries(path=QUERY_LOG_PATH, limit=QUERY_LOG_WARM_QUERIES,
+                     window=QUERY_LOG_WARM_WINDOW):
+    """
+    The `limit` most frequent query texts among the newest `window` logged
+    entries (current file first, then rotated files), most frequent first.
+    """
+    if not path or limit <= 0:
+        return []
+
+    counts = Counter()
+    texts = {}
+    seen = 0
+    for filename in _log_files_newest_first(path):
+        # Only the newest lines still needed are kept while the file is read
+        with open(filename, encoding="utf-8") as f:
+            lines = deque(f, maxlen=window - seen)
+        for line in reversed(lines):
+            if seen >= window:
+                break
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            seen += 1
+            if entry.get("query"):
+                counts[entry["query_hash"]] += 1
+                texts.setdefault(entry["query_hash"], entry["query"])
+        if seen >= window:
+            break
+
+    return [texts[h] for h, _ in counts.most_common(limit)]
@@ -0,0 +1,176 @@
+"""
+Pre-fork server: loads the models and the index once, then forks workers
+that share them copy-on-write.
+
+    python -m api.server --workers 8 --port 8000
+
+Compared to `uvicorn --workers N`, which imports and loads everything in
+every worker, RAM for models + index is paid once however many workers run.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Add project root to path so we can import modules
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+# Must be set before search / tokenizer modules are imported:
+# - shard worker processes and fork do not mix; each worker scans in-process
+# - HF tokenizers disable themselves noisily in children after a fork
+_REQUESTED_SHARDS = os.environ.get("SEARCH_SHARDS", "1")
+os.environ["SEARCH_SHARDS"] = "1"
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+
+# torch intra-op threads per worker (0 = cores / workers)
+SERVER_THREADS_PER_WORKER = int(os.getenv("SERVER_THREADS_PER_WORKER", "0"))
+
+# A worker that dies is re-forked, unless it died within this many seconds
+# of being spawned (it would most likely crash again)
+RESPAWN_MIN_INTERVAL = 5.0
+
+
+def _preload():
+    """Loads everything in the parent, single-threaded, then freezes the heap."""
+    import torch
+
+    # No intra-op thread pool may exist at fork time (OpenMP pools do not
+    # survive fork); one thread runs inline without creating one
+    torch.set_num_threads(1)
+
+    from api import main
+
+    main.load_pipeline(start_maintenance=False)
+    if main.startup_state["status"] != "ready":
+        raise SystemExit(f"Preload failed: {main.startup_state['error']}")
+
+    # Move everything allocated so far to the permanent generation: the
+    # collector then never walks (and so never writes to) these objects,
+    # which keeps their pages shared with the workers
+    gc.collect()
+    gc.freeze()
+    return main
+
+
+def _run_worker(main, worker_id, sock, threads, log_level):
+    """Body of a forked worker; never returns."""
+    import torch
+    import uvicorn
+
+    code = 0
+    try:
+        torch.set_num_threads(threads)
+        main.server_worker_id = worker_id
+
+        # First-run kernel / allocator costs are per process and per thread count
+        main.pipeline_instance.warm_up()
+
+        config = uvicorn.Config(main.app, log_level=log_level, lifespan="on")
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException as e:
+        print(f"[SERVER] Worker {worker_id} crashed: {e}")
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def serve(host, port, workers, threads, log_level="info"):
+    if _REQUESTED_SHARDS.strip() not in ("", "0", "1"):
+        print(
+            f"[SERVER] WARNING: SEARCH_SHARDS={_REQUESTED_SHARDS} is ignored by the "
+            "pre-fork server; every worker scans in-process. Run plain uvicorn "
+            "to use sharded scanning."
+        )
+    main = _preload()
+    main.server_worker_count = workers
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children = {}  # pid -> worker id
+    spawned_at = {}  # worker id -> monotonic time of its last fork
+    stopping = False
+
+    def spawn(worker_id):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            _run_worker(main, worker_id, sock, threads, log_level)
+        children[pid] = worker_id
+        spawned_at[worker_id] = time.monotonic()
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    print(f"[SERVER] Forking {workers} workers x {threads} torch threads on {host}:{port}")
+    for worker_id in range(workers):
+        spawn(worker_id)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        worker_id = children.pop(pid, None)
+        if stopping or worker_id is None:
+            continue
+
+        print(f"[SERVER] Worker {worker_id} (pid {pid}) exited with status {status}")
+        if time.monotonic() - spawned_at[worker_id] < RESPAWN_MIN_INTERVAL:
+            print(f"[SERVER] Worker {worker_id} is crash-looping, shutting down")
+            shutdown(signal.SIGTERM, None)
+            continue
+        spawn(worker_id)
+
+    sock.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Pre-fork multi-worker API server.",
+        epilog=(
+            "Sharded scanning is not available in this mode: SEARCH_SHARDS is "
+            "forced to 1 (a warning is printed if it was set higher), since "
+            "shard worker processes do not survive fork. Use plain uvicorn "
+            "for SEARCH_SHARDS > 1."
+        ),
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument(
+        "--threads", type=int, default=SERVER_THREADS_PER_WORKER,
+        help="torch threads per worker (0 = cores / workers)",
+    )
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    workers = max(1, args.workers)
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    serve(args.host, args.port, workers, threads, log_level=args.log_level)
@@ -0,0 +1,251 @@
+import os
+import sys
+
+import numpy as np
+
+# --------------------------------------------------
+# Add project root to path
+# --------------------------------------------------
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from database.db_connection import DatabaseConnection
+from embeddings.shard_store import EMBEDDINGS_DIR, EmbeddingShards
+from search.case_index import parse_embedding
+
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+EMBEDDING_DIM = 384
+
+# Small legal vocabulary used to fabricate CJPE-like judgment texts
+LEGAL_VOCAB = (
+    "appeal appellant respondent petition petitioner high court supreme "
+    "judgment order decree tribunal section act article constitution "
+    "criminal civil conviction acquittal sentence bail custody evidence "
+    "witness testimony prosecution defence accused murder theft fraud "
+    "contract breach damages compensation property land tenancy lease "
+    "eviction partition inheritance succession will probate tax income "
+    "assessment revenue customs excise service employment dismissal "
+    "pension gratuity promotion seniority arbitration award settlement "
+    "injunction writ mandamus certiorari habeas corpus limitation delay "
+    "condonation jurisdiction cognizance charge sheet investigation police "
+    "magistrate sessions revision review special leave notification "
+    "acquisition compensation municipal election candidate nomination "
+    "insurance claim accident motor vehicle negligence liability company "
+    "shareholder director insolvency bank loan mortgage cheque dishonour"
+).split()
+
+
+# --------------------------------------------------
+# Synthetic corpus
+# --------------------------------------------------
+def build_synthetic_corpus(n_cases, dim=EMBEDDING_DIM, n_topics=256, seed=0):
+    """
+    Builds a clustered corpus of unit-norm float32 vectors that mimics the
+    topical structure of CJPE embeddings (cases cluster around legal topics).
+
+    Returns:
+        dict with case_ids, embeddings, topics, decisions, has_reason
+    """
+    rng = np.random.default_rng(seed)
+
+    centers = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    topics = rng.integers(0, n_topics, size=n_cases)
+    embeddings = np.empty((n_cases, dim), dtype=np.float32)
+
+    # Fill in blocks to keep peak memory at ~2x the final matrix
+    block = 100_000
+    for start in range(0, n_cases, block):
+        end = min(start + block, n_cases)
+        noise = rng.standard_normal((end - start, dim)).astype(np.float32)
+        noise *= 0.06
+        vecs = centers[topics[start:end]] + noise
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        embeddings[start:end] = vecs
+
+    return {
+        "case_ids": np.array([f"bench_{i}" for i in range(n_cases)]),
+        "embeddings": embeddings,
+        "topics": topics.astype(np.int32),
+        "decisions": rng.integers(0, 2, size=n_cases).astype(np.int8),
+        "has_reason": rng.random(n_cases) < 0.3,
+    }
+
+
+def load_db_corpus(n_cases, seed=0):
+    """
+    Builds a CJPE-like corpus from the real embeddings stored in Postgres,
+    tiling them with small perturbations when `n_cases` exceeds the table size.
+    """
+    db = DatabaseConnection()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT embedding, decision, decision_reason FROM cases;")
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    if not rows:
+        raise RuntimeError("cases table is empty, use --source synthetic")
+
+    # Stored as FLOAT8[] or JSON text, as for the search index
+    rows = [r for r in rows if r["embedding"] is not None]
+    base = np.vstack([parse_embedding(r["embedding"]) for r in rows])
+    decisions = np.array([r["decision"] == "accepted" for r in rows], dtype=np.int8)
+    has_reason = np.array([bool(r["decision_reason"]) for r in rows])
+
+    return _tile_corpus(base, decisions, has_reason, n_cases, seed)
+
+
+def load_shard_corpus(n_cases, path=None, seed=0):
+    """
+    Builds a CJPE-like corpus from the embedding shards written by
+    embeddings/generate_embeddings.py, tiled like load_db_corpus. The shards
+    carry no decision reasons, so has_reason is all False.
+    """
+    path = os.path.join(PROJECT_ROOT, path or EMBEDDINGS_DIR)
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        raise RuntimeError(f"no embedding shards in {path}, run embeddings/generate_embeddings.py")
+
+    shards = EmbeddingShards(path)
+    if not len(shards):
+        raise RuntimeError(f"{path} holds no embeddings, use --source synthetic")
+
+    base = shards.load_matrix()
+    decisions = np.concatenate([
+        np.asarray(columns["label"], dtype=np.int8)
+        for _, columns in shards.iter_shards()
+    ])
+    has_reason = np.zeros(len(base), dtype=bool)
+
+    return _tile_corpus(base, decisions, has_reason, n_cases, seed)
+
+
+def _tile_corpus(base, decisions, has_reason, n_cases, seed):
+    """Repeats `base` up to `n_cases` rows, perturbing the repeated copies."""
+    base = np.asarray(base, dtype=np.float32)
+    base /= np.linalg.norm(base, axis=1, keepdims=True)
+
+    rng = np.random.default_rng(seed)
+    idx = np.arange(n_cases) % len(base)
+
+    embeddings = base[idx].copy()
+    dup = np.arange(n_cases) >= len(base)
+    if dup.any():
+        noise = rng.standard_normal((int(dup.sum()), base.shape[1])).astype(np.float32)
+        embeddings[dup] += noise * 0.02
+        embeddings[dup] /= np.linalg.norm(embeddings[dup], axis=1, keepdims=True)
+
+    return {
+        "case_ids": np.array([f"bench_{i}" for i in range(n_cases)]),
+        "embeddings": embeddings,
+        "topics": idx.astype(np.int32),
+        "decisions": decisions[idx],
+        "has_reason": has_reason[idx],
+    }
+
+
+def load_corpus(n_cases, source="synthetic", seed=0, use_cache=True):
+    """
+    Returns a benchmark corpus, reusing the on-disk .npz cache when present.
+    """
+    path = os.path.join(CACHE_DIR, f"{source}_{n_cases}_{seed}.npz")
+
+    if use_cache and os.path.exists(path):
+        with np.load(path) as data:
+            return {k: data[k] for k in data.files}
+
+    if source == "db":
+        corpus = load_db_corpus(n_cases, seed=seed)
+    elif source == "shards":
+        corpus = load_shard_corpus(n_cases, seed=seed)
+    else:
+        corpus = build_synthetic_corpus(n_cases, seed=seed)
+
+    if use_cache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.savez(path, **corpus)
+
+    return corpus
+
+
+# --------------------------------------------------
+# Queries and texts
+# --------------------------------------------------
+def make_query_vectors(corpus, n_queries, noise=0.08, seed=1):
+    """Perturbed corpus vectors: each query has a true nearest neighbourhood."""
+    rng = np.random.default_rng(seed)
+    emb = corpus["embeddings"]
+    picks = rng.integers(0, len(emb), size=n_queries)
+    queries = emb[picks] + rng.standard_normal((n_queries, emb.shape[1])).astype(np.float32) * noise
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries.astype(np.float32)
+
+
+def synthetic_text(topic, n_words=400, seed=0):
+    """Fabricates a judgment-like text whose vocabulary depends on the topic."""
+    rng = np.random.default_rng(int(topic) * 7919 + seed)
+    topic_words = rng.choice(LEGAL_VOCAB, size=30, replace=False)
+    words = rng.choice(topic_words, size=n_words)
+    return "The " + " ".join(words) + "."
+
+
+def make_query_texts(corpus, n_queries, n_words=60, seed=1):
+    rng = np.random.default_rng(seed)
+    topics = corpus["topics"][rng.integers(0, len(corpus["topics"]), size=n_queries)]
+    return [synthetic_text(t, n_words=n_words, seed=i) for i, t in enumerate(topics)]
+
+
+# --------------------------------------------------
+# Optional: load a corpus into Postgres
+# --------------------------------------------------
+def load_into_db(corpus, batch_size=1000):
+    """
+    Inserts the corpus into the configured `cases` table (case_source =
+    'benchmark') with the same precomputed columns as the ingestion scripts
+    (summary, text_length). Point POSTGRES_DB at a scratch database before
+    using this.
+    """
+    from psycopg2.extras import execute_values
+    from tqdm import tqdm
+
+    from utils.text_preprocessing import extractive_summary
+
+    db = DatabaseConnection()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    n = len(corpus["case_ids"])
+    for start in tqdm(range(0, n, batch_size), desc="Loading benchmark corpus"):
+        end = min(start + batch_size, n)
+        rows = []
+        for i in range(start, end):
+            text = synthetic_text(corpus["topics"][i])
+            rows.append((
+                str(corpus["case_ids"][i]),
+                corpus["embeddings"][i].tolist(),
+                text,
+                "accepted" if corpus["decisions"][i] else "rejected",
+                "Synthetic reasoning." if corpus["has_reason"][i] else None,
+                "benchmark",
+                extractive_summary(text),
+                len(text),
+            ))
+        execute_values(
+            cursor,
+            """
+            INSERT INTO cases (
+                case_id, embedding, text, decision, decision_reason, case_source,
+                summary, text_length
+            )
+            VALUES %s
+            ON CONFLICT (case_id) DO NOTHING;
+            """,
+            rows,
+        )
+        conn.commit()
+
+    cursor.close()
+    conn.close()
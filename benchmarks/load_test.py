@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+# --------------------------------------------------
+# Add project root to path
+# --------------------------------------------------
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from benchmarks.corpus import build_synthetic_corpus, make_query_texts
+from benchmarks.retrieval_bench import RESULTS_DIR, _git_commit
+
+# Histogram bucket upper bounds (ms) used in the report
+HISTOGRAM_BOUNDS_MS = (
+    10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000,
+)
+
+
+# --------------------------------------------------
+# Query sources
+# --------------------------------------------------
+def load_request_log(path):
+    """
+    Reads a JSONL request log. Each line needs a `query` field, or a `body`
+    (and optional `title`) as in requests.jsonl.
+    """
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            text = entry.get("query") or " ".join(
+                part for part in (entry.get("title"), entry.get("body")) if part
+            )
+            if text:
+                queries.append(text)
+    return queries
+
+
+def synthetic_queries(n, seed=0):
+    """Mix of short, medium and long case descriptions."""
+    corpus = build_synthetic_corpus(max(n, 1000), seed=seed)
+    rng = random.Random(seed)
+    queries = []
+    for i, length in enumerate(rng.choices([15, 60, 250], weights=[5, 3, 2], k=n)):
+        queries.extend(make_query_texts(corpus, 1, n_words=length, seed=seed + i))
+    return queries
+
+
+# --------------------------------------------------
+# Local server management
+# --------------------------------------------------
+def start_server(host, port, ready_timeout, workers=0):
+    """
+    Starts api.main:app (plain uvicorn, or the pre-fork api.server with
+    `workers` > 0) and blocks until /ready answers 200.
+    """
+    if workers > 0:
+        command = [sys.executable, "-m", "api.server", "--workers", str(workers)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "api.main:app"]
+    proc = subprocess.Popen(
+        command + ["--host", host, "--port", str(port)],
+        cwd=PROJECT_ROOT,
+    )
+    base_url = f"http://{host}:{port}"
+    deadline = time.time() + ready_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            if requests.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return proc, base_url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(1)
+    proc.terminate()
+    raise RuntimeError(f"API not ready after {ready_timeout}s")
+
+
+# --------------------------------------------------
+# Open-loop load generation
+# --------------------------------------------------
+def arrival_times(rate, duration, poisson=True, seed=0):
+    """Scheduled send offsets (s) for a given offered rate (req/s)."""
+    rng = np.random.default_rng(seed)
+    n = int(rate * duration)
+    if poisson:
+        return np.cumsum(rng.exponential(1.0 / rate, size=n))
+    return np.arange(n) / rate
+
+
+def run_step(base_url, queries, rate, args):
+    """
+    Fires requests at their scheduled times regardless of completions.
+    Latency is measured from the *scheduled* time, so client-side queueing
+    behind the concurrency limit counts against the server (no coordinated
+    omission).
+    """
+    schedule = arrival_times(rate, args.duration, poisson=not args.constant, seed=int(rate * 1000))
+    local = threading.local()
+    records = []
+    lock = threading.Lock()
+
+    def send(scheduled_at, query):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        status = None
+        try:
+            resp = session.post(
+                f"{base_url}/search",
+                json={"query": query},
+                timeout=args.timeout,
+            )
+            status = resp.status_code
+        except requests.exceptions.RequestException as e:
+            status = type(e).__name__
+        latency = time.perf_counter() - scheduled_at
+        with lock:
+            records.append((latency, status))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for i, offset in enumerate(schedule):
+            scheduled_at = start + offset
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, scheduled_at, queries[i % len(queries)])
+    wall = time.perf_counter() - start
+
+    return summarize_step(rate, records, wall)
+
+
+def summarize_step(rate, records, wall):
+    latencies_ms = np.array([r[0] for r in records]) * 1000
+    ok = np.array([r[1] == 200 for r in records])
+    errors = {}
+    for _, status in records:
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+
+    counts = np.histogram(
+        latencies_ms, bins=(0,) + HISTOGRAM_BOUNDS_MS + (float("inf"),)
+    )[0]
+    histogram = {
+        (f"<={b}ms" if b != float("inf") else f">{HISTOGRAM_BOUNDS_MS[-1]}ms"): int(c)
+        for b, c in zip(HISTOGRAM_BOUNDS_MS + (float("inf"),), counts)
+    }
+
+    ok_latencies = latencies_ms[ok] if ok.any() else np.array([np.nan])
+    return {
+        "offered_rps": rate,
+        "sent": len(records),
+        "achieved_rps": round(int(ok.sum()) / wall, 3) if wall > 0 else 0.0,
+        "error_rate": round(1 - ok.mean(), 4) if len(ok) else 0.0,
+        "errors": errors,
+        "p50_ms": round(float(np.nanpercentile(ok_latencies, 50)), 1),
+        "p95_ms": round(float(np.nanpercentile(ok_latencies, 95)), 1),
+        "p99_ms": round(float(np.nanpercentile(ok_latencies, 99)), 1),
+        "max_ms": round(float(np.nanmax(ok_latencies)), 1),
+        "histogram": histogram,
+    }
+
+
+def is_saturated(step, args):
+    return (
+        step["achieved_rps"] < 0.9 * step["offered_rps"]
+        or step["error_rate"] > args.max_error_rate
+        or step["p99_ms"] > args.slo_p99_ms
+    )
+
+
+def print_histogram(histogram):
+    peak = max(histogram.values()) or 1
+    for label, count in histogram.items():
+        bar = "#" * int(40 * count / peak)
+        print(f"    {label:>10} | {bar} {count}")
+
+
+# --------------------------------------------------
+# Entry point
+# --------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Open-loop load test for the /search endpoint."
+    )
+    parser.add_argument("--requests-file", default=None,
+                        help="JSONL request log to replay (e.g. requests.jsonl)")
+    parser.add_argument("--synthetic", type=int, default=200,
+                        help="number of synthetic queries when no log is given")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--start-server", action="store_true",
+                        help="launch api.main:app locally and wait for /ready")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server-workers", type=int, default=0,
+                        help="with --start-server: pre-fork workers (0 = single uvicorn process)")
+    parser.add_argument("--ready-timeout", type=float, default=600)
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.5, 1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=30, help="seconds per rate step")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="max in-flight requests on the client")
+    parser.add_argument("--constant", action="store_true",
+                        help="constant inter-arrival instead of Poisson")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--slo-p99-ms", type=float, default=2000)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--keep-going", action="store_true",
+                        help="run every rate even after saturation")
+    parser.add_argument("--output", default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.requests_file:
+        queries = load_request_log(args.requests_file)
+        print(f"[INFO] Replaying {len(queries)} queries from {args.requests_file}")
+    else:
+        queries = synthetic_queries(args.synthetic)
+        print(f"[INFO] Using {len(queries)} synthetic queries")
+
+    if not queries:
+        raise SystemExit("No queries to send")
+
+    server = None
+    base_url = args.base_url
+    if args.start_server:
+        print("[INFO] Starting local API server...")
+        server, base_url = start_server(
+            "127.0.0.1", args.port, args.ready_timeout, workers=args.server_workers
+        )
+
+    steps = []
+    saturation = None
+    try:
+        for rate in args.rates:
+            print(f"\n[INFO] Offered load {rate} req/s for {args.duration}s...")
+            step = run_step(base_url, queries, rate, args)
+            steps.append(step)
+            print(
+                f"  achieved {step['achieved_rps']} req/s, "
+                f"p50 {step['p50_ms']}ms, p99 {step['p99_ms']}ms, "
+                f"errors {step['error_rate'] * 100:.1f}%"
+            )
+            print_histogram(step["histogram"])
+
+            if saturation is None and is_saturated(step, args):
+                saturation = rate
+                print(f"[INFO] Saturated at {rate} req/s")
+                if not args.keep_going:
+                    break
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    sustained = [s["offered_rps"] for s in steps if not is_saturated(s, args)]
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "max_sustained_rps": max(sustained) if sustained else None,
+        "saturation_rps": saturation,
+        "steps": steps,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"load_{time.strftime('%Y%m%d_%H%M%S')}.json")
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n[DONE] Max sustained: {report['max_sustained_rps']} req/s, "
+          f"saturation: {saturation} req/s. Report: {output}")
+
+
+if __name__ == "__main__":
+    main()
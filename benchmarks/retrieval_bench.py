@@ -0,0 +1,351 @@
+import argparse
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# --------------------------------------------------
+# Add project root to path
+# --------------------------------------------------
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import (
+    load_corpus,
+    load_into_db,
+    make_query_texts,
+    make_query_vectors,
+    synthetic_text,
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# --------------------------------------------------
+# Scan variants (stage-1 index structures)
+# --------------------------------------------------
+# Each builder takes the (n, d) unit-norm float32 matrix and returns a
+# search(query_vector, k) -> array of row indices, best first.
+
+def build_exact_matrix(matrix):
+    """Exact search with one BLAS matrix-vector product. Ground truth."""
+    def search(query, k):
+        scores = matrix @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+    return search
+
+
+def build_row_loop(matrix):
+    """Per-row cosine loop (the original SemanticSearcherDB scan), baseline."""
+    from search.semantic_search_db import SemanticSearcherDB
+
+    rows = list(matrix)
+
+    def search(query, k):
+        scores = np.array([
+            SemanticSearcherDB.cosine_similarity(query, row) for row in rows
+        ])
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+    return search
+
+
+def build_case_index(matrix):
+    """The production CaseIndex (main segment + live delta segment)."""
+    from search.case_index import CaseIndex
+
+    index = CaseIndex(dim=matrix.shape[1])
+    # Keep ~1% in the live segment to include the delta scan in the numbers
+    split = int(len(matrix) * 0.99)
+    index._publish_main([str(i) for i in range(split)], matrix[:split])
+    index.append([str(i) for i in range(split, len(matrix))], matrix[split:])
+
+    def search(query, k):
+        return np.array([int(cid) for cid, _ in index.search(query, top_k=k)])
+    return search
+
+
+def build_sharded(matrix):
+    """Scatter-gather scan across one worker process per core."""
+    from search.sharded_search import ShardedScanner, SEARCH_SHARDS
+
+    n_shards = SEARCH_SHARDS if SEARCH_SHARDS > 1 else (os.cpu_count() or 1)
+    scanner = ShardedScanner(matrix, n_shards)
+
+    def search(query, k):
+        rows, _ = scanner.search(query, k)
+        return rows
+    return search
+
+
+def build_pca_prefilter(matrix, dims):
+    """PCA-reduced first pass, shortlist rescored at full dimension."""
+    from search.pca_prefilter import PCAPrefilter
+
+    prefilter = PCAPrefilter(matrix, dims)
+
+    def search(query, k):
+        rows, _ = prefilter.search(matrix, query, k)
+        return rows
+    # Resident on top of the full matrix
+    search.extra_mb = round(prefilter.nbytes / 2**20, 1)
+    return search
+
+
+SCAN_VARIANTS = {
+    "exact_matrix": build_exact_matrix,
+    "row_loop": build_row_loop,
+    "case_index": build_case_index,
+    "sharded": build_sharded,
+    "pca_64": functools.partial(build_pca_prefilter, dims=64),
+    "pca_128": functools.partial(build_pca_prefilter, dims=128),
+}
+
+# Variants that are too slow to run on very large corpora
+SLOW_VARIANT_LIMITS = {
+    "row_loop": 100_000,
+}
+
+
+# --------------------------------------------------
+# Measurement helpers
+# --------------------------------------------------
+def latency_stats(latencies_s, wall_s):
+    ms = np.asarray(latencies_s) * 1000
+    return {
+        "n": int(len(ms)),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "qps": round(len(ms) / wall_s, 2) if wall_s > 0 else None,
+    }
+
+
+def measure(fn, inputs, warmup=3, concurrency=1):
+    """
+    Calls fn(x) for every input and returns (outputs, stats).
+    With concurrency > 1, calls run on a thread pool and qps is throughput.
+    """
+    for x in inputs[:warmup]:
+        fn(x)
+
+    def timed_call(x):
+        start = time.perf_counter()
+        out = fn(x)
+        return out, time.perf_counter() - start
+
+    wall_start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            pairs = list(pool.map(timed_call, inputs))
+    else:
+        pairs = [timed_call(x) for x in inputs]
+    wall = time.perf_counter() - wall_start
+
+    outputs = [p[0] for p in pairs]
+    return outputs, latency_stats([p[1] for p in pairs], wall)
+
+
+def recall_at_k(results, truth, k):
+    hits = 0
+    for got, expected in zip(results, truth):
+        hits += len(set(np.asarray(got)[:k].tolist()) & set(np.asarray(expected)[:k].tolist()))
+    return round(hits / (k * len(truth)), 4)
+
+
+# --------------------------------------------------
+# Benchmarks
+# --------------------------------------------------
+def bench_scan(corpus, args):
+    matrix = corpus["embeddings"]
+    queries = list(make_query_vectors(corpus, args.queries))
+    k = args.k
+
+    exact = build_exact_matrix(matrix)
+    truth = [exact(q, k) for q in queries]
+
+    results = []
+    for name in args.variants:
+        limit = SLOW_VARIANT_LIMITS.get(name)
+        if limit and len(matrix) > limit:
+            print(f"[SKIP] {name} on {len(matrix)} cases (limit {limit})")
+            continue
+
+        build_start = time.perf_counter()
+        search = SCAN_VARIANTS[name](matrix)
+        build_s = time.perf_counter() - build_start
+
+        outputs, stats = measure(
+            lambda q: search(q, k), queries, concurrency=args.concurrency
+        )
+        stats.update({
+            "stage": "scan",
+            "variant": name,
+            "build_s": round(build_s, 3),
+            f"recall@{k}": recall_at_k(outputs, truth, k),
+        })
+        if hasattr(search, "extra_mb"):
+            stats["extra_mb"] = search.extra_mb
+        print(f"[SCAN] {name}: {stats}")
+        results.append(stats)
+
+    return results
+
+
+def bench_rerank(corpus, args):
+    from rerank.cross_encoder_reranker import CrossEncoderReranker
+
+    reranker = CrossEncoderReranker()
+    query_texts = make_query_texts(corpus, args.queries)
+    n_candidates = args.rerank_candidates
+
+    topics = corpus["topics"]
+    candidate_sets = [
+        [
+            {"case_id": f"c{j}", "full_text": synthetic_text(topics[j % len(topics)])}
+            for j in range(i, i + n_candidates)
+        ]
+        for i in range(len(query_texts))
+    ]
+
+    def run(i):
+        return reranker.rerank(query_texts[i], candidate_sets[i], top_k=n_candidates)
+
+    _, stats = measure(run, list(range(len(query_texts))), concurrency=args.concurrency)
+    stats.update({"stage": "rerank", "candidates": n_candidates})
+    print(f"[RERANK] {stats}")
+    return [stats]
+
+
+def bench_retrieve(corpus, args):
+    from search.semantic_search_db import SemanticSearcherDB
+
+    retriever = SemanticSearcherDB()
+    # Measure the uncached path
+    retriever.query_embeddings.maxsize = 0
+    query_texts = make_query_texts(corpus, args.queries)
+
+    _, stats = measure(
+        lambda q: retriever.retrieve(q, top_k=args.k),
+        query_texts,
+        concurrency=args.concurrency,
+    )
+    stats.update({"stage": "retrieve"})
+    print(f"[RETRIEVE] {stats}")
+    return [stats]
+
+
+def bench_pipeline(corpus, args):
+    from search.search_pipeline import CaseSearchPipeline
+
+    pipeline = CaseSearchPipeline()
+    pipeline.warm_up()
+    # Measure the uncached path (synthetic queries repeat topics)
+    pipeline.retriever.query_embeddings.maxsize = 0
+    pipeline.result_cache.maxsize = 0
+    pipeline.semantic_cache.capacity = 0
+    pipeline.disk_cache = None
+    query_texts = make_query_texts(corpus, args.queries)
+
+    _, stats = measure(pipeline.search, query_texts, concurrency=args.concurrency)
+    stats.update({"stage": "pipeline"})
+    print(f"[PIPELINE] {stats}")
+    return [stats]
+
+
+STAGES = {
+    "scan": bench_scan,
+    "rerank": bench_rerank,
+    "retrieve": bench_retrieve,
+    "pipeline": bench_pipeline,
+}
+
+
+# --------------------------------------------------
+# Entry point
+# --------------------------------------------------
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline latency / throughput / recall benchmark for retrieval."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--source", choices=["synthetic", "db", "shards"], default="synthetic",
+                        help="shards reads the embeddings written by embeddings/generate_embeddings.py")
+    parser.add_argument(
+        "--stages", nargs="+", choices=list(STAGES), default=["scan"],
+        help="retrieve / pipeline need Postgres populated with the same corpus (--load-db)",
+    )
+    parser.add_argument("--variants", nargs="+", choices=list(SCAN_VARIANTS),
+                        default=list(SCAN_VARIANTS))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank-candidates", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--load-db", action="store_true",
+                        help="insert the corpus into POSTGRES_DB before DB-backed stages")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--output", default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+
+    for size in args.sizes:
+        print(f"\n[INFO] Preparing {args.source} corpus with {size} cases...")
+        corpus = load_corpus(size, source=args.source, use_cache=not args.no_cache)
+
+        if args.load_db:
+            load_into_db(corpus)
+
+        for stage in args.stages:
+            for entry in STAGES[stage](corpus, args):
+                entry["corpus_size"] = size
+                results.append(entry)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(
+            RESULTS_DIR, f"retrieval_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        )
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n[DONE] Benchmark results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import sys
+import os
+from tqdm import tqdm
+from psycopg2.extras import execute_values
+
+# --------------------------------------------------
+# Add project root to path
+# --------------------------------------------------
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_connection import DatabaseConnection
+from rerank.token_ids import tokenize_cases
+from utils.model_loading import CROSS_ENCODER_MODEL_NAME, load_cross_tokenizer
+
+# Cases tokenized and committed together
+BATCH_SIZE = 500
+
+
+def backfill_cross_tokens():
+    """
+    Fills cross_token_ids for cases stored before ingestion pre-tokenized
+    them, or tokenized with a different cross-encoder than the configured one.
+    Safe to re-run; only stale rows are touched.
+    """
+    print("[INFO] Loading cross-encoder tokenizer...")
+    tokenizer = load_cross_tokenizer()
+
+    db = DatabaseConnection()
+    read_conn = db.get_connection()
+    write_conn = db.get_connection()
+    write_cursor = write_conn.cursor()
+
+    # Server-side cursor: rows stream in batches instead of loading every text
+    cursor = read_conn.cursor(name="cross_token_backfill")
+    cursor.itersize = BATCH_SIZE
+    cursor.execute(
+        """
+        SELECT case_id, text FROM cases
+        WHERE cross_token_ids IS NULL
+           OR cross_token_model IS DISTINCT FROM %s;
+        """,
+        (CROSS_ENCODER_MODEL_NAME,),
+    )
+
+    def flush(batch):
+        token_ids = tokenize_cases(tokenizer, [text or "" for _, text in batch])
+        execute_values(
+            write_cursor,
+            """
+            UPDATE cases AS c
+            SET cross_token_ids = v.ids, cross_token_model = v.model
+            FROM (VALUES %s) AS v (case_id, ids, model)
+            WHERE c.case_id = v.case_id;
+            """,
+            [
+                (case_id, ids, CROSS_ENCODER_MODEL_NAME)
+                for (case_id, _), ids in zip(batch, token_ids)
+            ],
+        )
+        write_conn.commit()
+
+    updated = 0
+    batch = []
+    for row in tqdm(cursor, desc="Tokenizing"):
+        batch.append((row["case_id"], row["text"]))
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            updated += len(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+        updated += len(batch)
+
+    cursor.close()
+    read_conn.close()
+    write_cursor.close()
+    write_conn.close()
+
+    print(f"[DONE] Pre-tokenized {updated} cases for {CROSS_ENCODER_MODEL_NAME}.")
+
+
+if __name__ == "__main__":
+    backfill_cross_tokens()
@@ -5,10 +5,20 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from data.load_dataset import load_cjpe
-from sentence_transformers import SentenceTransformer
 from database.db_connection import DatabaseConnection
+from embeddings.embedding_cache import EmbeddingCache
+from rerank.token_ids import tokenize_cases
+from utils.model_loading import (
+    CROSS_ENCODER_MODEL_NAME,
+    load_cross_tokenizer,
+    load_embedding_model,
+)
+from utils.text_preprocessing import extractive_summary
 from tqdm import tqdm
 
+# Cases embedded and committed together
+BATCH_SIZE = 100
+
 
 # -----------------------------
 # Helper: Map label to decision
@@ -57,7 +67,9 @@ def ingest_dataset(limit=None):
     dataset = load_cjpe(limit=limit)
 
     print("[INFO] Loading embedding model...")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    model = load_embedding_model()
+    cache = EmbeddingCache()
+    tokenizer = load_cross_tokenizer()
 
     # Connect to PostgreSQL
     db = DatabaseConnection()
@@ -72,13 +84,45 @@ def ingest_dataset(limit=None):
             text,
             decision,
             decision_reason,
-            case_source
+            case_source,
+            cross_token_ids,
+            cross_token_model,
+            summary,
+            text_length
         )
-        VALUES (%s, %s, %s, %s, %s, %s)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         ON CONFLICT (case_id) DO NOTHING;
     """
 
     inserted_count = 0
+    batch = []
+
+    def flush(batch):
+        # Generate 384-dim embeddings (FLOAT8[]), reusing cached vectors
+        embeddings = cache.encode(model, [row[1] for row in batch])
+        # Cross-encoder ids, so reranking never re-tokenizes stored texts
+        token_ids = tokenize_cases(tokenizer, [row[1] for row in batch])
+
+        for (case_id, text, decision, decision_reason), embedding, ids in zip(
+            batch, embeddings, token_ids
+        ):
+            cursor.execute(
+                insert_query,
+                (
+                    case_id,
+                    embedding.tolist(),
+                    text,
+                    decision,
+                    decision_reason,
+                    "dataset",
+                    ids,
+                    CROSS_ENCODER_MODEL_NAME,
+                    extractive_summary(text),
+                    len(text),
+                ),
+            )
+
+        conn.commit()
 
     print("[INFO] Inserting cases into PostgreSQL...")
 
@@ -94,31 +138,22 @@ def ingest_dataset(limit=None):
         decision = map_decision(case["label"])
         decision_reason = extract_decision_reason(case)
 
-        # Generate 384-dim embedding (FLOAT8[])
-        embedding = model.encode(text).tolist()
-
-        cursor.execute(
-            insert_query,
-            (
-                case_id,
-                embedding,
-                text,
-                decision,
-                decision_reason,
-                "dataset",
-            ),
-        )
-
+        batch.append((case_id, text, decision, decision_reason))
         inserted_count += 1
 
-        # Commit every 100 records
-        if inserted_count % 100 == 0:
-            conn.commit()
+        # Embed + commit every BATCH_SIZE records
+        if len(batch) >= BATCH_SIZE:
+            flush(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
 
     # Final commit
     conn.commit()
     cursor.close()
     conn.close()
+    cache.close()
 
     print(f"[DONE] Dataset ingestion completed. Inserted {inserted_count} cases.")
 
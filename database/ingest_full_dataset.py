@@ -3,7 +3,6 @@ import os
 import json
 from tqdm import tqdm
 from datasets import load_dataset
-from sentence_transformers import SentenceTransformer
 
 # --------------------------------------------------
 # Add project root to path
@@ -11,6 +10,18 @@ from sentence_transformers import SentenceTransformer
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.db_connection import DatabaseConnection
+from database.near_duplicates import NearDuplicateDetector, record_duplicates
+from embeddings.embedding_cache import EmbeddingCache
+from rerank.token_ids import tokenize_cases
+from utils.model_loading import (
+    CROSS_ENCODER_MODEL_NAME,
+    load_cross_tokenizer,
+    load_embedding_model,
+)
+from utils.text_preprocessing import extractive_summary
+
+# Cases embedded and committed together
+BATCH_SIZE = 500
 
 
 # --------------------------------------------------
@@ -42,7 +53,10 @@ def ingest_all_splits():
     print(f"[INFO] Found splits: {split_names}")
 
     print("[INFO] Loading embedding model...")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    model = load_embedding_model()
+    cache = EmbeddingCache()
+    tokenizer = load_cross_tokenizer()
+    detector = NearDuplicateDetector()
 
     db = DatabaseConnection()
     conn = db.get_connection()
@@ -55,17 +69,50 @@ def ingest_all_splits():
             text,
             decision,
             decision_reason,
-            case_source
+            case_source,
+            cross_token_ids,
+            cross_token_model,
+            summary,
+            text_length
         )
-        VALUES (%s, %s, %s, %s, %s, %s)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         ON CONFLICT (case_id) DO NOTHING;
     """
 
     total_inserted = 0
+    total_duplicates = 0
+
+    def flush(batch, duplicates):
+        embeddings = cache.encode(model, [row[1] for row in batch])
+        token_ids = tokenize_cases(tokenizer, [row[1] for row in batch])
+
+        for (case_id, text, decision, decision_reason, split), embedding, ids in zip(
+            batch, embeddings, token_ids
+        ):
+            cursor.execute(
+                insert_query,
+                (
+                    case_id,
+                    embedding.tolist(),
+                    text,
+                    decision,
+                    decision_reason,
+                    split,
+                    ids,
+                    CROSS_ENCODER_MODEL_NAME,
+                    extractive_summary(text),
+                    len(text),
+                )
+            )
+
+        record_duplicates(cursor, duplicates)
+        conn.commit()
 
     for split in split_names:
         print(f"\n[INFO] Ingesting split: {split}")
         dataset = dataset_dict[split]
+        batch = []
+        duplicates = []
 
         for case in tqdm(dataset, desc=f"Processing {split}"):
             case_id = case.get("id")
@@ -77,33 +124,31 @@ def ingest_all_splits():
             decision = map_decision(case.get("label", 0))
             decision_reason = extract_decision_reason(case)
 
-            embedding = model.encode(text).tolist()
-
-            cursor.execute(
-                insert_query,
-                (
-                    case_id,
-                    embedding,
-                    text,
-                    decision,
-                    decision_reason,
-                    split
-                )
-            )
+            # Near-duplicate check across all splits seen so far
+            match = detector.add(case_id, text)
+            if match:
+                canonical_id, similarity = match
+                duplicates.append((case_id, canonical_id, similarity))
+                total_duplicates += 1
 
+            batch.append((case_id, text, decision, decision_reason, split))
             total_inserted += 1
 
-            if total_inserted % 500 == 0:
-                conn.commit()
+            if len(batch) >= BATCH_SIZE:
+                flush(batch, duplicates)
+                batch, duplicates = [], []
 
-        conn.commit()
+        if batch:
+            flush(batch, duplicates)
         print(f"[DONE] Finished split: {split}")
 
     cursor.close()
     conn.close()
+    cache.close()
 
     print("\n✅ FULL DATASET INGESTION COMPLETED")
     print(f"📊 Total processed cases (before dedup): {total_inserted}")
+    print(f"🧬 Near-duplicates recorded in case_duplicates: {total_duplicates}")
 
 # --------------------------------------------------
 # Run
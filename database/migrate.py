@@ -0,0 +1,191 @@
+import argparse
+import importlib.util
+import os
+import re
+import sys
+
+# --------------------------------------------------
+# Add project root to path
+# --------------------------------------------------
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db_connection import DatabaseConnection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# First line of a .sql migration that must run outside a transaction
+# (CREATE INDEX CONCURRENTLY); its statements are executed one by one
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+# pg_advisory_lock key: one runner at a time across deploy jobs / API hosts
+ADVISORY_LOCK_KEY = 4_318_203_917
+
+# Fail fast instead of queueing behind long transactions (and blocking every
+# query queued behind us) when a DDL statement needs a table lock
+LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+
+_MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """[(version, name, path), ...] sorted by version."""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            version, name, _ = match.groups()
+            migrations.append((version, name, os.path.join(directory, filename)))
+
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def _ensure_migrations_table(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ DEFAULT now()
+        );
+    """)
+    conn.commit()
+    cursor.close()
+
+
+def applied_versions(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT version FROM schema_migrations;")
+    versions = {row["version"] for row in cursor.fetchall()}
+    cursor.close()
+    return versions
+
+
+def _record(cursor, version, name):
+    cursor.execute(
+        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s);",
+        (version, name),
+    )
+
+
+def _split_statements(sql):
+    """Naive ';' splitter, sufficient for plain DDL files."""
+    body = "\n".join(
+        line for line in sql.splitlines() if not line.strip().startswith("--")
+    )
+    return [s.strip() for s in body.split(";") if s.strip()]
+
+
+def _load_module(version, name, path):
+    spec = importlib.util.spec_from_file_location(f"migration_{version}_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _apply(conn, version, name, path):
+    cursor = conn.cursor()
+
+    if path.endswith(".sql"):
+        with open(path, encoding="utf-8") as f:
+            sql = f.read()
+
+        if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+            conn.autocommit = True
+            try:
+                for statement in _split_statements(sql):
+                    cursor.execute(statement)
+            finally:
+                conn.autocommit = False
+            _record(cursor, version, name)
+        else:
+            # DDL is transactional in PostgreSQL: file + bookkeeping commit together
+            cursor.execute(sql)
+            _record(cursor, version, name)
+
+    else:
+        module = _load_module(version, name, path)
+        module.migrate(conn)
+        # Non-transactional migrations committed their own batches already
+        if not getattr(module, "TRANSACTIONAL", True):
+            conn.commit()
+        _record(cursor, version, name)
+
+    conn.commit()
+    cursor.close()
+
+
+def run_migrations(db=None, target=None):
+    """
+    Applies every pending migration up to `target` (inclusive) in order.
+    Returns the versions applied.
+    """
+    db = db or DatabaseConnection()
+
+    # Held on its own connection so it survives commits / autocommit switches
+    lock_conn = db.get_connection()
+    lock_conn.autocommit = True
+    lock_cursor = lock_conn.cursor()
+    lock_cursor.execute("SELECT pg_advisory_lock(%s);", (ADVISORY_LOCK_KEY,))
+
+    conn = db.get_connection()
+    applied = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT set_config('lock_timeout', %s, false);", (LOCK_TIMEOUT,))
+        conn.commit()
+        cursor.close()
+
+        _ensure_migrations_table(conn)
+        done = applied_versions(conn)
+
+        for version, name, path in discover_migrations():
+            if target is not None and version > target:
+                break
+            if version in done:
+                continue
+            print(f"[MIGRATE] Applying {version}_{name}...")
+            try:
+                _apply(conn, version, name, path)
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+    finally:
+        conn.close()
+        lock_cursor.execute("SELECT pg_advisory_unlock(%s);", (ADVISORY_LOCK_KEY,))
+        lock_cursor.close()
+        lock_conn.close()
+
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database migrations.")
+    parser.add_argument("--target", help="stop after this version (e.g. 0002)")
+    parser.add_argument(
+        "--list", action="store_true", help="show migrations and their status"
+    )
+    args = parser.parse_args()
+
+    if args.list:
+        conn = DatabaseConnection().get_connection()
+        _ensure_migrations_table(conn)
+        done = applied_versions(conn)
+        conn.close()
+        for version, name, _ in discover_migrations():
+            status = "applied" if version in done else "pending"
+            print(f"{version}_{name}: {status}")
+        return
+
+    applied = run_migrations(target=args.target)
+    if applied:
+        print(f"[DONE] Applied {len(applied)} migration(s): {', '.join(applied)}")
+    else:
+        print("[DONE] Database is up to date.")
+
+
+if __name__ == "__main__":
+    main()
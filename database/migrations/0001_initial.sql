@@ -0,0 +1,27 @@
+-- Baseline schema. Idempotent, so databases created from the former
+-- database/schema.sql are simply recorded as being at this version.
+CREATE TABLE IF NOT EXISTS cases (
+    case_id TEXT PRIMARY KEY,
+    embedding TEXT, -- JSON serialized list of floats
+    text TEXT,
+    decision TEXT,
+    decision_reason TEXT,
+    case_source TEXT
+);
+
+-- Cross-encoder token ids of the (truncated) text, little-endian uint16,
+-- and the model whose tokenizer produced them. Filled by ingestion and
+-- database/backfill_cross_tokens.py.
+ALTER TABLE cases ADD COLUMN IF NOT EXISTS cross_token_ids BYTEA;
+ALTER TABLE cases ADD COLUMN IF NOT EXISTS cross_token_model TEXT;
+
+-- Near-duplicate clusters found by MinHash/LSH during ingestion.
+-- Canonical cases are NOT listed; every row points at its cluster's canonical case.
+CREATE TABLE IF NOT EXISTS case_duplicates (
+    case_id TEXT PRIMARY KEY REFERENCES cases(case_id) ON DELETE CASCADE,
+    canonical_id TEXT NOT NULL,
+    similarity REAL,
+    detected_at TIMESTAMPTZ DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_case_duplicates_canonical ON case_duplicates (canonical_id);
@@ -0,0 +1,15 @@
+-- Typed columns computed once at ingestion instead of on every request.
+-- Every statement is a catalog-only change on PostgreSQL 11+ (no table
+-- rewrite): the new columns are nullable or have a non-volatile default.
+ALTER TABLE cases ADD COLUMN IF NOT EXISTS summary TEXT;
+ALTER TABLE cases ADD COLUMN IF NOT EXISTS text_length INTEGER;
+
+-- Existing rows read the migration time; new rows their insert time
+ALTER TABLE cases ADD COLUMN IF NOT EXISTS ingested_at TIMESTAMPTZ DEFAULT now();
+
+-- Integer surrogate key for sampling and incremental index sync. New
+-- rows are numbered in insert order by the default; existing rows are
+-- numbered in batches by 0003.
+ALTER TABLE cases ADD COLUMN IF NOT EXISTS id BIGINT;
+CREATE SEQUENCE IF NOT EXISTS cases_id_seq AS BIGINT OWNED BY cases.id;
+ALTER TABLE cases ALTER COLUMN id SET DEFAULT nextval('cases_id_seq');
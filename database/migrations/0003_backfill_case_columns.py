@@ -0,0 +1,64 @@
+"""
+Numbers existing rows and precomputes summary / text_length for them.
+"""
+from psycopg2.extras import execute_values
+
+from utils.text_preprocessing import extractive_summary
+
+# Each batch commits on its own: rows are only locked briefly and an
+# interrupted backfill resumes where it stopped
+TRANSACTIONAL = False
+
+BATCH_SIZE = 1000
+
+
+def migrate(conn):
+    cursor = conn.cursor()
+    last_case_id = ""
+    updated = 0
+
+    while True:
+        # Keyset pagination over the primary key keeps every batch an index scan
+        cursor.execute(
+            """
+            SELECT case_id, text, summary, text_length, id FROM cases
+            WHERE case_id > %s
+            ORDER BY case_id
+            LIMIT %s;
+            """,
+            (last_case_id, BATCH_SIZE),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_case_id = rows[-1]["case_id"]
+
+        stale = [
+            r for r in rows
+            if r["id"] is None or r["text_length"] is None or r["summary"] is None
+        ]
+        if stale:
+            execute_values(
+                cursor,
+                """
+                UPDATE cases AS c
+                SET id = COALESCE(c.id, nextval('cases_id_seq')),
+                    text_length = v.text_length::INTEGER,
+                    summary = COALESCE(c.summary, v.summary::TEXT)
+                FROM (VALUES %s) AS v (case_id, text_length, summary)
+                WHERE c.case_id = v.case_id;
+                """,
+                [
+                    (
+                        r["case_id"],
+                        len(r["text"] or ""),
+                        r["summary"] or extractive_summary(r["text"]),
+                    )
+                    for r in stale
+                ],
+            )
+            updated += len(stale)
+        conn.commit()
+
+    cursor.close()
+    print(f"[MIGRATE] Backfilled {updated} cases")
@@ -0,0 +1,8 @@
+-- migrate: no-transaction
+-- CONCURRENTLY builds do not block writes but cannot run inside a
+-- transaction. If a build fails it leaves an INVALID index behind:
+-- DROP INDEX CONCURRENTLY it and run the migration again.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_cases_id ON cases (id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cases_decision ON cases (decision);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cases_case_source ON cases (case_source);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cases_ingested_at ON cases (ingested_at);
@@ -0,0 +1,13 @@
+-- migrate: no-transaction
+-- The incremental index sync reads rows above an id watermark, so a row
+-- with a NULL id would never be indexed. Number any row left without one,
+-- then enforce NOT NULL without a long exclusive lock: the NOT VALID check
+-- is validated under a lock that still allows writes, and PostgreSQL 12+
+-- uses it to skip the table scan of SET NOT NULL. Each statement commits
+-- on its own, so a failed run can simply be repeated.
+UPDATE cases SET id = nextval('cases_id_seq') WHERE id IS NULL;
+ALTER TABLE cases DROP CONSTRAINT IF EXISTS cases_id_not_null;
+ALTER TABLE cases ADD CONSTRAINT cases_id_not_null CHECK (id IS NOT NULL) NOT VALID;
+ALTER TABLE cases VALIDATE CONSTRAINT cases_id_not_null;
+ALTER TABLE cases ALTER COLUMN id SET NOT NULL;
+ALTER TABLE cases DROP CONSTRAINT cases_id_not_null;
@@ -0,0 +1,128 @@
+import zlib
+
+import numpy as np
+
+from utils.text_preprocessing import clean_text
+
+# --------------------------------------------------
+# MinHash / LSH parameters
+# --------------------------------------------------
+NUM_PERM = 128          # signature length
+BANDS = 16              # LSH bands (BANDS * ROWS == NUM_PERM)
+ROWS = 8                # rows per band -> candidate threshold ~ (1/16)^(1/8) = 0.71
+SHINGLE_SIZE = 5        # words per shingle
+JACCARD_THRESHOLD = 0.8  # estimated Jaccard needed to call two cases duplicates
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """32-bit hashes of the word shingles of the cleaned text."""
+    words = clean_text(text).split()
+    if not words:
+        return None
+    size = min(size, len(words))
+    shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter(
+        (zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+
+
+class NearDuplicateDetector:
+    """
+    Streaming MinHash + LSH near-duplicate detector.
+
+    Cases are added one at a time; each new case is compared only against
+    the cases sharing at least one LSH band, and joins the cluster of its
+    best verified match. The canonical case of a cluster is the first case
+    of that cluster that was seen.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=JACCARD_THRESHOLD, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        rng = np.random.default_rng(seed)
+        # a < 2^31 and 32-bit hashes keep a * h inside uint64
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+        self._buckets = [dict() for _ in range(bands)]
+        self._signatures = {}
+        self._parent = {}
+
+    def signature(self, text):
+        hashes = shingle_hashes(text)
+        if hashes is None:
+            return None
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+    def canonical(self, case_id):
+        """Root of the cluster containing case_id (path-halving union-find)."""
+        parent = self._parent
+        while parent[case_id] != case_id:
+            parent[case_id] = parent[parent[case_id]]
+            case_id = parent[case_id]
+        return case_id
+
+    def add(self, case_id, text):
+        """
+        Adds a case. Returns (canonical_id, estimated_jaccard) when it is a
+        near-duplicate of an earlier case, else None.
+        """
+        if case_id in self._parent:
+            return None
+
+        sig = self.signature(text)
+        self._parent[case_id] = case_id
+        if sig is None:
+            return None
+
+        band_keys = [
+            sig[b * self.rows:(b + 1) * self.rows].tobytes()
+            for b in range(self.bands)
+        ]
+
+        candidates = set()
+        for bucket, key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(key, ()))
+
+        best_id, best_sim = None, 0.0
+        for other in candidates:
+            sim = float(np.mean(self._signatures[other] == sig))
+            if sim > best_sim:
+                best_id, best_sim = other, sim
+
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, []).append(case_id)
+        self._signatures[case_id] = sig
+
+        if best_id is None or best_sim < self.threshold:
+            return None
+
+        root = self.canonical(best_id)
+        self._parent[case_id] = root
+        return root, best_sim
+
+
+def record_duplicates(cursor, duplicates):
+    """
+    Upserts (case_id, canonical_id, similarity) rows into case_duplicates.
+    """
+    if not duplicates:
+        return
+    cursor.executemany(
+        """
+        INSERT INTO case_duplicates (case_id, canonical_id, similarity)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (case_id) DO UPDATE
+            SET canonical_id = EXCLUDED.canonical_id,
+                similarity = EXCLUDED.similarity;
+        """,
+        duplicates,
+    )
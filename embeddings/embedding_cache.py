@@ -0,0 +1,125 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from utils.model_loading import EMBEDDING_MODEL_NAME
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", "embeddings/embedding_cache.sqlite"
+)
+
+# Texts encoded exactly as stored (no clean_text), as the ingest scripts do
+RAW_TEXT = "raw"
+
+# SQLite caps bound parameters per statement; stay well below it
+_LOOKUP_CHUNK = 500
+
+
+def text_sha(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model name, preprocessing version,
+    SHA-256 of the text), stored as float32 blobs in a local SQLite file.
+
+    Re-ingesting unchanged texts then costs a lookup instead of a forward
+    pass through the model.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, model_name=EMBEDDING_MODEL_NAME,
+                 preprocessing=RAW_TEXT):
+        self.path = path
+        self.model_name = model_name
+        self.preprocessing = preprocessing
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("PRAGMA synchronous=NORMAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                preprocessing TEXT NOT NULL,
+                text_sha BLOB NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, preprocessing, text_sha)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+    def get_many(self, hashes):
+        """Returns {text_sha: vector} for the hashes present in the cache."""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_CHUNK):
+                chunk = unique[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"""
+                    SELECT text_sha, vector FROM embeddings
+                    WHERE model = ? AND preprocessing = ?
+                      AND text_sha IN ({placeholders});
+                    """,
+                    [self.model_name, self.preprocessing, *chunk],
+                ).fetchall()
+                for sha, blob in rows:
+                    found[sha] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, hashes, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO embeddings
+                    (model, preprocessing, text_sha, dim, vector)
+                VALUES (?, ?, ?, ?, ?);
+                """,
+                [
+                    (self.model_name, self.preprocessing, sha, len(vec), vec.tobytes())
+                    for sha, vec in zip(hashes, vectors)
+                ],
+            )
+            self._conn.commit()
+
+    def encode(self, model, texts, batch_size=32, **encode_kwargs):
+        """
+        Drop-in for model.encode(texts): cached vectors are reused and only
+        the misses go through the model. Returns a float32 (n, dim) array.
+        """
+        hashes = [text_sha(t) for t in texts]
+        cached = self.get_many(hashes)
+
+        missing = [i for i, h in enumerate(hashes) if h not in cached]
+        if missing:
+            # Encode each distinct missing text once
+            first_seen = {}
+            for i in missing:
+                first_seen.setdefault(hashes[i], i)
+            todo = list(first_seen.values())
+
+            encoded = np.asarray(
+                model.encode([texts[i] for i in todo], batch_size=batch_size, **encode_kwargs),
+                dtype=np.float32,
+            )
+            new_hashes = [hashes[i] for i in todo]
+            self.put_many(new_hashes, encoded)
+            cached.update(zip(new_hashes, encoded))
+
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([cached[h] for h in hashes])
+
+    def close(self):
+        self._conn.close()
@@ -1,40 +1,93 @@
-import pickle
-from sentence_transformers import SentenceTransformer
-
 from data.load_dataset import load_cjpe
-from utils.text_preprocessing import clean_text
+from embeddings.embedding_cache import EmbeddingCache
+from embeddings.shard_store import EMBEDDINGS_DIR, ShardWriter
+from utils.model_loading import load_embedding_model, EMBEDDING_MODEL_NAME
+from utils.text_preprocessing import clean_text, PREPROCESSING_VERSION
+
+
+# Rows per shard file
+SHARD_SIZE = 10_000
+
+# Texts cleaned and encoded together (bounded memory per step)
+ENCODE_CHUNK = 512
+
+
+def iter_clean_batches(dataset, start, chunk_size):
+    """
+    Yields (positions, case_ids, labels, cleaned_texts) chunks, starting at
+    source row `start`. Only one chunk of cleaned text is alive at a time.
+    """
+    positions, case_ids, labels, texts = [], [], [], []
+
+    for position in range(start, len(dataset)):
+        sample = dataset[position]
+        text = clean_text(sample["text"])
+        if not text:
+            continue
+
+        positions.append(position)
+        case_ids.append(str(sample["id"]))
+        labels.append(int(sample["label"]))
+        texts.append(text)
+
+        if len(texts) >= chunk_size:
+            yield positions, case_ids, labels, texts
+            positions, case_ids, labels, texts = [], [], [], []
+
+    if texts:
+        yield positions, case_ids, labels, texts
 
 
-def generate_case_embeddings(limit=None):
+def generate_case_embeddings(limit=None, split="single_train", out_dir=EMBEDDINGS_DIR,
+                             shard_size=SHARD_SIZE):
     """
-    Loads CJPE dataset, cleans text, and generates embeddings.
+    Loads CJPE dataset, cleans text, and generates embeddings in a
+    streaming fashion.
 
     Args:
         limit (int): limit number of samples (for testing)
+        split (str): dataset split to encode
+        out_dir (str): shard directory (appended to / resumed if it exists)
+        shard_size (int): rows per shard
 
     Saves:
-        embeddings/case_embeddings.pkl
+        <out_dir>/manifest.json and <out_dir>/shard_XXXXX/{embeddings,case_id,label,text_length}.npy
     """
     print("Loading dataset...")
-    dataset = load_cjpe(limit=limit)
+    dataset = load_cjpe(split=split, limit=limit)
 
-    print("Cleaning case texts...")
-    texts = [clean_text(sample["text"]) for sample in dataset]
+    writer = ShardWriter(out_dir, EMBEDDING_MODEL_NAME, shard_size=shard_size)
+    start = writer.consumed(split)
+    if start >= len(dataset):
+        print(f"Split {split} already fully encoded ({start} rows).")
+        return
+    if start:
+        print(f"Resuming {split} from row {start}...")
 
     print("Loading embedding model...")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    model = load_embedding_model()
+    cache = EmbeddingCache(preprocessing=PREPROCESSING_VERSION)
 
     print("Generating embeddings...")
-    embeddings = model.encode(
-        texts,
-        show_progress_bar=True,
-        batch_size=32
-    )
+    for positions, case_ids, labels, texts in iter_clean_batches(dataset, start, ENCODE_CHUNK):
+        embeddings = cache.encode(model, texts, batch_size=32)
+        writer.add(
+            embeddings,
+            {
+                "case_id": case_ids,
+                "label": labels,
+                "text_length": [len(t) for t in texts],
+            },
+            source=split,
+            positions=positions,
+        )
+        print(f"  encoded up to row {positions[-1] + 1}/{len(dataset)}")
 
-    with open("embeddings/case_embeddings.pkl", "wb") as f:
-        pickle.dump((dataset, embeddings), f)
+    writer.close()
+    cache.close()
 
-    print("Embeddings saved successfully")
+    print(f"Embeddings saved successfully ({writer.manifest['total_rows']} rows "
+          f"in {len(writer.manifest['shards'])} shards)")
 
 
 if __name__ == "__main__":
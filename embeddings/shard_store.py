@@ -0,0 +1,169 @@
+import json
+import os
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Where generate_embeddings writes shards + manifest.json
+EMBEDDINGS_DIR = "embeddings/case_embeddings"
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ShardWriter:
+    """
+    Writes embeddings as fixed-size shards:
+
+        <out_dir>/manifest.json
+        <out_dir>/shard_00000/embeddings.npy   float32 (rows, dim)
+        <out_dir>/shard_00000/<column>.npy     one array per metadata column
+
+    The manifest is rewritten (atomically) after every shard, together with
+    how many source rows each split has consumed, so an interrupted run can
+    resume and a later run can append new shards to the same directory.
+    """
+
+    def __init__(self, out_dir, model_name, shard_size=10_000):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+            if self.manifest["model"] != model_name:
+                raise ValueError(
+                    f"{out_dir} holds {self.manifest['model']} embeddings, "
+                    f"refusing to append {model_name} embeddings"
+                )
+        else:
+            self.manifest = {
+                "version": MANIFEST_VERSION,
+                "model": model_name,
+                "dim": None,
+                "dtype": "float32",
+                "shard_size": shard_size,
+                "total_rows": 0,
+                "consumed": {},  # source split -> source rows processed
+                "shards": [],
+            }
+
+        self._vectors = []
+        self._columns = {}
+        self._origins = []  # (source, source_row) per buffered row
+        self._pending_rows = 0
+
+    def consumed(self, source):
+        """Source rows already persisted for a split (resume offset)."""
+        return self.manifest["consumed"].get(source, 0)
+
+    def add(self, embeddings, metadata, source, positions):
+        """
+        Buffers one encoded batch.
+
+        Args:
+            embeddings: (n, dim) array
+            metadata: dict column -> list of n values
+            source: split name the rows came from
+            positions: source row index of each of the n rows
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if not len(embeddings):
+            return
+
+        self._vectors.append(embeddings)
+        for name, values in metadata.items():
+            self._columns.setdefault(name, []).extend(values)
+        self._origins.extend((source, p) for p in positions)
+        self._pending_rows += len(embeddings)
+
+        while self._pending_rows >= self.shard_size:
+            self._write_shard(self.shard_size)
+
+    def close(self):
+        """Writes the final partial shard."""
+        if self._pending_rows:
+            self._write_shard(self._pending_rows)
+
+    def _write_shard(self, n_rows):
+        vectors = np.vstack(self._vectors)
+        shard_vectors, rest = vectors[:n_rows], vectors[n_rows:]
+
+        name = f"shard_{len(self.manifest['shards']):05d}"
+        shard_dir = os.path.join(self.out_dir, name)
+        os.makedirs(shard_dir, exist_ok=True)
+
+        np.save(os.path.join(shard_dir, "embeddings.npy"), shard_vectors)
+        for column, values in self._columns.items():
+            np.save(os.path.join(shard_dir, f"{column}.npy"), np.asarray(values[:n_rows]))
+
+        self.manifest["dim"] = int(shard_vectors.shape[1])
+        self.manifest["shards"].append({
+            "name": name,
+            "rows": int(n_rows),
+            "start": self.manifest["total_rows"],
+            "columns": sorted(self._columns),
+        })
+        self.manifest["total_rows"] += int(n_rows)
+
+        # Source progress only advances past rows that are now on disk
+        for source, position in self._origins[:n_rows]:
+            if position + 1 > self.consumed(source):
+                self.manifest["consumed"][source] = position + 1
+
+        _write_json_atomic(self.manifest_path, self.manifest)
+
+        self._vectors = [rest] if len(rest) else []
+        self._columns = {k: v[n_rows:] for k, v in self._columns.items()}
+        self._origins = self._origins[n_rows:]
+        self._pending_rows = len(rest)
+
+
+class EmbeddingShards:
+    """
+    Read side of a shard directory. Shards are memory-mapped independently,
+    so reading one shard never loads the others.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+
+    def __len__(self):
+        return self.manifest["total_rows"]
+
+    @property
+    def dim(self):
+        return self.manifest["dim"]
+
+    def load_shard(self, shard, mmap=True):
+        """Returns (embeddings, {column: array}) for one manifest entry."""
+        shard_dir = os.path.join(self.path, shard["name"])
+        mode = "r" if mmap else None
+        embeddings = np.load(os.path.join(shard_dir, "embeddings.npy"), mmap_mode=mode)
+        columns = {
+            name: np.load(os.path.join(shard_dir, f"{name}.npy"), mmap_mode=mode)
+            for name in shard.get("columns", [])
+        }
+        return embeddings, columns
+
+    def iter_shards(self, mmap=True):
+        for shard in self.manifest["shards"]:
+            yield self.load_shard(shard, mmap=mmap)
+
+    def load_matrix(self):
+        """Concatenates all shards into one in-memory float32 matrix."""
+        out = np.empty((len(self), self.dim), dtype=np.float32)
+        for shard in self.manifest["shards"]:
+            embeddings, _ = self.load_shard(shard)
+            out[shard["start"]:shard["start"] + shard["rows"]] = embeddings
+        return out
@@ -1,17 +1,28 @@
-from sentence_transformers import CrossEncoder
+import functools
+
+import numpy as np
+
+from rerank.token_ids import CROSS_MAX_TOKENS
+from utils.model_loading import load_cross_encoder
+from utils.metrics import timed
 
 
 class CrossEncoderReranker:
     """
     Cross-encoder re-ranker that PRESERVES candidate metadata.
+
+    Candidates carrying pre-tokenized case ids (`cross_token_ids`, filled at
+    ingestion) are fed to the model as ids: only the query is tokenized per
+    request, instead of re-tokenizing every long judgment just to truncate it.
     """
 
     def __init__(self):
-        self.model = CrossEncoder(
-            "cross-encoder/ms-marco-MiniLM-L-6-v2"
-        )
+        self.model = load_cross_encoder()
+        self.tokenizer = getattr(self.model, "tokenizer", None)
+        # Cascade reranking scores one query in several batches
+        self._query_ids = functools.lru_cache(maxsize=256)(self._tokenize)
 
-    def rerank(self, query_text, candidates, top_k=10):
+    def rerank(self, query_text, candidates, top_k=10, timings=None):
         """
         Adds cross_score to each candidate WITHOUT
         losing existing fields.
@@ -20,13 +31,12 @@ class CrossEncoderReranker:
         if not candidates:
             return []
 
-        # Prepare pairs for cross-encoder
-        pairs = [
-            (query_text, c.get("full_text", ""))
-            for c in candidates
-        ]
-
-        scores = self.model.predict(pairs)
+        scores = self.predict(
+            query_text,
+            [c.get("full_text", "") for c in candidates],
+            [c.get("cross_token_ids") for c in candidates],
+            timings=timings,
+        )
 
         # IMPORTANT: mutate existing candidate dicts
         for candidate, score in zip(candidates, scores):
@@ -40,3 +50,90 @@ class CrossEncoderReranker:
         )
 
         return reranked[:top_k]
+
+    def predict(self, query_text, texts, token_ids=None, timings=None):
+        """
+        Cross-encoder scores (array) of the query against each case text,
+        in order. `token_ids` optionally holds each case's pre-tokenized ids
+        (None entries are tokenized from the text).
+        """
+        if not texts:
+            return np.empty(0, dtype=np.float32)
+        if token_ids is None:
+            token_ids = [None] * len(texts)
+
+        with timed("cross_encoder", timings):
+            if self._can_predict_from_ids():
+                scores = self._predict_from_ids(query_text, texts, token_ids)
+            else:
+                # Prepare pairs for cross-encoder
+                pairs = [(query_text, text) for text in texts]
+                scores = self.model.predict(pairs)
+
+        return np.asarray(scores, dtype=np.float32)
+
+    # --------------------------------------------------
+    # Pre-tokenized path
+    # --------------------------------------------------
+    def _can_predict_from_ids(self):
+        config = getattr(getattr(self.model, "model", None), "config", None)
+        return (
+            self.tokenizer is not None
+            and getattr(config, "num_labels", None) == 1
+        )
+
+    def _max_length(self):
+        return (
+            getattr(self.model, "max_length", None)
+            or min(self.tokenizer.model_max_length, CROSS_MAX_TOKENS)
+        )
+
+    def _tokenize(self, text):
+        return self.tokenizer(
+            text,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=self._max_length(),
+        )["input_ids"]
+
+    def _predict_from_ids(self, query_text, texts, token_ids):
+        """
+        Same scores as model.predict(pairs): ids are combined and truncated
+        (longest first) the way the tokenizer would for a text pair.
+        """
+        import torch
+
+        query_ids = self._query_ids(query_text)
+        max_length = self._max_length()
+
+        features = []
+        for text, case_ids in zip(texts, token_ids):
+            if case_ids is None:
+                # Not pre-tokenized (ingested before the column existed)
+                case_ids = self._tokenize(text)
+            else:
+                case_ids = case_ids.tolist()
+
+            features.append(self.tokenizer.prepare_for_model(
+                query_ids,
+                case_ids,
+                truncation="longest_first",
+                max_length=max_length,
+            ))
+
+        batch = self.tokenizer.pad(features, return_tensors="pt")
+        device = next(self.model.model.parameters()).device
+        batch = {name: tensor.to(device) for name, tensor in batch.items()}
+
+        with torch.inference_mode():
+            logits = self.model.model(**batch).logits
+
+        # sentence-transformers >= 3 names it activation_fn
+        activation = (
+            getattr(self.model, "activation_fn", None)
+            or getattr(self.model, "default_activation_function", None)
+        )
+        if activation is not None:
+            logits = activation(logits)
+
+        return logits[:, 0].float().cpu().numpy()
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+
+from utils.model_loading import CROSS_ENCODER_MODEL_NAME
+
+# Case tokens kept per row. A (query, case) pair never exceeds the
+# cross-encoder's max_length, so nothing past this can reach the model.
+CROSS_MAX_TOKENS = int(os.getenv("CROSS_MAX_TOKENS", "512"))
+
+# Stored as little-endian uint16 (2 bytes / token); fits any vocab < 65536
+TOKEN_DTYPE = np.dtype("<u2")
+
+
+def tokenize_cases(tokenizer, texts, max_tokens=CROSS_MAX_TOKENS):
+    """
+    Cross-encoder token ids of each case text, without special tokens and
+    truncated to max_tokens, packed as bytes for the cross_token_ids column.
+    """
+    if tokenizer.vocab_size > np.iinfo(TOKEN_DTYPE).max:
+        raise ValueError(
+            f"Vocabulary of {tokenizer.vocab_size} tokens does not fit {TOKEN_DTYPE}"
+        )
+    if not texts:
+        return []
+
+    encoded = tokenizer(
+        list(texts),
+        add_special_tokens=False,
+        truncation=True,
+        max_length=max_tokens,
+    )["input_ids"]
+    return [np.asarray(ids, dtype=TOKEN_DTYPE).tobytes() for ids in encoded]
+
+
+def ids_from_bytes(blob):
+    """Inverse of tokenize_cases for one stored value."""
+    return np.frombuffer(blob, dtype=TOKEN_DTYPE)
+
+
+def usable_token_ids(row):
+    """
+    The row's stored ids if they were produced by the configured
+    cross-encoder's tokenizer, else None.
+    """
+    blob = row.get("cross_token_ids")
+    if blob is None or row.get("cross_token_model") != CROSS_ENCODER_MODEL_NAME:
+        return None
+    return ids_from_bytes(blob)
@@ -0,0 +1,77 @@
+import numpy as np
+
+from rerank.token_ids import usable_token_ids
+
+# Decision labels as small integer codes (0 = missing / unknown)
+DECISION_CODES = {"accepted": 1, "rejected": 2}
+UNKNOWN_DECISION = 0
+
+# Characters of the case text used when no stored summary exists
+SUMMARY_FALLBACK_CHARS = 300
+
+
+def _object_array(values):
+    # np.array() would try to unpack rows / tuples into extra dimensions
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class CandidateSet:
+    """
+    Candidates of one query as parallel columns: case ids, embedding and
+    cross-encoder scores (NaN until reranked), decision codes and a
+    has-reason flag.
+
+    The database rows (texts, token ids) are referenced, never copied, and
+    per-candidate dicts are only built by to_dicts() for the final results.
+    """
+
+    def __init__(self, case_ids, embed_scores, rows):
+        self.case_ids = _object_array(list(case_ids))
+        self.embed_scores = np.asarray(embed_scores, dtype=np.float32)
+        self.cross_scores = np.full(len(self.case_ids), np.nan, dtype=np.float32)
+        self.decision_codes = np.array(
+            [DECISION_CODES.get(row["decision"], UNKNOWN_DECISION) for row in rows],
+            dtype=np.int8,
+        )
+        self.has_reason = np.array(
+            [bool(row["decision_reason"]) for row in rows], dtype=bool
+        )
+        self.rows = _object_array(list(rows))
+
+    def __len__(self):
+        return len(self.case_ids)
+
+    @property
+    def reranked(self):
+        return ~np.isnan(self.cross_scores)
+
+    def texts(self, positions):
+        return [row["text"] or "" for row in self.rows[positions]]
+
+    def token_ids(self, positions):
+        """Pre-tokenized cross-encoder ids per candidate (None where unusable)."""
+        return [usable_token_ids(row) for row in self.rows[positions]]
+
+    def to_dicts(self, positions):
+        """Response dicts for the candidates at `positions`, in that order."""
+        results = []
+        for i in positions:
+            row = self.rows[i]
+            summary = row["summary"]
+            if not summary:
+                summary = row["text"][:SUMMARY_FALLBACK_CHARS] + "..."
+
+            candidate = {
+                "case_id": self.case_ids[i],
+                "embed_score": float(self.embed_scores[i]),
+                "decision": row["decision"],
+                "decision_reason": row["decision_reason"],
+                "summary": summary,
+                "full_text": row["text"],
+            }
+            if not np.isnan(self.cross_scores[i]):
+                candidate["cross_score"] = float(self.cross_scores[i])
+            results.append(candidate)
+        return results
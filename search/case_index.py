@@ -0,0 +1,518 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from search.sharded_search import ScannerClosed, maybe_build_scanner
+
+# Index only the canonical case of each near-duplicate cluster
+# (see database/near_duplicates.py and the case_duplicates table)
+CANONICAL_ONLY = os.getenv("INDEX_CANONICAL_ONLY", "0") == "1"
+
+# Auto-compact once the live (delta) segment grows past this many rows
+DELTA_COMPACT_ROWS = 20_000
+
+# Rows scored per block by range (threshold) searches
+RANGE_BLOCK_ROWS = 65_536
+
+# Immutable view of the index. Readers grab one reference and never lock.
+# `scanner` optionally serves the main segment from worker processes;
+# otherwise `prefilter` optionally scans it in two passes (PCA, then exact).
+_Snapshot = namedtuple(
+    "_Snapshot", ["main_ids", "main", "delta_ids", "delta", "scanner", "prefilter"]
+)
+
+
+def _indexable_cases_sql(columns, where=None):
+    conditions = [where] if where else []
+    if CANONICAL_ONLY:
+        conditions.append(
+            "NOT EXISTS ("
+            "SELECT 1 FROM case_duplicates d WHERE d.case_id = c.case_id)"
+        )
+    sql = f"SELECT {columns} FROM cases c"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql
+
+
+def parse_embedding(value):
+    """Stored embeddings are FLOAT8[] or a JSON serialized list of floats."""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        norm = np.linalg.norm(matrix)
+        return matrix / norm if norm > 0 else matrix
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _txid_snapshot(cursor):
+    """
+    (xmin, xmax) of a fresh database snapshot: every transaction below xmin
+    has ended, every transaction that has started is below xmax.
+    """
+    cursor.execute(
+        "SELECT txid_snapshot_xmin(s) AS snap_xmin, txid_snapshot_xmax(s) AS snap_xmax "
+        "FROM txid_current_snapshot() AS s;"
+    )
+    row = cursor.fetchone()
+    return row["snap_xmin"], row["snap_xmax"]
+
+
+def _ids_digest(case_ids):
+    """Order-independent 64-bit digest of a set of case ids (XOR of hashes)."""
+    digest = 0
+    for cid in case_ids:
+        digest ^= int.from_bytes(
+            hashlib.blake2b(str(cid).encode("utf-8"), digest_size=8).digest(), "little"
+        )
+    return digest
+
+
+def _build_prefilter(matrix):
+    # Imported here: search.pca_prefilter reuses _top_k from this module
+    from search.pca_prefilter import maybe_build_prefilter
+
+    return maybe_build_prefilter(matrix)
+
+
+def _top_k(scores, k):
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class CaseIndex:
+    """
+    In-memory cosine index over case embeddings.
+
+    Two segments:
+    - main: large, immutable, rebuilt only on compaction
+    - delta: small, receives live inserts between compactions
+
+    Writers build new arrays under a lock and publish them by swapping a
+    single snapshot reference, so searches never wait on ingestion.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.version = 0
+        # Highest cases.id seen in the database (incremental sync watermark)
+        self.db_watermark = 0
+        # Ids below the watermark not seen yet: drawn by a transaction that
+        # may still commit, or rolled back / deleted. id -> xmax of the
+        # snapshot taken when the gap was found (see sync_from_database)
+        self._id_gaps = {}
+        self._sync_lock = threading.Lock()
+        # Compact on append once the delta reaches DELTA_COMPACT_ROWS
+        self.auto_compact = True
+        # case_id -> global row over main + delta. Rows keep their number
+        # across compaction because delta is appended to main in order.
+        self._row_of = {}
+        # _ids_digest() of every indexed case id, maintained on writes
+        self._ids_digest = 0
+        self._write_lock = threading.Lock()
+        # Held for a whole compaction, which builds outside _write_lock
+        self._compact_lock = threading.Lock()
+        empty = np.empty((0, dim), dtype=np.float32)
+        self._snapshot = _Snapshot([], empty, [], empty, None, None)
+        # Replacement index once retired by a rebuild (see hand_over)
+        self._successor = None
+        # Searches currently pinning this index (see reading)
+        self._readers = 0
+        self._readers_changed = threading.Condition()
+
+    # --------------------------------------------------
+    # Loading
+    # --------------------------------------------------
+    @classmethod
+    def from_database(cls, db, batch_size=5000):
+        """Builds the index from every row of the cases table."""
+        conn = db.get_connection()
+        # Named (server-side) cursor so the full table is never in memory twice
+        cursor = conn.cursor(name="case_index_load")
+        cursor.itersize = batch_size
+        cursor.execute(_indexable_cases_sql("c.id, c.case_id, c.embedding"))
+
+        ids, vectors = [], []
+        seen_ids = []
+        for row in cursor:
+            seen_ids.append(row["id"])
+            if row["embedding"] is None:
+                continue
+            ids.append(row["case_id"])
+            vectors.append(parse_embedding(row["embedding"]))
+        cursor.close()
+
+        # Taken after the scan: any transaction still holding an id below
+        # the watermark started before it
+        snapshot_cursor = conn.cursor()
+        _, xmax = _txid_snapshot(snapshot_cursor)
+        snapshot_cursor.close()
+        conn.close()
+
+        dim = len(vectors[0]) if vectors else 384
+        index = cls(dim=dim)
+        seen_ids = np.asarray(seen_ids, dtype=np.int64)
+        if len(seen_ids):
+            index.db_watermark = int(seen_ids.max())
+            gaps = np.setdiff1d(
+                np.arange(1, index.db_watermark + 1, dtype=np.int64), seen_ids
+            )
+            index._id_gaps = dict.fromkeys(gaps.tolist(), xmax)
+        if ids:
+            index._publish_main(ids, normalize_rows(np.vstack(vectors)))
+        return index
+
+    def _publish_main(self, ids, matrix):
+        scanner = maybe_build_scanner(matrix)
+        if scanner is not None:
+            # Read the shared segment instead of keeping a private copy
+            matrix = scanner.matrix
+        prefilter = _build_prefilter(matrix) if scanner is None else None
+        digest = _ids_digest(ids)
+        with self._write_lock:
+            old = self._snapshot
+            self._row_of = {cid: i for i, cid in enumerate(ids)}
+            self._ids_digest = digest
+            empty = np.empty((0, self.dim), dtype=np.float32)
+            self._snapshot = _Snapshot(list(ids), matrix, [], empty, scanner, prefilter)
+            self.version += 1
+        if old.scanner is not None:
+            old.scanner.close()
+
+    @contextlib.contextmanager
+    def reading(self):
+        """Pins the index for the duration of a search (see wait_for_readers)."""
+        with self._readers_changed:
+            self._readers += 1
+        try:
+            yield self
+        finally:
+            with self._readers_changed:
+                self._readers -= 1
+                self._readers_changed.notify_all()
+
+    def wait_for_readers(self, timeout):
+        """Waits until no search pins the index. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._readers_changed:
+            while self._readers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._readers_changed.wait(remaining)
+        return True
+
+    def close(self):
+        """Stops shard worker processes, if any."""
+        if self._snapshot.scanner is not None:
+            self._snapshot.scanner.close()
+
+    # --------------------------------------------------
+    # Reads
+    # --------------------------------------------------
+    def __len__(self):
+        snap = self._snapshot
+        return len(snap.main_ids) + len(snap.delta_ids)
+
+    def __contains__(self, case_id):
+        return case_id in self._row_of
+
+    def corpus_key(self):
+        """
+        Corpus version comparable across processes and restarts (unlike
+        `version`): indexed row count and a digest of the indexed case ids,
+        so two workers that each appended a different case never share it.
+        """
+        return f"{len(self)}:{self._ids_digest:016x}"
+
+    def describe(self):
+        snap = self._snapshot
+        return {
+            "version": self.version,
+            "corpus_key": self.corpus_key(),
+            "size": len(snap.main_ids) + len(snap.delta_ids),
+            "delta_rows": len(snap.delta_ids),
+            "db_watermark": self.db_watermark,
+            "id_gaps": len(self._id_gaps),
+            "sharded": snap.scanner is not None,
+            "pca_dims": snap.prefilter.dims if snap.prefilter is not None else None,
+        }
+
+    def search(self, query_vector, top_k=10):
+        """
+        Returns [(case_id, cosine_score), ...] best first.
+        """
+        snap = self._snapshot
+        query = normalize_rows(query_vector)
+
+        ids, scores = [], []
+
+        if snap.main_ids:
+            rows, row_scores = self._scan_main(snap, query, top_k)
+            ids.extend(snap.main_ids[i] for i in rows)
+            scores.extend(row_scores.tolist())
+
+        if snap.delta_ids:
+            delta_scores = snap.delta @ query
+            for i in _top_k(delta_scores, top_k):
+                ids.append(snap.delta_ids[i])
+                scores.append(float(delta_scores[i]))
+
+        order = _top_k(np.asarray(scores, dtype=np.float32), top_k)
+        return [(ids[i], scores[i]) for i in order]
+
+    def range_search(self, query_vector, min_score, max_results=None,
+                     block_rows=RANGE_BLOCK_ROWS):
+        """
+        Yields lists of (case_id, cosine_score) for every case scoring at
+        least `min_score`, one list per scanned block of rows (best first
+        within a block, not across blocks). Stops after `max_results` hits.
+        """
+        snap = self._snapshot
+        query = normalize_rows(query_vector)
+        remaining = max_results
+
+        for ids, matrix in ((snap.main_ids, snap.main), (snap.delta_ids, snap.delta)):
+            for start in range(0, len(ids), block_rows):
+                scores = matrix[start:start + block_rows] @ query
+                rows = np.flatnonzero(scores >= min_score)
+                if not len(rows):
+                    continue
+                rows = rows[np.argsort(-scores[rows])]
+                if remaining is not None:
+                    rows = rows[:remaining]
+                    remaining -= len(rows)
+                yield [(ids[start + i], float(scores[i])) for i in rows]
+                if remaining == 0:
+                    return
+
+    @staticmethod
+    def _scan_main(snap, query, top_k):
+        if snap.scanner is not None:
+            try:
+                return snap.scanner.search(query, top_k)
+            except ScannerClosed:
+                # Swapped out by a compaction mid-query; scan locally
+                pass
+        if snap.prefilter is not None:
+            return snap.prefilter.search(snap.main, query, top_k)
+        main_scores = snap.main @ query
+        rows = _top_k(main_scores, top_k)
+        return rows, main_scores[rows]
+
+    def get_vectors(self, case_ids):
+        """
+        Returns (found_ids, matrix) with the normalised stored embeddings of
+        the given cases, in request order. Unknown ids are dropped.
+        """
+        snap = self._snapshot
+        n_main = len(snap.main_ids)
+        n_total = n_main + len(snap.delta_ids)
+
+        found, vectors = [], []
+        for cid in case_ids:
+            row = self._row_of.get(cid)
+            if row is None or row >= n_total:
+                continue
+            found.append(cid)
+            vectors.append(snap.main[row] if row < n_main else snap.delta[row - n_main])
+
+        if not vectors:
+            return [], np.empty((0, self.dim), dtype=np.float32)
+        return found, np.vstack(vectors)
+
+    # --------------------------------------------------
+    # Writes
+    # --------------------------------------------------
+    def append(self, case_ids, embeddings):
+        """
+        Adds new cases to the live segment. Ids already indexed are skipped.
+        Returns the number of rows added.
+        """
+        embeddings = normalize_rows(embeddings)
+        if embeddings.ndim == 1:
+            embeddings = embeddings[None, :]
+
+        with self._write_lock:
+            successor = self._successor
+            if successor is None:
+                added, needs_compaction = self._append_locked(case_ids, embeddings)
+
+        if successor is not None:
+            # Retired by a rebuild: writers still holding this index forward
+            return successor.append(case_ids, embeddings)
+        if needs_compaction and self.auto_compact:
+            self.compact()
+        return added
+
+    def _append_locked(self, case_ids, embeddings):
+        keep = [
+            i for i, cid in enumerate(case_ids)
+            if cid not in self._row_of
+        ]
+        if not keep:
+            return 0, False
+
+        snap = self._snapshot
+        new_ids = [case_ids[i] for i in keep]
+        delta = np.vstack([snap.delta, embeddings[keep]])
+
+        base = len(snap.main_ids) + len(snap.delta_ids)
+        for offset, cid in enumerate(new_ids):
+            self._row_of[cid] = base + offset
+        self._ids_digest ^= _ids_digest(new_ids)
+        self._snapshot = _Snapshot(
+            snap.main_ids, snap.main, snap.delta_ids + new_ids, delta,
+            snap.scanner, snap.prefilter,
+        )
+        self.version += 1
+        return len(new_ids), len(snap.delta_ids) + len(new_ids) >= DELTA_COMPACT_ROWS
+
+    def hand_over(self, successor, since_row):
+        """
+        Retires this index in favour of a rebuilt one: rows appended at or
+        after global row `since_row` (i.e. while the successor was being
+        built) are replayed into it, and later appends are forwarded to it.
+        The successor's version is moved past this one so version-keyed
+        caches never confuse the two. Returns the number of rows replayed.
+        """
+        with self._write_lock:
+            snap = self._snapshot
+            n_main = len(snap.main_ids)
+            if since_row < n_main:
+                ids = snap.main_ids[since_row:] + snap.delta_ids
+                vectors = np.vstack([snap.main[since_row:], snap.delta])
+            else:
+                ids = snap.delta_ids[since_row - n_main:]
+                vectors = snap.delta[since_row - n_main:]
+
+            replayed = successor.append(ids, vectors) if ids else 0
+            successor.version = max(successor.version, self.version) + 1
+            self._successor = successor
+        return replayed
+
+    def compact(self):
+        """
+        Merges the delta segment into main. Readers keep using the old
+        snapshot until the new one is published.
+
+        The merged segment is built without blocking writers; rows appended
+        meanwhile stay in the new delta. Returns the number of rows merged
+        (0 if another compaction is already running).
+        """
+        if not self._compact_lock.acquire(blocking=False):
+            return 0
+        try:
+            snap = self._snapshot
+            if not snap.delta_ids:
+                return 0
+            merged = len(snap.delta_ids)
+            main = np.vstack([snap.main, snap.delta])
+            scanner = maybe_build_scanner(main)
+            if scanner is not None:
+                main = scanner.matrix
+            prefilter = _build_prefilter(main) if scanner is None else None
+
+            with self._write_lock:
+                current = self._snapshot
+                if current.main_ids is not snap.main_ids:
+                    # Main was replaced by a full reload in the meantime
+                    if scanner is not None:
+                        scanner.close()
+                    return 0
+                # Appends only extend delta, so its first `merged` rows are ours
+                self._snapshot = _Snapshot(
+                    snap.main_ids + snap.delta_ids,
+                    main,
+                    current.delta_ids[merged:],
+                    current.delta[merged:],
+                    scanner,
+                    prefilter,
+                )
+                self.version += 1
+        finally:
+            self._compact_lock.release()
+
+        if snap.scanner is not None:
+            snap.scanner.close()
+        return merged
+
+    def sync_from_database(self, db):
+        """
+        Picks up rows inserted out-of-band (e.g. by the batch ingestion
+        scripts) and appends them to the live segment. Only rows above the
+        id watermark, plus the known gaps below it, are read (index on
+        cases.id), not the whole table.
+
+        Ids are drawn at insert time but become visible at commit, so an id
+        below the watermark may still show up. Every unseen id is kept as a
+        gap together with the xmax of a snapshot taken when it was found;
+        it is re-checked on each sync and dropped only once a later
+        snapshot's xmin has passed that xmax, i.e. once every transaction
+        that could have drawn it has ended.
+        """
+        with self._sync_lock:
+            return self._sync_locked(db)
+
+    def _sync_locked(self, db):
+        conn = db.get_connection()
+        cursor = conn.cursor()
+
+        # Before the read: gaps whose transactions had all ended by now are
+        # visible to the read below if they were ever committed
+        xmin_before, _ = _txid_snapshot(cursor)
+        gaps = list(self._id_gaps)
+        cursor.execute(
+            _indexable_cases_sql(
+                "c.id, c.case_id", where="(c.id > %s OR c.id = ANY(%s))"
+            ),
+            (self.db_watermark, gaps),
+        )
+        recent = cursor.fetchall()
+        # After the read: a transaction holding a new gap started before it
+        _, xmax_after = _txid_snapshot(cursor)
+
+        missing = [r["case_id"] for r in recent if r["case_id"] not in self]
+        seen = {r["id"] for r in recent}
+        for gap in gaps:
+            if gap in seen or self._id_gaps[gap] <= xmin_before:
+                del self._id_gaps[gap]
+        if seen:
+            top = max(seen)
+            for gap in range(self.db_watermark + 1, top):
+                if gap not in seen:
+                    self._id_gaps[gap] = xmax_after
+            self.db_watermark = max(self.db_watermark, top)
+
+        added = 0
+        if missing:
+            cursor.execute(
+                "SELECT case_id, embedding FROM cases WHERE case_id = ANY(%s);",
+                (missing,),
+            )
+            rows = [r for r in cursor.fetchall() if r["embedding"] is not None]
+            if rows:
+                added = self.append(
+                    [r["case_id"] for r in rows],
+                    np.vstack([parse_embedding(r["embedding"]) for r in rows]),
+                )
+
+        cursor.close()
+        conn.close()
+        return added
@@ -0,0 +1,218 @@
+import os
+import threading
+
+from psycopg2.extras import execute_values
+
+from database.near_duplicates import NearDuplicateDetector, record_duplicates
+from rerank.token_ids import tokenize_cases
+from search.case_index import CANONICAL_ONLY
+from utils.metrics import timed
+from utils.model_loading import CROSS_ENCODER_MODEL_NAME, load_cross_tokenizer
+from utils.text_preprocessing import extractive_summary
+
+# Number of cases embedded / written per batch
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+VALID_DECISIONS = {"accepted", "rejected", None}
+
+# Stored texts streamed per round trip when feeding the duplicate detector
+DETECTOR_FETCH_ROWS = 1000
+
+
+class CaseIngestor:
+    """
+    Online ingestion: embeds (and pre-tokenizes for the cross-encoder) new
+    cases in batches, writes them to Postgres and appends them to the
+    retriever's live in-memory index.
+
+    With INDEX_CANONICAL_ONLY, new cases also go through the near-duplicate
+    detector used by full ingestion: duplicates are stored and recorded in
+    case_duplicates (in the same transaction), but never indexed.
+    """
+
+    def __init__(self, retriever, batch_size=EMBED_BATCH_SIZE, tokenizer=None,
+                 canonical_only=CANONICAL_ONLY):
+        self.retriever = retriever
+        self.db = retriever.db
+        self.batch_size = batch_size
+        self.tokenizer = tokenizer or load_cross_tokenizer()
+        self.canonical_only = canonical_only
+        # One writer at a time keeps DB inserts and index appends in step
+        self._lock = threading.Lock()
+        # Built from the stored cases on first use, then fed every case
+        # stored since (by any worker) before each batch is checked
+        self._detector = None
+        self._detector_watermark = 0
+
+    @staticmethod
+    def validate(record):
+        """Returns an error message for an invalid record, else None."""
+        if not record.get("case_id"):
+            return "missing case_id"
+        text = record.get("text")
+        if not text or not isinstance(text, str):
+            return "missing text"
+        if record.get("decision") not in VALID_DECISIONS:
+            return "decision must be 'accepted' or 'rejected'"
+        return None
+
+    def ingest(self, records):
+        """
+        Ingests an iterable of case dicts (case_id, text, decision,
+        decision_reason, case_source). Records are consumed lazily so large
+        uploads are never fully materialised.
+
+        Returns:
+            dict with inserted / skipped counts and per-record errors
+        """
+        summary = {"inserted": 0, "skipped": 0, "duplicates": 0, "errors": []}
+        batch = []
+
+        for record in records:
+            error = self.validate(record)
+            if error:
+                summary["errors"].append({"case_id": record.get("case_id"), "error": error})
+                continue
+
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self._ingest_batch(batch, summary)
+                batch = []
+
+        if batch:
+            self._ingest_batch(batch, summary)
+
+        return summary
+
+    def _ingest_batch(self, batch, summary):
+        index = self.retriever.index or self.retriever.load_index()
+
+        # Skip ids we already serve before paying for the embedding
+        fresh = [r for r in batch if r["case_id"] not in index]
+        summary["skipped"] += len(batch) - len(fresh)
+        if not fresh:
+            return
+
+        with timed("ingest_embedding"):
+            embeddings = self.retriever.encode(
+                [r["text"] for r in fresh], batch_size=self.batch_size
+            )
+
+        with timed("ingest_tokenization"):
+            token_ids = tokenize_cases(self.tokenizer, [r["text"] for r in fresh])
+
+        with self._lock:
+            with timed("ingest_db_write"):
+                inserted_ids, duplicate_ids = self._insert(fresh, embeddings, token_ids)
+
+            inserted = set(inserted_ids) - duplicate_ids
+            keep = [i for i, r in enumerate(fresh) if r["case_id"] in inserted]
+            if keep:
+                index.append(
+                    [fresh[i]["case_id"] for i in keep], embeddings[keep]
+                )
+
+        summary["inserted"] += len(inserted_ids)
+        summary["skipped"] += len(fresh) - len(inserted_ids)
+        summary["duplicates"] += len(duplicate_ids)
+
+    def _refresh_detector(self, cursor):
+        """Feeds the detector every stored case it has not seen, in id order."""
+        if self._detector is None:
+            self._detector = NearDuplicateDetector()
+            self._detector_watermark = 0
+            print("[INGEST] Building near-duplicate detector from stored cases...")
+
+        cursor.execute(
+            "SELECT id, case_id, text FROM cases WHERE id > %s ORDER BY id;",
+            (self._detector_watermark,),
+        )
+        while True:
+            rows = cursor.fetchmany(DETECTOR_FETCH_ROWS)
+            if not rows:
+                break
+            for row in rows:
+                self._detector.add(row["case_id"], row["text"] or "")
+            self._detector_watermark = rows[-1]["id"]
+
+    def _find_duplicates(self, cursor, records):
+        """(case_id, canonical_id, similarity) for records that duplicate a stored case."""
+        self._refresh_detector(cursor)
+        duplicates = []
+        for r in records:
+            match = self._detector.add(r["case_id"], r["text"])
+            if match:
+                duplicates.append((r["case_id"], match[0], match[1]))
+        return duplicates
+
+    def _insert(self, records, embeddings, token_ids):
+        """
+        Inserts a batch; returns the case_ids that were actually new and the
+        subset of them recorded as near-duplicates.
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+
+        rows = [
+            (
+                r["case_id"],
+                embedding.tolist(),
+                r["text"],
+                r.get("decision"),
+                r.get("decision_reason"),
+                r.get("case_source") or "api",
+                ids,
+                CROSS_ENCODER_MODEL_NAME,
+                extractive_summary(r["text"]),
+                len(r["text"]),
+            )
+            for r, embedding, ids in zip(records, embeddings, token_ids)
+        ]
+
+        try:
+            # Checked before the insert: afterwards the refresh would feed
+            # the batch to the detector as already stored cases
+            duplicates = (
+                self._find_duplicates(cursor, records) if self.canonical_only else []
+            )
+
+            inserted = execute_values(
+                cursor,
+                """
+                INSERT INTO cases (
+                    case_id,
+                    embedding,
+                    text,
+                    decision,
+                    decision_reason,
+                    case_source,
+                    cross_token_ids,
+                    cross_token_model,
+                    summary,
+                    text_length
+                )
+                VALUES %s
+                ON CONFLICT (case_id) DO NOTHING
+                RETURNING case_id;
+                """,
+                rows,
+                fetch=True,
+            )
+            inserted_ids = [row["case_id"] for row in inserted]
+
+            # Recorded in the same transaction, so the index sync never sees
+            # a duplicate before its case_duplicates row
+            new = set(inserted_ids)
+            duplicates = [d for d in duplicates if d[0] in new]
+            record_duplicates(cursor, duplicates)
+            conn.commit()
+        except Exception:
+            # The detector may hold cases that were never stored; rebuild it
+            self._detector = None
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+        return inserted_ids, {d[0] for d in duplicates}
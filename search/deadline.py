@@ -0,0 +1,46 @@
+import math
+import time
+
+from utils.metrics import Counter, register
+
+DEADLINES_EXCEEDED = register(Counter(
+    "case_search_deadline_exceeded_total",
+    "Searches abandoned because their deadline passed, by the stage not started.",
+    ["stage"],
+))
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage):
+        super().__init__(f"Request deadline exceeded before {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Absolute point in time (perf_counter clock) after which the result of a
+    request is no longer wanted. Pipeline stages call check() before
+    starting, so expired work is abandoned instead of finished for nobody.
+    """
+
+    def __init__(self, timeout_ms, start=None):
+        start = time.perf_counter() if start is None else start
+        self.expires_at = start + timeout_ms / 1000
+
+    @classmethod
+    def from_ms(cls, timeout_ms, start=None):
+        """Deadline, or None for a missing / non-positive / non-finite timeout."""
+        if not timeout_ms or not math.isfinite(timeout_ms) or timeout_ms <= 0:
+            return None
+        return cls(timeout_ms, start=start)
+
+    def remaining_ms(self):
+        return (self.expires_at - time.perf_counter()) * 1000
+
+    def expired(self):
+        return time.perf_counter() >= self.expires_at
+
+    def check(self, stage):
+        if self.expired():
+            DEADLINES_EXCEEDED.inc(stage=stage)
+            raise DeadlineExceeded(stage)
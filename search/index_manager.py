@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+
+from search.case_index import CaseIndex
+
+# Longest wait for searches still pinning a replaced index before it is
+# closed anyway (its sharded scan then falls back to a local scan)
+INDEX_DRAIN_TIMEOUT = float(os.getenv("INDEX_DRAIN_TIMEOUT", "30"))
+
+
+class IndexManager:
+    """
+    Rebuilds the retriever's CaseIndex from Postgres in a background thread
+    while the current one keeps serving, then swaps it in with a single
+    reference assignment.
+
+    Rows appended to the old index during the build are replayed into the
+    new one and later appends are forwarded to it (CaseIndex.hand_over), so
+    ingestion never pauses. The old index is closed once the searches that
+    pinned it have drained.
+    """
+
+    def __init__(self, retriever, drain_timeout=INDEX_DRAIN_TIMEOUT):
+        self.retriever = retriever
+        self.drain_timeout = drain_timeout
+        # Incremented on every swap (1 = the index loaded at startup)
+        self.generation = 1
+        self.state = "idle"  # idle | building | swapping | draining
+        self.last_rebuild = None
+        self._lock = threading.Lock()
+
+    def status(self):
+        status = {"generation": self.generation, "state": self.state}
+        if self.retriever.index is not None:
+            status.update(self.retriever.index.describe())
+        status["last_rebuild"] = self.last_rebuild
+        return status
+
+    def start_rebuild(self):
+        """Starts a background rebuild. Returns False if one is already running."""
+        with self._lock:
+            if self.state != "idle":
+                return False
+            self.state = "building"
+
+        threading.Thread(
+            target=self._rebuild_logged, name="index-rebuild", daemon=True
+        ).start()
+        return True
+
+    def _rebuild_logged(self):
+        try:
+            result = self.rebuild()
+            print(f"[INDEX] Rebuild: {result}")
+        except Exception as e:
+            print(f"[INDEX] Rebuild failed: {e}")
+
+    def rebuild(self):
+        """Builds a new index, swaps it in and drains the old one (blocking)."""
+        self.state = "building"
+        started_at = time.time()
+        start = time.perf_counter()
+        result = {"started_at": round(started_at, 3), "error": None}
+
+        try:
+            old = self.retriever.index or self.retriever.load_index()
+            # Everything appended from here on is replayed into the new index
+            since_row = len(old)
+
+            new = CaseIndex.from_database(self.retriever.db)
+            # Rows committed while the (long) initial scan ran
+            new.sync_from_database(self.retriever.db)
+            result["build_s"] = round(time.perf_counter() - start, 3)
+
+            self.state = "swapping"
+            result["replayed"] = old.hand_over(new, since_row)
+            self.retriever.index = new
+            self.generation += 1
+
+            self.state = "draining"
+            result["drained"] = old.wait_for_readers(self.drain_timeout)
+            old.close()
+
+            result.update({
+                "generation": self.generation,
+                "version": new.version,
+                "size": len(new),
+            })
+            return result
+        except Exception as e:
+            result["error"] = str(e)
+            raise
+        finally:
+            result["seconds"] = round(time.perf_counter() - start, 3)
+            self.last_rebuild = result
+            self.state = "idle"
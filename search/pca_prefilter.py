@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+
+from search.case_index import _top_k
+
+# Dimensions of the reduced (PCA) copy of the main segment scanned first
+# (0 = disabled, exact full-dimension scan). 64 or 128 for 384-dim embeddings.
+SEARCH_PCA_DIMS = int(os.getenv("SEARCH_PCA_DIMS", "0"))
+
+# Shortlist rescored at full dimension, as a multiple of the requested k
+SEARCH_PCA_SHORTLIST = int(os.getenv("SEARCH_PCA_SHORTLIST", "10"))
+
+# Rows sampled to fit the projection (the whole matrix is projected)
+PCA_FIT_ROWS = 50_000
+
+# Below this many rows the exact scan is cheap enough on its own
+PCA_MIN_ROWS = int(os.getenv("PCA_MIN_ROWS", "50000"))
+
+
+class PCAPrefilter:
+    """
+    Two-pass scan of a unit-norm embedding matrix: approximate scores on a
+    resident PCA projection pick a shortlist, which is rescored exactly
+    against the full-dimension rows.
+
+    With rows x ~ mean + P^T P (x - mean), q.x ranks like (P q).(P (x - mean))
+    (q.mean is the same for every row), so only the projected rows are kept.
+    """
+
+    def __init__(self, matrix, dims, shortlist_factor=SEARCH_PCA_SHORTLIST,
+                 fit_rows=PCA_FIT_ROWS, seed=0):
+        self.dims = min(dims, matrix.shape[1])
+        self.shortlist_factor = max(1, shortlist_factor)
+
+        sample = matrix
+        if len(matrix) > fit_rows:
+            rng = np.random.default_rng(seed)
+            sample = matrix[rng.choice(len(matrix), fit_rows, replace=False)]
+
+        self.mean = sample.mean(axis=0)
+        _, _, vt = np.linalg.svd(sample - self.mean, full_matrices=False)
+        self.components = np.ascontiguousarray(vt[:self.dims], dtype=np.float32)
+        self.reduced = self._project_rows(matrix)
+
+    def _project_rows(self, matrix, block_rows=100_000):
+        # Blocked so centering never copies the whole matrix at once
+        reduced = np.empty((len(matrix), self.dims), dtype=np.float32)
+        for start in range(0, len(matrix), block_rows):
+            block = matrix[start:start + block_rows]
+            reduced[start:start + len(block)] = (block - self.mean) @ self.components.T
+        return reduced
+
+    @property
+    def nbytes(self):
+        return self.reduced.nbytes + self.components.nbytes
+
+    def search(self, matrix, query, top_k, shortlist=None):
+        """(rows, exact scores) of the best top_k rows of `matrix`, best first."""
+        shortlist = shortlist or top_k * self.shortlist_factor
+        approx = self.reduced @ (self.components @ query)
+        candidates = _top_k(approx, shortlist)
+
+        exact = matrix[candidates] @ query
+        order = _top_k(exact, top_k)
+        return candidates[order], exact[order]
+
+
+def maybe_build_prefilter(matrix, dims=None):
+    """Returns a PCAPrefilter when enabled and the matrix is large enough."""
+    dims = SEARCH_PCA_DIMS if dims is None else dims
+    if dims <= 0 or dims >= matrix.shape[1] or len(matrix) < PCA_MIN_ROWS:
+        return None
+    return PCAPrefilter(matrix, dims)
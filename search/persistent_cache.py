@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.metrics import record_cache_lookup
+from utils.model_loading import CROSS_ENCODER_MODEL_NAME, EMBEDDING_MODEL_NAME
+from utils.text_preprocessing import normalize_query
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SQLite file shared by every API worker on the host ("" disables it).
+# Relative paths are resolved against the project root, not the working
+# directory, so every launch location shares one file.
+SEARCH_DISK_CACHE_PATH = os.getenv("SEARCH_DISK_CACHE_PATH", "cache/search_cache.sqlite")
+if SEARCH_DISK_CACHE_PATH:
+    SEARCH_DISK_CACHE_PATH = os.path.join(PROJECT_ROOT, SEARCH_DISK_CACHE_PATH)
+
+# Size bound of the live data in the file; the least recently used
+# entries are evicted beyond it
+SEARCH_DISK_CACHE_MB = float(os.getenv("SEARCH_DISK_CACHE_MB", "512"))
+
+# Size is checked every this many writes (per process)
+EVICT_CHECK_EVERY = 200
+
+# Once over the size bound, the oldest EVICT_FRACTION of each table is
+# dropped until the live data is below EVICT_TARGET of the bound
+EVICT_FRACTION = 0.1
+EVICT_TARGET = 0.8
+
+# A hit refreshes an entry's last-use time at most this often (seconds),
+# so that reads rarely turn into writes
+TOUCH_INTERVAL = 60
+
+# SQLite caps bound parameters per statement; stay well below it
+_LOOKUP_CHUNK = 500
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS results (
+        key BLOB PRIMARY KEY,
+        ranking TEXT NOT NULL,
+        last_used INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);",
+    """
+    CREATE TABLE IF NOT EXISTS cross_scores (
+        model TEXT NOT NULL,
+        query_sha BLOB NOT NULL,
+        case_id TEXT NOT NULL,
+        score REAL NOT NULL,
+        last_used INTEGER NOT NULL,
+        PRIMARY KEY (model, query_sha, case_id)
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX IF NOT EXISTS cross_scores_last_used ON cross_scores (last_used);",
+)
+
+
+def _sha(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def _query_sha(query_text):
+    # Normalized like the query part of result_key(), so queries differing
+    # only in whitespace share their cross-encoder scores
+    return _sha(normalize_query(query_text))
+
+
+def result_key(query_key, corpus_key, config):
+    """
+    Key of a ranking: the (normalized) query and its options, the corpus
+    version, the scoring / retrieval settings in `config` and both models,
+    so no worker ever serves a ranking computed against other data, models
+    or settings.
+    """
+    return _sha(json.dumps(
+        [query_key, corpus_key, config, EMBEDDING_MODEL_NAME, CROSS_ENCODER_MODEL_NAME],
+        separators=(",", ":"),
+    ))
+
+
+class PersistentSearchCache:
+    """
+    Second-level search cache in a local SQLite file (WAL mode), shared by
+    all API worker processes on the host and kept across restarts.
+
+    Holds final rankings (ids and scores, without case texts) keyed by
+    result_key(), and cross-encoder scores per (model, query, case), which
+    stay valid however the corpus grows. Failures are logged and treated
+    as misses: the cache never fails a search.
+    """
+
+    def __init__(self, path=SEARCH_DISK_CACHE_PATH, max_mb=SEARCH_DISK_CACHE_MB,
+                 cross_model=CROSS_ENCODER_MODEL_NAME):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.cross_model = cross_model
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self):
+        # Opened lazily per process: a SQLite connection must not cross a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    # --------------------------------------------------
+    # Rankings
+    # --------------------------------------------------
+    def get_results(self, key):
+        """The cached ranking (list of dicts) for a result_key(), or None."""
+        ranking = None
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT ranking, last_used FROM results WHERE key = ?;", (key,)
+                ).fetchone()
+                if row is not None:
+                    ranking = json.loads(row[0])
+                    now = int(time.time())
+                    if now - row[1] >= TOUCH_INTERVAL:
+                        conn.execute(
+                            "UPDATE results SET last_used = ? WHERE key = ?;", (now, key)
+                        )
+                        conn.commit()
+        except sqlite3.Error as e:
+            print(f"[DISK_CACHE] Result lookup failed: {e}")
+
+        record_cache_lookup("disk_results", ranking is not None)
+        return ranking
+
+    def put_results(self, key, ranking):
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, ranking, last_used) VALUES (?, ?, ?);",
+                    (key, json.dumps(ranking, separators=(",", ":")), int(time.time())),
+                )
+                conn.commit()
+                self._maybe_evict(conn)
+        except sqlite3.Error as e:
+            print(f"[DISK_CACHE] Result write failed: {e}")
+
+    # --------------------------------------------------
+    # Cross-encoder scores
+    # --------------------------------------------------
+    def get_cross_scores(self, query_text, case_ids):
+        """Returns {case_id: score} for the pairs present in the cache."""
+        found = {}
+        query_sha = _query_sha(query_text)
+        unique = list(dict.fromkeys(case_ids))
+        try:
+            with self._lock:
+                conn = self._connection()
+                stale = []
+                now = int(time.time())
+                for start in range(0, len(unique), _LOOKUP_CHUNK):
+                    chunk = unique[start:start + _LOOKUP_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"""
+                        SELECT case_id, score, last_used FROM cross_scores
+                        WHERE model = ? AND query_sha = ?
+                          AND case_id IN ({placeholders});
+                        """,
+                        [self.cross_model, query_sha, *chunk],
+                    ).fetchall()
+                    for case_id, score, last_used in rows:
+                        found[case_id] = score
+                        if now - last_used >= TOUCH_INTERVAL:
+                            stale.append(case_id)
+                if stale:
+                    conn.executemany(
+                        """
+                        UPDATE cross_scores SET last_used = ?
+                        WHERE model = ? AND query_sha = ? AND case_id = ?;
+                        """,
+                        [(now, self.cross_model, query_sha, cid) for cid in stale],
+                    )
+                    conn.commit()
+        except sqlite3.Error as e:
+            print(f"[DISK_CACHE] Cross score lookup failed: {e}")
+
+        for case_id in unique:
+            record_cache_lookup("disk_cross_scores", case_id in found)
+        return found
+
+    def put_cross_scores(self, query_text, scores):
+        """Stores {case_id: score} for one query."""
+        if not scores:
+            return
+        query_sha = _query_sha(query_text)
+        now = int(time.time())
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO cross_scores
+                        (model, query_sha, case_id, score, last_used)
+                    VALUES (?, ?, ?, ?, ?);
+                    """,
+                    [
+                        (self.cross_model, query_sha, case_id, float(score), now)
+                        for case_id, score in scores.items()
+                    ],
+                )
+                conn.commit()
+                self._maybe_evict(conn)
+        except sqlite3.Error as e:
+            print(f"[DISK_CACHE] Cross score write failed: {e}")
+
+    # --------------------------------------------------
+    # Eviction
+    # --------------------------------------------------
+    def size_bytes(self):
+        """Bytes of live (non-free) pages in the file."""
+        with self._lock:
+            return self._live_bytes(self._connection())
+
+    @staticmethod
+    def _live_bytes(conn):
+        page_size = conn.execute("PRAGMA page_size;").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count;").fetchone()[0]
+        free = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+        return (pages - free) * page_size
+
+    def _maybe_evict(self, conn):
+        """Drops the least recently used entries once over the size bound (lock held)."""
+        self._writes += 1
+        # First write, then every EVICT_CHECK_EVERY writes
+        if (self._writes - 1) % EVICT_CHECK_EVERY:
+            return
+        if self._live_bytes(conn) <= self.max_bytes:
+            return
+
+        # Freed pages are reused by later writes; the file itself does not shrink
+        evicted = 0
+        while self._live_bytes(conn) > self.max_bytes * EVICT_TARGET:
+            deleted = 0
+            for table, key_columns in (
+                ("results", "key"),
+                ("cross_scores", "model, query_sha, case_id"),
+            ):
+                count = conn.execute(f"SELECT count(*) FROM {table};").fetchone()[0]
+                deleted += conn.execute(
+                    f"""
+                    DELETE FROM {table} WHERE ({key_columns}) IN (
+                        SELECT {key_columns} FROM {table} ORDER BY last_used LIMIT ?
+                    );
+                    """,
+                    (max(1, int(count * EVICT_FRACTION)),),
+                ).rowcount
+            conn.commit()
+            if not deleted:
+                break
+            evicted += deleted
+        print(f"[DISK_CACHE] Evicted {evicted} least recently used entries")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
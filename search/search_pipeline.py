@@ -1,6 +1,19 @@
-import math
-from search.semantic_search_db import SemanticSearcherDB
+import copy
+import os
+import time
+
+import numpy as np
+
+from search.candidate_set import DECISION_CODES
+from search.case_index import CANONICAL_ONLY
+from search.pca_prefilter import SEARCH_PCA_DIMS, SEARCH_PCA_SHORTLIST
+from search.persistent_cache import SEARCH_DISK_CACHE_PATH, PersistentSearchCache, result_key
+from search.semantic_cache import SEMANTIC_CACHE_SERVE, SemanticQueryCache
+from search.semantic_search_db import SEARCH_NEGATIVE_WEIGHT, SemanticSearcherDB
 from rerank.cross_encoder_reranker import CrossEncoderReranker
+from utils.lru_cache import LRUCache
+from utils.metrics import Counter, register, timed
+from utils.text_preprocessing import normalize_query
 
 
 # ==================================================
@@ -11,6 +24,59 @@ CROSS_ENCODER_WEIGHT = 0.3
 DECISION_WEIGHT = 0.15
 REASONING_WEIGHT = 0.05
 
+# Feature scores behind the decision / reasoning weights
+ACCEPTED_SCORE, OTHER_DECISION_SCORE = 1.0, 0.7
+REASON_SCORE, NO_REASON_SCORE = 1.0, 0.8
+
+# Results returned per query (default of search(top_k=...))
+FINAL_TOP_K = 5
+
+# Candidates retrieved and reranked per query (raised to top_k if larger)
+RETRIEVAL_TOP_K = 10
+
+# Settings that shape a final ranking besides the query and the corpus;
+# part of the disk cache key, so workers on other settings never share rankings
+SCORING_CONFIG = {
+    "weights": [EMBEDDING_WEIGHT, CROSS_ENCODER_WEIGHT, DECISION_WEIGHT, REASONING_WEIGHT],
+    "features": [ACCEPTED_SCORE, OTHER_DECISION_SCORE, REASON_SCORE, NO_REASON_SCORE],
+    "retrieval_top_k": RETRIEVAL_TOP_K,
+    "canonical_only": CANONICAL_ONLY,
+    "pca": [SEARCH_PCA_DIMS, SEARCH_PCA_SHORTLIST],
+}
+
+# ==================================================
+# Cascade reranking
+# ==================================================
+# Candidates sent to the cross-encoder per call in cascade mode
+CASCADE_BATCH_SIZE = int(os.getenv("CASCADE_BATCH_SIZE", "3"))
+
+# Top-1 embedding score lead over top-2 that makes reranking unnecessary
+CASCADE_DECISIVE_MARGIN = float(os.getenv("CASCADE_DECISIVE_MARGIN", "0.1"))
+
+# Only candidates within this embedding score of the top-1 get reranked
+CASCADE_RERANK_WINDOW = float(os.getenv("CASCADE_RERANK_WINDOW", "0.15"))
+
+# Smoothing factor of the running per-pair cross-encoder cost estimate
+COST_EWMA_ALPHA = 0.2
+
+RERANK_PATHS = register(Counter(
+    "case_search_rerank_path_total",
+    "Searches by reranking path taken.",
+    ["path"],
+))
+
+# Fully reranked result lists kept per (query, index version) (0 disables)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+
+# Paths whose ranking is final (not cut short) and may be cached
+_COMPLETE_PATHS = ("full", "no_query_text")
+
+# Dropped from rankings kept by the semantic cache (re-fetched when served)
+_RANKING_TEXT_FIELDS = ("full_text", "summary")
+
+# Throwaway input used to trigger lazy initialisation before real traffic
+WARM_UP_QUERY = "The appellant challenged the order of the High Court."
+
 
 class CaseSearchPipeline:
     """
@@ -20,84 +86,345 @@ class CaseSearchPipeline:
     3) Weighted explainable scoring
     """
 
-    def __init__(self):
-        self.retriever = SemanticSearcherDB()
-        self.reranker = CrossEncoderReranker()
-
-    # --------------------------------------------------
-    # Helper functions
-    # --------------------------------------------------
-    def _decision_score(self, decision):
-        return 1.0 if decision == "accepted" else 0.7
+    def __init__(self, retriever=None, reranker=None):
+        self.retriever = retriever or SemanticSearcherDB()
+        self.reranker = reranker or CrossEncoderReranker()
+        # Running estimate of cross-encoder cost per (query, case) pair, ms
+        self.pair_cost_ms = None
+        self.result_cache = LRUCache(RESULT_CACHE_SIZE, "search_results")
+        self.semantic_cache = SemanticQueryCache()
+        # Shared by all workers on the host and kept across restarts
+        self.disk_cache = PersistentSearchCache() if SEARCH_DISK_CACHE_PATH else None
 
-    def _reasoning_score(self, reason):
-        return 1.0 if reason else 0.8
+    def warm_up(self):
+        """
+        Runs one dummy inference through both models so the first
+        real request does not pay lazy-init / first-run kernel costs.
+        """
+        self.retriever.model.encode(WARM_UP_QUERY)
+        self.reranker.model.predict([(WARM_UP_QUERY, WARM_UP_QUERY)])
 
-    def _sigmoid(self, x):
-        """Normalize cross-encoder logits to 0–1"""
-        return 1 / (1 + math.exp(-x))
+        # Seed the cascade cost estimate from a second, warm call
+        start = time.perf_counter()
+        self.reranker.model.predict([(WARM_UP_QUERY, WARM_UP_QUERY)])
+        self.pair_cost_ms = (time.perf_counter() - start) * 1000
 
     # --------------------------------------------------
     # Main search
     # --------------------------------------------------
-    def search(self, query_text):
+    def search(self, query_text, timings=None, cascade=False, budget_ms=None,
+               report=None, deadline=None, positive_ids=None, negative_ids=None,
+               negative_weight=SEARCH_NEGATIVE_WEIGHT, top_k=FINAL_TOP_K):
+        """
+        Runs all three stages and returns the best `top_k` results. If
+        `timings` (dict) is given, it is filled with per-stage durations in
+        milliseconds.
 
-        # Stage 1: Retrieve
-        candidates = self.retriever.retrieve(
-            query_text=query_text,
-            top_k=10
-        )
+        With `cascade`, reranking is skipped or shrunk when the embedding
+        scores are decisive, and runs batch by batch only while the
+        estimated cost fits into `budget_ms` (whole request, optional).
+        If `report` (dict) is given, it receives the reranking path taken.
+
+        Fully reranked results are cached per query and index version, and
+        also answer cascade requests (same ranking, no model cost). Results
+        and cross-encoder scores are also kept in a host-wide disk cache
+        keyed by corpus version. A query
+        nearly identical to a recent one reuses that query's candidate set
+        instead of scanning the corpus, or its ranking when closer still.
+
+        With a `deadline` (search.deadline.Deadline), each stage checks it
+        before starting and DeadlineExceeded is raised once it has passed;
+        cascade reranking also stops at it.
+
+        `positive_ids` / `negative_ids` build the query vector from stored
+        case embeddings ("more like these, unlike those"), with or without
+        `query_text`; the examples are left out of the results. Without
+        query text the cross-encoder has nothing to compare and is skipped.
+        """
+        index = self.retriever.index or self.retriever.load_index()
+        # Pinned so that a rebuild swapping the index drains this search
+        # before closing it (see IndexManager)
+        with index.reading():
+            return self._search(
+                index, query_text, timings, cascade, budget_ms, report,
+                deadline, positive_ids, negative_ids, negative_weight, top_k,
+            )
+
+    def _search(self, index, query_text, timings, cascade, budget_ms, report,
+                deadline, positive_ids, negative_ids, negative_weight, top_k):
+        start = time.perf_counter()
+        query_text = query_text or ""
+        has_text = bool(query_text.strip())
+        examples = bool(positive_ids or negative_ids)
+        if not has_text and not positive_ids:
+            raise ValueError("Provide query text or positive example cases")
+
+        n_candidates = max(RETRIEVAL_TOP_K, top_k)
+        cache_key = (normalize_query(query_text), index.version, top_k)
+        if examples:
+            cache_key += (
+                tuple(sorted(positive_ids or ())),
+                tuple(sorted(negative_ids or ())),
+                negative_weight,
+            )
+        with timed("result_cache", timings):
+            cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            RERANK_PATHS.inc(path="cached")
+            if report is not None:
+                report.update({"path": "cached", "budget_ms": budget_ms})
+            # Callers decorate results (snippets), so never hand out the cached dicts
+            return copy.deepcopy(cached)
+
+        disk_key = None
+        if self.disk_cache is not None:
+            disk_key = result_key(
+                [cache_key[0], *cache_key[2:]], index.corpus_key(), SCORING_CONFIG
+            )
+            with timed("disk_cache", timings):
+                ranking = self.disk_cache.get_results(disk_key)
+            if ranking is not None:
+                results = self._serve_ranking(ranking, timings)
+                self.result_cache.put(cache_key, copy.deepcopy(results))
+                RERANK_PATHS.inc(path="disk_cache")
+                if report is not None:
+                    report.update({"path": "disk_cache", "budget_ms": budget_ms})
+                return results
 
-        if not candidates:
+        # Stage 1: Retrieve, or reuse the candidates of a near-identical query
+        if deadline is not None:
+            deadline.check("query_encoding")
+        query_embedding = None
+        if has_text:
+            with timed("query_encoding", timings):
+                query_embedding = self.retriever.encode_query(query_text)
+
+        hit = None
+        if examples:
+            with timed("example_vector", timings):
+                query_embedding = self.retriever.example_query_vector(
+                    positive_ids, negative_ids, negative_weight, query_embedding,
+                    index=index,
+                )
+        else:
+            hit = self.semantic_cache.lookup(query_embedding, index.version)
+            # Entries made for a smaller top_k hold too few candidates
+            if hit is not None and len(hit.candidate_ids) < n_candidates:
+                hit = None
+        if (hit is not None and hit.results and len(hit.results) >= top_k
+                and hit.similarity >= SEMANTIC_CACHE_SERVE):
+            results = self._serve_ranking(hit.results[:top_k], timings)
+            RERANK_PATHS.inc(path="semantic_cache")
+            if report is not None:
+                report.update({
+                    "path": "semantic_cache",
+                    "similarity": round(hit.similarity, 4),
+                    "budget_ms": budget_ms,
+                })
+            return results
+
+        if deadline is not None:
+            deadline.check("retrieval")
+
+        if hit is not None:
+            with timed("semantic_rescore", timings):
+                hits = self.retriever.rescore(query_embedding, hit.candidate_ids, index=index)
+            candidates = self.retriever.fetch_candidates(hits, timings=timings)
+        else:
+            candidates = self.retriever.retrieve(
+                query_text=query_text,
+                top_k=n_candidates,
+                timings=timings,
+                query_embedding=query_embedding,
+                exclude=set(positive_ids or ()) | set(negative_ids or ()),
+                index=index,
+            )
+
+        if not len(candidates):
             return []
+        candidate_ids = candidates.case_ids.tolist()
 
         # Stage 2: Cross-encoder rerank
-        reranked = self.reranker.rerank(
-            query_text=query_text,
-            candidates=candidates,
-            top_k=10
-        )
+        if deadline is not None:
+            deadline.check("rerank")
 
-        # Stage 3: Weighted scoring
-        final_results = []
+        if not has_text:
+            path = "no_query_text"
+        elif cascade:
+            rerank_until = start + budget_ms / 1000 if budget_ms is not None else None
+            if deadline is not None:
+                rerank_until = min(rerank_until or deadline.expires_at, deadline.expires_at)
+            path = self._cascade_rerank(query_text, candidates, rerank_until, timings)
+        else:
+            path = "full"
+            self._cross_encode(query_text, candidates, np.arange(len(candidates)), timings)
 
-        for c in reranked:
-            embed_score = float(c.get("embed_score", 0.0))
+        RERANK_PATHS.inc(path=path)
+        if report is not None:
+            report.update({
+                "path": path,
+                "reranked": int(candidates.reranked.sum()),
+                "candidates": len(candidates),
+                "budget_ms": budget_ms,
+                "pair_cost_ms": (
+                    round(self.pair_cost_ms, 3) if self.pair_cost_ms is not None else None
+                ),
+            })
+            if hit is not None:
+                report["semantic_reuse"] = round(hit.similarity, 4)
 
-            raw_cross = float(c.get("cross_score", 0.0))
-            cross_score = self._sigmoid(raw_cross)
+        # Stage 3: Weighted scoring
+        with timed("scoring", timings):
+            results = self._score(candidates, top_k)
 
-            decision = c.get("decision")
-            reason = c.get("decision_reason")
+        ranking = None
+        if path in _COMPLETE_PATHS:
+            self.result_cache.put(cache_key, copy.deepcopy(results))
+            ranking = [
+                {k: v for k, v in r.items() if k not in _RANKING_TEXT_FIELDS}
+                for r in results
+            ]
+            if disk_key is not None:
+                self.disk_cache.put_results(disk_key, ranking)
 
-            embed_contrib = EMBEDDING_WEIGHT * embed_score
-            cross_contrib = CROSS_ENCODER_WEIGHT * cross_score
-            decision_contrib = DECISION_WEIGHT * self._decision_score(decision)
-            reason_contrib = REASONING_WEIGHT * self._reasoning_score(reason)
+        # Only freshly retrieved candidate sets seed the semantic cache, so
+        # reuse never chains away from a real corpus scan. Example queries
+        # are left out: their results depend on the excluded examples.
+        if hit is None and not examples:
+            self.semantic_cache.put(
+                query_embedding, index.version, candidate_ids,
+                ranking if path == "full" else None,
+            )
+        return results
+
+    def _cross_encode(self, query_text, candidates, positions, timings):
+        """
+        Fills candidates.cross_scores at `positions`, taking known scores
+        from the disk cache. Returns the number of pairs the model scored.
+        """
+        todo = positions
+        if self.disk_cache is not None:
+            case_ids = candidates.case_ids[positions].tolist()
+            with timed("disk_cache", timings):
+                known = self.disk_cache.get_cross_scores(query_text, case_ids)
+            if known:
+                cached = np.array([cid in known for cid in case_ids], dtype=bool)
+                candidates.cross_scores[positions[cached]] = [
+                    known[cid] for cid, hit in zip(case_ids, cached) if hit
+                ]
+                todo = positions[~cached]
 
-            final_score = (
-                embed_contrib +
-                cross_contrib +
-                decision_contrib +
-                reason_contrib
+        if not len(todo):
+            return 0
+        scores = self.reranker.predict(
+            query_text,
+            candidates.texts(todo),
+            candidates.token_ids(todo),
+            timings=timings,
+        )
+        candidates.cross_scores[todo] = scores
+        if self.disk_cache is not None:
+            self.disk_cache.put_cross_scores(
+                query_text, dict(zip(candidates.case_ids[todo].tolist(), scores.tolist()))
             )
+        return len(todo)
 
-            # Store breakdown for UI
-            c["score_breakdown"] = {
-                "embedding": round(embed_contrib, 4),
-                "cross_encoder": round(cross_contrib, 4),
-                "decision": round(decision_contrib, 4),
-                "reasoning": round(reason_contrib, 4),
-            }
+    def _serve_ranking(self, ranking, timings):
+        """Re-hydrates a cached ranking (ids + scores) with the case texts."""
+        candidates = self.retriever.fetch_candidates(
+            [(r["case_id"], r["embed_score"]) for r in ranking], timings=timings
+        )
+        by_id = {r["case_id"]: r for r in ranking}
+        results = candidates.to_dicts(range(len(candidates)))
+        for result in results:
+            result.update(copy.deepcopy(by_id[result["case_id"]]))
+        return results
+
+    def _cascade_rerank(self, query_text, candidates, deadline, timings):
+        """
+        Cross-encodes candidates best-embedding-first in small batches,
+        filling candidates.cross_scores in place. Returns the path taken;
+        candidates left unscored keep NaN and _score() substitutes their
+        embedding score.
+        """
+        order = np.argsort(-candidates.embed_scores, kind="stable")
+        ranked_scores = candidates.embed_scores[order]
+        top = ranked_scores[0]
 
-            c["final_score"] = round(final_score, 4)
+        if len(order) > 1 and top - ranked_scores[1] >= CASCADE_DECISIVE_MARGIN:
+            return "skipped_margin"
 
-            final_results.append(c)
+        window = order[top - ranked_scores <= CASCADE_RERANK_WINDOW]
 
-        final_results = sorted(
-            final_results,
-            key=lambda x: x["final_score"],
-            reverse=True
+        scored = 0
+        for i in range(0, len(window), CASCADE_BATCH_SIZE):
+            batch = window[i:i + CASCADE_BATCH_SIZE]
+            if deadline is not None and self.pair_cost_ms is not None:
+                remaining_ms = (deadline - time.perf_counter()) * 1000
+                if self.pair_cost_ms * len(batch) > remaining_ms:
+                    break
+
+            batch_start = time.perf_counter()
+            predicted = self._cross_encode(query_text, candidates, batch, timings)
+            # Cache hits say nothing about model cost
+            if predicted:
+                cost = (time.perf_counter() - batch_start) * 1000 / predicted
+                self.pair_cost_ms = cost if self.pair_cost_ms is None else (
+                    COST_EWMA_ALPHA * cost + (1 - COST_EWMA_ALPHA) * self.pair_cost_ms
+                )
+            scored += len(batch)
+
+        if scored == len(candidates):
+            return "full"
+        if scored == len(window):
+            return "shrunk_margin"
+        if scored:
+            return "partial_budget"
+        return "skipped_budget"
+
+    def _score(self, candidates, top_k=FINAL_TOP_K):
+        """
+        Stage 3: weighted explainable scoring over the candidate columns.
+        Returns the final `top_k` as response dicts.
+        """
+        embed = candidates.embed_scores.astype(np.float64)
+        reranked = candidates.reranked
+
+        # Cross-encoder logits normalized to 0–1; candidates the cascade did
+        # not rerank fall back to their embedding score as the relevance estimate
+        with np.errstate(over="ignore", invalid="ignore"):
+            cross = np.where(
+                reranked, 1 / (1 + np.exp(-candidates.cross_scores.astype(np.float64))), embed
+            )
+
+        embed_contrib = EMBEDDING_WEIGHT * embed
+        cross_contrib = CROSS_ENCODER_WEIGHT * cross
+        decision_contrib = DECISION_WEIGHT * np.where(
+            candidates.decision_codes == DECISION_CODES["accepted"],
+            ACCEPTED_SCORE, OTHER_DECISION_SCORE,
+        )
+        reason_contrib = REASONING_WEIGHT * np.where(
+            candidates.has_reason, REASON_SCORE, NO_REASON_SCORE
         )
 
-        return final_results[:5]
+        final_scores = np.round(
+            embed_contrib + cross_contrib + decision_contrib + reason_contrib, 4
+        )
+        top = np.argsort(-final_scores, kind="stable")[:top_k]
+
+        # Dicts only for the results actually returned
+        results = candidates.to_dicts(top)
+        for result, i in zip(results, top):
+            result["reranked"] = bool(reranked[i])
+
+            # Store breakdown for UI
+            result["score_breakdown"] = {
+                "embedding": round(float(embed_contrib[i]), 4),
+                "cross_encoder": round(float(cross_contrib[i]), 4),
+                "decision": round(float(decision_contrib[i]), 4),
+                "reasoning": round(float(reason_contrib[i]), 4),
+            }
+
+            result["final_score"] = float(final_scores[i])
+
+        return results
@@ -0,0 +1,89 @@
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from search.case_index import normalize_rows
+from utils.metrics import record_cache_lookup
+
+# Recent queries remembered (0 disables). Entries hold ids, not texts, so
+# the cost is one embedding row plus a few ids per query.
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+
+# Cosine to a cached query above which its candidate set is reused
+# (rescored and reranked for the new query, no corpus scan)
+SEMANTIC_CACHE_REUSE = float(os.getenv("SEMANTIC_CACHE_REUSE", "0.95"))
+
+# Cosine above which the cached final ranking is served as is
+SEMANTIC_CACHE_SERVE = float(os.getenv("SEMANTIC_CACHE_SERVE", "0.99"))
+
+SemanticHit = namedtuple("SemanticHit", ["similarity", "candidate_ids", "results"])
+
+
+class SemanticQueryCache:
+    """
+    Near-duplicate query cache: a fixed-size matrix of recent query
+    embeddings searched with one matrix-vector product per lookup.
+
+    An entry keeps the candidate ids retrieved for its query and, when the
+    query was fully reranked, its final ranking (without the case texts).
+    Entries are tied to the index version they were computed against and
+    evicted least-recently-used.
+    """
+
+    def __init__(self, capacity=SEMANTIC_CACHE_SIZE, reuse_threshold=SEMANTIC_CACHE_REUSE):
+        self.capacity = capacity
+        self.reuse_threshold = reuse_threshold
+        self._vectors = None  # (capacity, dim), allocated on first put
+        self._versions = np.full(capacity, -1, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._entries = [None] * capacity
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, query_vector, version):
+        """Best cached entry for the same index version above the reuse threshold, else None."""
+        if self.capacity <= 0 or self._vectors is None:
+            return None
+
+        query = normalize_rows(query_vector)
+        with self._lock:
+            sims = self._vectors @ query
+            sims[self._versions != version] = -np.inf
+            slot = int(np.argmax(sims))
+            similarity = float(sims[slot])
+            hit = similarity >= self.reuse_threshold
+            if hit:
+                self._tick += 1
+                self._last_used[slot] = self._tick
+                candidate_ids, results = self._entries[slot]
+
+        record_cache_lookup("semantic_query", hit)
+        if not hit:
+            return None
+        return SemanticHit(similarity, candidate_ids, results)
+
+    def put(self, query_vector, version, candidate_ids, results=None):
+        if self.capacity <= 0:
+            return
+
+        query = normalize_rows(query_vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, len(query)), dtype=np.float32)
+
+            # Free or stale slot first, else the least recently used one
+            stale = np.flatnonzero(self._versions != version)
+            slot = int(stale[0]) if len(stale) else int(np.argmin(self._last_used))
+
+            self._tick += 1
+            self._vectors[slot] = query
+            self._versions[slot] = version
+            self._last_used[slot] = self._tick
+            self._entries[slot] = (list(candidate_ids), results)
+
+    def clear(self):
+        with self._lock:
+            self._versions[:] = -1
+            self._entries = [None] * self.capacity
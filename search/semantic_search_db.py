@@ -1,17 +1,37 @@
+import os
+import threading
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from database.db_connection import DatabaseConnection
+from search.candidate_set import CandidateSet
+from search.case_index import CaseIndex, normalize_rows
+from utils.lru_cache import LRUCache
+from utils.model_loading import load_embedding_model
+from utils.metrics import timed
+from utils.text_preprocessing import normalize_query
+
+# Query embeddings kept in memory (0 disables)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+
+# Weight of the negative-example centroid subtracted from example queries
+SEARCH_NEGATIVE_WEIGHT = float(os.getenv("SEARCH_NEGATIVE_WEIGHT", "0.5"))
 
 
 class SemanticSearcherDB:
     """
     Stage-1 Retrieval using sentence embeddings.
-    Returns Top-K candidate cases.
+    Returns Top-K candidate cases (as a columnar CandidateSet).
+
+    Embeddings are scanned from an in-memory CaseIndex (loaded once from
+    Postgres); only the winning rows are fetched from the database.
     """
 
     def __init__(self):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+        self.model = load_embedding_model()
         self.db = DatabaseConnection()
+        self.index = None
+        self._index_lock = threading.Lock()
+        self.query_embeddings = LRUCache(QUERY_EMBEDDING_CACHE_SIZE, "query_embedding")
 
     @staticmethod
     def cosine_similarity(a, b):
@@ -19,12 +39,131 @@ class SemanticSearcherDB:
         b = np.array(b)
         return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
-    def retrieve(self, query_text, top_k=10):
+    def load_index(self):
+        """Loads the embedding index from Postgres (idempotent)."""
+        with self._index_lock:
+            if self.index is None:
+                self.index = CaseIndex.from_database(self.db)
+        return self.index
+
+    def encode(self, texts, batch_size=32):
+        """Encodes one text or a list of texts with the retrieval model."""
+        return self.model.encode(texts, batch_size=batch_size)
+
+    def encode_query(self, query_text):
+        """Query embedding, served from the in-memory LRU when seen before."""
+        key = normalize_query(query_text)
+        embedding = self.query_embeddings.get(key)
+        if embedding is None:
+            embedding = self.encode(key)
+            self.query_embeddings.put(key, embedding)
+        return embedding
+
+    def _active_index(self, index=None):
+        # A search pins one index (CaseIndex.reading) and passes it down, so
+        # a concurrent rebuild swap cannot change it halfway through
+        if index is not None:
+            return index
+        return self.index or self.load_index()
+
+    def example_query_vector(self, positive_ids=(), negative_ids=(),
+                             negative_weight=SEARCH_NEGATIVE_WEIGHT, query_embedding=None,
+                             index=None):
+        """
+        Query vector built from stored case embeddings, no model call: the
+        centroid of the positive examples (plus the text query embedding,
+        if given) minus `negative_weight` times the negative centroid.
+        Ids missing from the index are ignored.
+        """
+        index = self._active_index(index)
+        _, positives = index.get_vectors(list(positive_ids or ()))
+        _, negatives = index.get_vectors(list(negative_ids or ()))
+
+        if query_embedding is not None:
+            positives = np.vstack([positives, normalize_rows(query_embedding)])
+        if not len(positives):
+            raise ValueError("An example query needs query text or a known positive case")
+
+        vector = positives.mean(axis=0)
+        if len(negatives):
+            vector = vector - negative_weight * negatives.mean(axis=0)
+        return normalize_rows(vector)
+
+    def retrieve(self, query_text, top_k=10, timings=None, query_embedding=None,
+                 exclude=None, index=None):
         """
         Retrieve top-K similar cases using embeddings.
+
+        If `timings` (dict) is given, per-stage durations in ms are added to it.
+        A precomputed `query_embedding` skips the encoding stage. Case ids in
+        `exclude` (e.g. the examples of an example query) are never returned.
+        `index` is the index pinned by the caller (default: the current one).
+        """
+        index = self._active_index(index)
+
+        if query_embedding is None:
+            with timed("query_encoding", timings):
+                query_embedding = self.encode_query(query_text)
+
+        exclude = set(exclude or ())
+        with timed("similarity_scan", timings):
+            hits = index.search(query_embedding, top_k=top_k + len(exclude))
+        if exclude:
+            hits = [hit for hit in hits if hit[0] not in exclude][:top_k]
+
+        return self.fetch_candidates(hits, timings=timings)
+
+    def range_search(self, query_embedding, min_score, max_results, exclude=None,
+                     index=None):
+        """
+        Yields blocks of [(case_id, cosine)] for every indexed case scoring
+        at least `min_score` (see CaseIndex.range_search), at most
+        `max_results` in total, never including ids in `exclude`.
+        """
+        index = self._active_index(index)
+        exclude = set(exclude or ())
+
+        count = 0
+        for block in index.range_search(query_embedding, min_score, max_results + len(exclude)):
+            block = [hit for hit in block if hit[0] not in exclude][:max_results - count]
+            if block:
+                count += len(block)
+                yield block
+            if count >= max_results:
+                return
+
+    def rescore(self, query_embedding, case_ids, index=None):
+        """
+        Exact [(case_id, cosine)] of the query against the given indexed
+        cases only (no corpus scan), best first.
         """
+        index = self._active_index(index)
+        found, vectors = index.get_vectors(case_ids)
+        if not found:
+            return []
+        scores = vectors @ normalize_rows(query_embedding)
+        order = np.argsort(-scores)
+        return [(found[i], float(scores[i])) for i in order]
 
-        query_embedding = self.model.encode(query_text).tolist()
+    def fetch_candidates(self, hits, timings=None):
+        """
+        Builds the CandidateSet for [(case_id, embed_score)] hits from their
+        database rows, keeping the hit order.
+        """
+        with timed("db_fetch", timings):
+            rows = self._fetch_rows([case_id for case_id, _ in hits])
+
+        # Hits deleted from the table since the index was built are dropped
+        found = [(case_id, score) for case_id, score in hits if case_id in rows]
+        return CandidateSet(
+            [case_id for case_id, _ in found],
+            [score for _, score in found],
+            [rows[case_id] for case_id, _ in found],
+        )
+
+    def _fetch_rows(self, case_ids):
+        if not case_ids:
+            return {}
 
         conn = self.db.get_connection()
         cursor = conn.cursor()
@@ -32,42 +171,19 @@ class SemanticSearcherDB:
         cursor.execute("""
             SELECT
                 case_id,
-                embedding,
                 text,
                 summary,
                 decision,
-                decision_reason
-            FROM cases;
-        """)
-
-        candidates = []
-
-        for row in cursor.fetchall():
-            score = self.cosine_similarity(
-                query_embedding, row["embedding"]
-            )
-            
-            # Use stored summary if available, else truncate text
-            summary_text = row["summary"]
-            if not summary_text:
-                summary_text = row["text"][:300] + "..."
-
-            candidates.append({
-                "case_id": row["case_id"],
-                "embed_score": float(score),
-                "decision": row["decision"],
-                "decision_reason": row["decision_reason"],
-                "summary": summary_text,
-                "full_text": row["text"]
-            })
+                decision_reason,
+                cross_token_ids,
+                cross_token_model
+            FROM cases
+            WHERE case_id = ANY(%s);
+        """, (list(case_ids),))
+
+        rows = {row["case_id"]: row for row in cursor.fetchall()}
 
         cursor.close()
         conn.close()
 
-        # Sort by embedding similarity
-        candidates.sort(
-            key=lambda x: x["embed_score"],
-            reverse=True
-        )
-
-        return candidates[:top_k]
+        return rows
@@ -0,0 +1,260 @@
+import atexit
+import heapq
+import itertools
+import multiprocessing as mp
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Number of worker processes the main index segment is split across
+# (1 = scan in-process, no workers)
+SEARCH_SHARDS = int(os.getenv("SEARCH_SHARDS", "1"))
+
+# Optional CPU placement, one entry per shard separated by ";" (e.g. "0-3;4-7"),
+# or "auto" to pin shard i to core i
+SEARCH_SHARD_CPUS = os.getenv("SEARCH_SHARD_CPUS", "")
+
+# Below this many rows a single in-process scan beats the IPC round trip
+SHARD_MIN_ROWS = int(os.getenv("SHARD_MIN_ROWS", "200000"))
+
+_BLAS_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+class ScannerClosed(RuntimeError):
+    pass
+
+
+def parse_cpu_sets(spec, n_shards):
+    """'0-3;4-7' -> [{0,1,2,3}, {4,5,6,7}]; 'auto' -> one core per shard."""
+    if not spec:
+        return [None] * n_shards
+    if spec == "auto":
+        cores = os.cpu_count() or 1
+        return [{i % cores} for i in range(n_shards)]
+
+    cpu_sets = []
+    for part in spec.split(";"):
+        cpus = set()
+        for item in part.split(","):
+            if "-" in item:
+                lo, hi = item.split("-")
+                cpus.update(range(int(lo), int(hi) + 1))
+            elif item.strip():
+                cpus.add(int(item))
+        cpu_sets.append(cpus or None)
+    return (cpu_sets + [None] * n_shards)[:n_shards]
+
+
+def _shard_worker(shm_name, shape, start, end, conn, cpus):
+    """Serves partial top-k queries over rows [start, end) of the shared matrix."""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    # Spawned children share the parent's resource tracker, and the parent
+    # unlinks the segment in close(), so attaching here needs no bookkeeping
+    shm = shared_memory.SharedMemory(name=shm_name)
+    matrix = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)[start:end]
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        request_id, query, k = message
+        scores = matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        conn.send((request_id, top + start, scores[top]))
+
+    del matrix
+    shm.close()
+
+
+class _SharedMatrix(np.ndarray):
+    """
+    Parent-side view of a shard segment. Holds the segment, so the mapping
+    stays valid for as long as this array (or any slice of it) is alive.
+    """
+
+    segment = None
+
+
+class _Gather:
+    """Partial results of one query, completed once every shard answered."""
+
+    def __init__(self, n_shards):
+        self.n_shards = n_shards
+        self.partials = []
+        self.failed = False
+        self.done = threading.Event()
+
+
+class ShardedScanner:
+    """
+    Scatter-gather exact scan over worker processes.
+
+    The matrix is copied once into a shared memory segment; each worker
+    attaches to it and scans only its row range. A query is broadcast to all
+    shards, every shard returns its partial top-k, and the sorted partials
+    are combined with a k-way merge.
+
+    Requests carry an id and one receiver thread per shard routes replies
+    back to the waiting caller, so concurrent queries are pipelined through
+    the workers instead of queueing behind each other. The parent reads the
+    same segment through `matrix` (fallback scans, vector lookups), so the
+    rows are held in RAM only once.
+    """
+
+    def __init__(self, matrix, n_shards, cpu_sets=None):
+        self.shape = matrix.shape
+        self.n_shards = n_shards
+        # Serializes sends only, so every shard sees requests in one order
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._ids = itertools.count()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=max(self.shape[0] * self.shape[1] * 4, 1)
+        )
+        self.matrix = _SharedMatrix(self.shape, dtype=np.float32, buffer=self._shm.buf)
+        self.matrix[:] = matrix
+        self.matrix.segment = self._shm
+
+        cpu_sets = cpu_sets or [None] * n_shards
+        bounds = np.linspace(0, matrix.shape[0], n_shards + 1).astype(int)
+
+        # Workers are single-threaded BLAS; parallelism comes from the shards.
+        # "spawn" avoids forking a parent that already runs torch threads.
+        ctx = mp.get_context("spawn")
+        saved_env = {v: os.environ.get(v) for v in _BLAS_THREAD_VARS}
+        os.environ.update({v: "1" for v in _BLAS_THREAD_VARS})
+        try:
+            self._conns, self._procs = [], []
+            for i in range(n_shards):
+                parent_conn, child_conn = ctx.Pipe()
+                proc = ctx.Process(
+                    target=_shard_worker,
+                    args=(self._shm.name, self.shape, int(bounds[i]),
+                          int(bounds[i + 1]), child_conn, cpu_sets[i]),
+                    name=f"search-shard-{i}",
+                    daemon=True,
+                )
+                proc.start()
+                child_conn.close()
+                self._conns.append(parent_conn)
+                self._procs.append(proc)
+        finally:
+            for var, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(var, None)
+                else:
+                    os.environ[var] = value
+
+        self._receivers = [
+            threading.Thread(
+                target=self._receive, args=(conn,),
+                name=f"search-shard-recv-{i}", daemon=True,
+            )
+            for i, conn in enumerate(self._conns)
+        ]
+        for thread in self._receivers:
+            thread.start()
+
+        atexit.register(self.close)
+
+    def _receive(self, conn):
+        # Ends when the worker exits and its end of the pipe closes
+        while True:
+            try:
+                request_id, rows, scores = conn.recv()
+            except (EOFError, OSError):
+                with self._send_lock:
+                    # A worker died: later queries fall back to a local scan
+                    self._closed = True
+                self._fail_pending()
+                return
+            with self._pending_lock:
+                gather = self._pending[request_id]
+                gather.partials.append((rows, scores))
+                if len(gather.partials) == gather.n_shards:
+                    del self._pending[request_id]
+                    gather.done.set()
+
+    def search(self, query, k):
+        """
+        Returns (rows, scores) of the global top-k, best first.
+        """
+        query = np.ascontiguousarray(query, dtype=np.float32)
+        gather = _Gather(self.n_shards)
+        with self._send_lock:
+            if self._closed:
+                raise ScannerClosed("scanner has been closed")
+            request_id = next(self._ids)
+            with self._pending_lock:
+                self._pending[request_id] = gather
+            for conn in self._conns:
+                conn.send((request_id, query, k))
+
+        gather.done.wait()
+        if gather.failed:
+            raise ScannerClosed("scanner closed while the query was in flight")
+
+        merged = heapq.merge(
+            *[zip(scores.tolist(), rows.tolist()) for rows, scores in gather.partials],
+            key=lambda pair: -pair[0],
+        )
+        top = [pair for _, pair in zip(range(k), merged)]
+        rows = np.array([row for _, row in top], dtype=np.int64)
+        scores = np.array([score for score, _ in top], dtype=np.float32)
+        return rows, scores
+
+    def _fail_pending(self):
+        with self._pending_lock:
+            for gather in self._pending.values():
+                gather.failed = True
+                gather.done.set()
+            self._pending.clear()
+
+    def close(self):
+        """
+        Stops the workers (after any in-flight query) and unlinks the segment.
+        The parent's mapping is released with the last reference to `matrix`.
+        """
+        with self._send_lock:
+            if self._closed and self._shm is None:
+                return
+            self._closed = True
+            for conn in self._conns:
+                try:
+                    conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+        for thread in self._receivers:
+            thread.join(timeout=5)
+
+        # Only left over if a worker died mid-query
+        self._fail_pending()
+
+        with self._send_lock:
+            if self._shm is None:
+                return
+            self._shm.unlink()
+            self._shm = None
+        # The registration would otherwise keep the mapping alive until exit
+        atexit.unregister(self.close)
+
+
+def maybe_build_scanner(matrix, n_shards=None):
+    """Returns a ShardedScanner when sharding is enabled and worthwhile."""
+    n_shards = SEARCH_SHARDS if n_shards is None else n_shards
+    if n_shards <= 1 or len(matrix) < SHARD_MIN_ROWS:
+        return None
+    return ShardedScanner(
+        matrix, n_shards, cpu_sets=parse_cpu_sets(SEARCH_SHARD_CPUS, n_shards)
+    )
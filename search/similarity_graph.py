@@ -0,0 +1,64 @@
+import numpy as np
+
+from search.case_index import normalize_rows
+
+# Upper bound on nodes per graph (n x n similarity matrix stays small)
+MAX_GRAPH_NODES = 1000
+
+
+def build_similarity_graph(case_ids, vectors, threshold=None, k_neighbors=None):
+    """
+    Computes the full pairwise cosine matrix in one matrix product and
+    prunes it to a sparse edge list.
+
+    Pruning:
+    - k_neighbors: keep each node's k most similar neighbours (symmetrised)
+    - threshold: keep edges with cosine >= threshold
+    Both may be combined (edge must pass both); with neither, every pair is kept.
+
+    Returns:
+        list of (i, j, weight) with i < j, indices into case_ids
+    """
+    n = len(case_ids)
+    if n < 2:
+        return []
+
+    matrix = normalize_rows(vectors)
+    sims = matrix @ matrix.T
+    np.fill_diagonal(sims, -np.inf)
+
+    keep = np.ones((n, n), dtype=bool)
+
+    if k_neighbors:
+        k = min(k_neighbors, n - 1)
+        nearest = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        knn = np.zeros((n, n), dtype=bool)
+        knn[np.arange(n)[:, None], nearest] = True
+        keep &= knn | knn.T
+
+    if threshold is not None:
+        keep &= sims >= threshold
+
+    rows, cols = np.nonzero(np.triu(keep, k=1))
+    weights = sims[rows, cols]
+    return [
+        (int(i), int(j), float(w))
+        for i, j, w in zip(rows, cols, weights)
+    ]
+
+
+def fetch_case_decisions(db, case_ids):
+    """case_id -> decision for the graph node attributes."""
+    if not case_ids:
+        return {}
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT case_id, decision FROM cases WHERE case_id = ANY(%s);",
+        (list(case_ids),),
+    )
+    decisions = {row["case_id"]: row["decision"] for row in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return decisions
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+import api.admission as admission
+from api.admission import DEADLINE_HEADER, AdmissionController, Rejected, request_deadline
+from search.deadline import Deadline
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_queue_full_is_rejected_at_once():
+    controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+
+    async def scenario():
+        async with controller.admit():
+            with pytest.raises(Rejected) as rejected:
+                async with controller.admit():
+                    pass
+        return rejected.value
+
+    assert run(scenario()).status_code == 429
+    assert controller.in_flight == 0
+
+
+def test_queued_request_times_out():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.05)
+
+    async def scenario():
+        async with controller.admit():
+            with pytest.raises(Rejected) as rejected:
+                async with controller.admit():
+                    pass
+        return rejected.value
+
+    assert run(scenario()).status_code == 503
+    assert controller.waiting == 0
+
+
+def test_queued_request_gets_the_freed_slot():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=1)
+    order = []
+
+    async def request(name, hold):
+        async with controller.admit():
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def scenario():
+        await asyncio.gather(request("first", 0.05), request("second", 0))
+
+    run(scenario())
+    assert order == ["first", "second"]
+    assert controller.in_flight == 0
+
+
+def test_expired_deadline_is_rejected_before_queueing():
+    controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=1)
+    deadline = Deadline.from_ms(1, start=0)
+
+    async def scenario():
+        with pytest.raises(Rejected) as rejected:
+            async with controller.admit(deadline):
+                pass
+        return rejected.value
+
+    assert run(scenario()).status_code == 503
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "0", "-5", "soon"])
+def test_invalid_deadline_header_falls_back_to_default(monkeypatch, value):
+    monkeypatch.setattr(admission, "SEARCH_DEADLINE_MS", 0)
+    assert request_deadline({DEADLINE_HEADER: value}) is None
+
+    monkeypatch.setattr(admission, "SEARCH_DEADLINE_MS", 5000)
+    deadline = request_deadline({DEADLINE_HEADER: value})
+    assert 4000 < deadline.remaining_ms() <= 5000
+
+
+def test_deadline_header():
+    deadline = request_deadline({DEADLINE_HEADER: "250"})
+    assert 0 < deadline.remaining_ms() <= 250
+    assert not deadline.expired()
@@ -0,0 +1,253 @@
+import threading
+
+import numpy as np
+import pytest
+
+import search.case_index as case_index
+from search.case_index import CaseIndex, normalize_rows
+from search.sharded_search import ShardedScanner
+
+DIM = 16
+
+
+def random_rows(n, seed):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def build_index(n_main=200, n_delta=50):
+    index = CaseIndex(dim=DIM)
+    index.auto_compact = False
+    index._publish_main([f"m{i}" for i in range(n_main)], normalize_rows(random_rows(n_main, 0)))
+    index.append([f"d{i}" for i in range(n_delta)], random_rows(n_delta, 1))
+    return index
+
+
+def brute_force(index, query, k):
+    snap = index._snapshot
+    ids = snap.main_ids + snap.delta_ids
+    scores = np.vstack([snap.main, snap.delta]) @ normalize_rows(query)
+    return [ids[i] for i in np.argsort(-scores)[:k]]
+
+
+def test_search_covers_main_and_delta():
+    index = build_index()
+    for query in random_rows(5, 2):
+        assert [cid for cid, _ in index.search(query, 10)] == brute_force(index, query, 10)
+
+
+def test_append_skips_indexed_ids():
+    index = build_index()
+    assert index.append(["m0", "d0", "new"], random_rows(3, 3)) == 1
+    assert len(index) == 251
+
+
+def test_corpus_key_ignores_insertion_order():
+    a, b = CaseIndex(dim=DIM), CaseIndex(dim=DIM)
+    rows = random_rows(3, 4)
+    a.append(["x", "y", "z"], rows)
+    b.append(["z"], rows[2])
+    b.append(["y", "x"], rows[[1, 0]])
+    assert a.corpus_key() == b.corpus_key()
+
+    b.append(["w"], rows[0])
+    assert a.corpus_key() != b.corpus_key()
+
+
+def test_compaction_keeps_rows_appended_while_building(monkeypatch):
+    index = build_index()
+    build = case_index.maybe_build_scanner
+
+    def slow_build(matrix):
+        # A writer gets in between the snapshot and the publish
+        index.append([f"late{i}" for i in range(7)], random_rows(7, 5))
+        return build(matrix)
+
+    monkeypatch.setattr(case_index, "maybe_build_scanner", slow_build)
+    version = index.version
+
+    assert index.compact() == 50
+    snap = index._snapshot
+    assert len(snap.main_ids) == 250
+    assert snap.delta_ids == [f"late{i}" for i in range(7)]
+    assert index.version > version
+
+    found, vectors = index.get_vectors(["late3", "d10", "m5"])
+    assert found == ["late3", "d10", "m5"]
+    assert index.search(vectors[0], 1)[0][0] == "late3"
+    assert index.search(vectors[1], 1)[0][0] == "d10"
+
+
+def test_compaction_is_skipped_while_another_runs():
+    index = build_index()
+    with index._compact_lock:
+        assert index.compact() == 0
+    assert len(index._snapshot.delta_ids) == 50
+
+
+def test_compaction_swaps_in_a_sharded_scanner(monkeypatch):
+    monkeypatch.setattr(case_index, "maybe_build_scanner", lambda m: ShardedScanner(m, 2))
+    index = build_index()
+    first = index._snapshot.scanner
+    try:
+        assert index.compact() == 50
+        second = index._snapshot.scanner
+        assert second is not first
+        # The replaced scanner is shut down once the new snapshot is live
+        assert first._closed and first._shm is None
+
+        query = random_rows(1, 6)[0]
+        assert [cid for cid, _ in index.search(query, 10)] == brute_force(index, query, 10)
+    finally:
+        index.close()
+
+
+def test_hand_over_replays_and_forwards_appends():
+    old = build_index()
+    # Rebuild started once the old index held `since_row` rows
+    since_row = len(old)
+    successor = CaseIndex(dim=DIM)
+    successor.auto_compact = False
+    snap = old._snapshot
+    successor._publish_main(snap.main_ids + snap.delta_ids, np.vstack([snap.main, snap.delta]))
+
+    old.append(["during0", "during1"], random_rows(2, 7))
+    assert old.hand_over(successor, since_row) == 2
+    assert "during1" in successor
+    assert successor.version > old.version
+
+    # Writers still holding the retired index land in the successor
+    assert old.append(["after"], random_rows(1, 8)) == 1
+    assert "after" in successor and "after" not in old
+    assert len(successor) == since_row + 3
+
+
+def test_wait_for_readers():
+    index = build_index()
+    with index.reading():
+        assert not index.wait_for_readers(0.05)
+
+    released = threading.Event()
+
+    def read():
+        with index.reading():
+            released.wait(5)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    threading.Timer(0.1, released.set).start()
+    assert index.wait_for_readers(5)
+    reader.join()
+
+
+def test_range_search_respects_threshold_and_limit():
+    index = build_index()
+    query = random_rows(1, 9)[0]
+    snap = index._snapshot
+    scores = np.vstack([snap.main, snap.delta]) @ normalize_rows(query)
+    ids = snap.main_ids + snap.delta_ids
+    expected = {ids[i] for i in np.flatnonzero(scores >= 0.2)}
+
+    hits = [hit for block in index.range_search(query, 0.2, block_rows=64) for hit in block]
+    assert {cid for cid, _ in hits} == expected
+    assert len(hits) == len(expected)
+
+    limited = [hit for block in index.range_search(query, 0.2, max_results=3) for hit in block]
+    assert len(limited) == min(3, len(expected))
+
+
+# --------------------------------------------------
+# Incremental sync against a fake cases table
+# --------------------------------------------------
+class FakeDatabase:
+    """
+    Just enough of the cases table and txid_current_snapshot() for
+    from_database / sync_from_database. Rows are {id: (case_id, embedding)}.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.xmin, self.xmax = 90, 100
+
+    def get_connection(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, name=None):
+        return FakeCursor(self.db)
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+        self.itersize = 0
+
+    def execute(self, sql, params=None):
+        rows = self.db.rows.items()
+        if "txid" in sql:
+            self.result = [{"snap_xmin": self.db.xmin, "snap_xmax": self.db.xmax}]
+        elif "c.id = ANY" in sql:
+            watermark, gaps = params
+            self.result = [
+                {"id": i, "case_id": cid} for i, (cid, _) in rows
+                if i > watermark or i in gaps
+            ]
+        elif "case_id = ANY" in sql:
+            self.result = [
+                {"case_id": cid, "embedding": emb} for _, (cid, emb) in rows
+                if cid in params[0]
+            ]
+        else:
+            self.result = [
+                {"id": i, "case_id": cid, "embedding": emb} for i, (cid, emb) in rows
+            ]
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0]
+
+    def __iter__(self):
+        return iter(self.result)
+
+    def close(self):
+        pass
+
+
+def test_sync_picks_up_late_commits_below_the_watermark():
+    db = FakeDatabase()
+    vector = lambda i: random_rows(1, 100 + i)[0].tolist()
+    # id 3 is drawn by a transaction that has not committed yet
+    for i in (1, 2, 4, 5):
+        db.rows[i] = (f"c{i}", vector(i))
+
+    index = CaseIndex.from_database(db)
+    assert len(index) == 4
+    assert index.db_watermark == 5
+    assert set(index._id_gaps) == {3}
+
+    db.xmax = 110
+    db.rows[7] = ("c7", vector(7))
+    assert index.sync_from_database(db) == 1
+    assert set(index._id_gaps) == {3, 6}
+
+    # 3 commits long after 4 and 5 were synced
+    db.rows[3] = ("c3", vector(3))
+    db.xmin = 95
+    assert index.sync_from_database(db) == 1
+    assert "c3" in index
+    assert set(index._id_gaps) == {6}
+
+    # Every transaction that could hold id 6 has ended: it was rolled back
+    db.xmin = 120
+    assert index.sync_from_database(db) == 0
+    assert not index._id_gaps
+    assert index.db_watermark == 7
@@ -0,0 +1,39 @@
+import numpy as np
+
+from database.near_duplicates import NearDuplicateDetector
+
+WORDS = (
+    "appeal court order section bail land tax writ police claim lease award "
+    "petition tribunal decree evidence witness contract"
+).split()
+
+
+def judgment(seed, n_words=300):
+    rng = np.random.default_rng(seed)
+    return " ".join(rng.choice(WORDS, size=n_words))
+
+
+def test_near_duplicates_join_the_first_case_of_their_cluster():
+    detector = NearDuplicateDetector()
+    text = judgment(0)
+
+    assert detector.add("a", text) is None
+    canonical, similarity = detector.add("b", text + " appeal dismissed")
+    assert canonical == "a"
+    assert similarity >= detector.threshold
+    # A duplicate of a duplicate still points at the canonical case
+    assert detector.add("c", "court " + text + " appeal dismissed")[0] == "a"
+
+
+def test_distinct_cases_are_not_duplicates():
+    detector = NearDuplicateDetector()
+    assert detector.add("a", judgment(0)) is None
+    assert detector.add("b", judgment(1)) is None
+    assert detector.canonical("b") == "b"
+
+
+def test_repeated_and_empty_cases():
+    detector = NearDuplicateDetector()
+    assert detector.add("a", judgment(0)) is None
+    assert detector.add("a", judgment(0)) is None
+    assert detector.add("empty", "") is None
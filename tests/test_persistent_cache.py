@@ -0,0 +1,44 @@
+import pytest
+
+import search.persistent_cache as persistent_cache
+from search.persistent_cache import PersistentSearchCache, result_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PersistentSearchCache(path=str(tmp_path / "cache.sqlite"), max_mb=64)
+    yield cache
+    cache.close()
+
+
+def test_results_round_trip(cache):
+    key = result_key(["breach of contract", 5], "10:00000000000000ff", {"w": 1})
+    assert cache.get_results(key) is None
+
+    ranking = [{"case_id": "a", "score": 0.9}]
+    cache.put_results(key, ranking)
+    assert cache.get_results(key) == ranking
+    # Another corpus version is another entry
+    assert cache.get_results(result_key(["breach of contract", 5], "11:01", {"w": 1})) is None
+
+
+def test_cross_scores_are_keyed_on_the_normalized_query(cache):
+    cache.put_cross_scores("breach  of contract ", {"a": 0.5, "b": 0.25})
+    assert cache.get_cross_scores("breach of contract", ["a", "b", "c"]) == {"a": 0.5, "b": 0.25}
+    assert cache.get_cross_scores("Breach of contract", ["a"]) == {}
+
+
+def test_eviction_keeps_the_file_under_its_bound(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistent_cache, "EVICT_CHECK_EVERY", 1)
+    cache = PersistentSearchCache(path=str(tmp_path / "cache.sqlite"), max_mb=0.25)
+    try:
+        payload = [{"case_id": f"case_{i}", "score": 0.5, "text": "x" * 200} for i in range(20)]
+        for i in range(200):
+            cache.put_results(f"key{i}", payload)
+
+        assert cache.size_bytes() <= cache.max_bytes
+        # Least recently used entries go first
+        assert cache.get_results("key0") is None
+        assert cache.get_results("key199") == payload
+    finally:
+        cache.close()
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from search.sharded_search import ScannerClosed, ShardedScanner, parse_cpu_sets
+
+
+def exact_top_k(matrix, query, k):
+    scores = matrix @ query
+    rows = np.argsort(-scores, kind="stable")[:k]
+    return rows, scores[rows]
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((5000, 32)).astype(np.float32)
+
+
+@pytest.fixture
+def scanner(matrix):
+    scanner = ShardedScanner(matrix, 2)
+    yield scanner
+    scanner.close()
+
+
+def test_matches_exact_scan(matrix, scanner):
+    assert np.array_equal(scanner.matrix, matrix)
+
+    rng = np.random.default_rng(1)
+    for query in rng.standard_normal((10, 32)).astype(np.float32):
+        rows, scores = scanner.search(query, 10)
+        expected_rows, expected_scores = exact_top_k(matrix, query, 10)
+        assert np.array_equal(rows, expected_rows)
+        assert np.allclose(scores, expected_scores, atol=1e-5)
+
+
+def test_concurrent_queries_get_their_own_replies(matrix, scanner):
+    # Every thread asks for a different k, so a reply routed to the wrong
+    # caller shows up as a wrong length as well as wrong rows
+    rng = np.random.default_rng(2)
+    queries = rng.standard_normal((8, 32)).astype(np.float32)
+    errors = []
+
+    def run(i):
+        k = i + 1
+        for _ in range(20):
+            rows, _ = scanner.search(queries[i], k)
+            if not np.array_equal(rows, exact_top_k(matrix, queries[i], k)[0]):
+                errors.append(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(queries))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert not scanner._pending
+
+
+def test_close_stops_workers_and_keeps_views_readable(matrix, scanner):
+    view = scanner.matrix[10:20]
+    scanner.close()
+
+    assert all(not proc.is_alive() for proc in scanner._procs)
+    with pytest.raises(ScannerClosed):
+        scanner.search(matrix[0], 3)
+    # Idempotent, and the parent's mapping outlives the segment name
+    scanner.close()
+    assert np.array_equal(view, matrix[10:20])
+
+
+def test_dead_worker_closes_the_scanner(matrix, scanner):
+    scanner._procs[0].kill()
+
+    deadline = time.monotonic() + 10
+    while not scanner._closed and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    with pytest.raises(ScannerClosed):
+        scanner.search(matrix[0], 3)
+
+
+def test_parse_cpu_sets():
+    assert parse_cpu_sets("", 2) == [None, None]
+    assert parse_cpu_sets("0-1;2,3", 2) == [{0, 1}, {2, 3}]
@@ -0,0 +1,38 @@
+from utils.text_preprocessing import extract_snippets, normalize_query
+
+TEXT = (
+    "The appellant filed a petition before the High Court. "
+    + "Unrelated procedural history follows here. " * 20
+    + "The court granted bail to the appellant after the petition was heard. "
+    + "Further unrelated text closes the judgment. " * 20
+)
+
+
+def test_snippet_spans_point_into_the_text():
+    snippets = extract_snippets(TEXT, "bail petition appellant", n=2, window=200)
+    assert snippets
+    for snippet in snippets:
+        assert TEXT[snippet["start"]:snippet["end"]] == snippet["text"]
+        assert len(snippet["text"]) <= 200
+        assert snippet["match_count"] >= len(snippet["terms"]) >= 1
+
+
+def test_best_snippet_has_the_most_distinct_terms():
+    best = extract_snippets(TEXT, "bail petition appellant", n=2, window=200)[0]
+    assert best["terms"] == ["appellant", "bail", "petition"]
+
+
+def test_snippets_do_not_overlap():
+    snippets = extract_snippets(TEXT, "unrelated text", n=5, window=120)
+    spans = sorted((s["start"], s["end"]) for s in snippets)
+    assert all(end <= start for (_, end), (start, _) in zip(spans, spans[1:]))
+
+
+def test_no_snippets_without_matches():
+    assert extract_snippets(TEXT, "habeas corpus") == []
+    assert extract_snippets("", "bail") == []
+
+
+def test_normalize_query_collapses_whitespace_only():
+    assert normalize_query("  Breach \n of\tContract ") == "Breach of Contract"
+    assert normalize_query(None) == ""
@@ -1,5 +1,10 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
 from dotenv import load_dotenv
 
@@ -7,40 +12,99 @@ load_dotenv()
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 
+# Keep-alive connections kept open to the API (also caps concurrent fan-out)
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+
+# Seconds a successful health check is trusted before the API is asked again
+HEALTH_CHECK_TTL = float(os.getenv("API_HEALTH_TTL", "30"))
+
+# This module is imported once per Streamlit server process (pages are
+# re-executed on every rerun, imports are not), so the session, its
+# connection pool and the health cache live across reruns and users.
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="api-fanout")
+
+_health_lock = threading.Lock()
+_health_checked_at = None  # monotonic time of the last successful check
+
+
 def check_backend_health():
-    """Checks if the backend API is running."""
+    """
+    Checks if the backend API is running. Only successes are cached, so an
+    API coming back up is noticed on the very next rerun.
+    """
+    global _health_checked_at
+
+    with _health_lock:
+        if _health_checked_at is not None and time.monotonic() - _health_checked_at < HEALTH_CHECK_TTL:
+            return True
+
     try:
-        response = requests.get(f"{API_BASE_URL}/", timeout=5)
-        return response.status_code == 200
+        response = _session.get(f"{API_BASE_URL}/", timeout=5)
+        healthy = response.status_code == 200
     except (requests.exceptions.ConnectionError, requests.exceptions.ReadTimeout):
-        return False
+        healthy = False
+
+    with _health_lock:
+        _health_checked_at = time.monotonic() if healthy else None
+    return healthy
 
-def search_cases(query_text: str):
+def _post_search(query_text, snippets=0):
+    """Raw /search call; raises on failure (safe to run in worker threads)."""
+    response = _session.post(
+        f"{API_BASE_URL}/search",
+        json={"query": query_text, "snippets": snippets},
+        timeout=120  # Search might take time (increased for slow hardware/cold start)
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Search API Error: {response.text}")
+    return response.json()
+
+def search_cases(query_text: str, snippets: int = 0):
     """
     Calls the backend /search endpoint.
+    With `snippets` > 0 each result carries its best-matching passages.
     """
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/search", 
-            json={"query": query_text},
-            timeout=120  # Search might take time (increased for slow hardware/cold start)
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error(f"Search API Error: {response.text}")
-            return []
+        return _post_search(query_text, snippets)
+    except RuntimeError as e:
+        st.error(str(e))
+        return []
     except Exception as e:
         st.error(f"Failed to connect to Search API: {str(e)}")
         return []
 
+def search_cases_many(query_texts, snippets: int = 0):
+    """
+    Runs several /search calls concurrently over the pooled connections.
+    Returns one result list per query, in order ([] for failed queries).
+    """
+    futures = [_executor.submit(_post_search, q, snippets) for q in query_texts]
+
+    results, errors = [], []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            errors.append(str(e))
+            results.append([])
+
+    # Streamlit calls must come from the script thread, not the workers
+    if errors:
+        st.error(f"{len(errors)} of {len(futures)} searches failed: {errors[0]}")
+    return results
+
 def fetch_random_cases(limit: int = 10):
     """
     Calls the backend /cases/random endpoint.
     """
     try:
-        response = requests.get(
-            f"{API_BASE_URL}/cases/random", 
+        response = _session.get(
+            f"{API_BASE_URL}/cases/random",
             params={"limit": limit},
             timeout=10
         )
@@ -58,7 +122,7 @@ def fetch_case_details(case_id: str):
     Calls the backend /cases/{case_id} endpoint.
     """
     try:
-        response = requests.get(
+        response = _session.get(
             f"{API_BASE_URL}/cases/{case_id}",
             timeout=5
         )
@@ -73,3 +137,27 @@ def fetch_case_details(case_id: str):
     except Exception as e:
         st.error(f"Failed to fetch case details: {str(e)}")
         return None
+
+def fetch_similarity_graph(case_ids, k_neighbors: int = 3, threshold=None):
+    """
+    Calls the backend /graph endpoint for true pairwise similarities.
+    Returns {"nodes": [...], "edges": [...]} or None on failure.
+    """
+    try:
+        response = _session.post(
+            f"{API_BASE_URL}/graph",
+            json={
+                "case_ids": list(case_ids),
+                "k_neighbors": k_neighbors,
+                "threshold": threshold,
+            },
+            timeout=30
+        )
+        if response.status_code == 200:
+            return response.json()
+        else:
+            st.error(f"Graph API Error: {response.text}")
+            return None
+    except Exception as e:
+        st.error(f"Failed to fetch similarity graph: {str(e)}")
+        return None
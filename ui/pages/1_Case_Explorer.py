@@ -70,11 +70,17 @@ def get_random_cases_cached(limit=10):
     return api.fetch_random_cases(limit)
 
 @st.cache_data(ttl=300)
-def get_similar_cases_cached(text, ignore_id):
-    results = api.search_cases(text)
-    # Filter self and return top 5
-    filtered = [r for r in results if str(r.get('case_id')) != str(ignore_id)]
-    return filtered[:5]
+def get_similar_cases_cached(cases):
+    """
+    cases: tuple of (case_id, text). All searches run concurrently, so the
+    page waits for the slowest search instead of the sum of all of them.
+    Returns case_id -> top 5 similar cases (self excluded).
+    """
+    results = api.search_cases_many([text for _, text in cases])
+    return {
+        case_id: [r for r in found if str(r.get('case_id')) != str(case_id)][:5]
+        for (case_id, _), found in zip(cases, results)
+    }
 
 @st.cache_data(ttl=300)
 def get_case_details_cached(case_id):
@@ -156,6 +162,10 @@ else:
     if not random_cases:
         st.warning("No cases loaded. Check API connection.")
     else:
+        similar_by_case = get_similar_cases_cached(
+            tuple((case.get("case_id"), case.get("text")) for case in random_cases)
+        )
+
         cols = st.columns(2)
         
         for idx, case in enumerate(random_cases):
@@ -167,7 +177,8 @@ else:
             decision_label = decision if decision else "Unknown"
             badge_color = "#2ecc71" if decision_label.lower() == "accepted" else ("#e74c3c" if decision_label.lower() == "rejected" else "#95a5a6")
             
-            display_summary = text[:350] + "..." if len(text) > 350 else text
+            # Precomputed at ingestion; rows not yet backfilled fall back to truncation
+            display_summary = case.get("summary") or (text[:350] + "..." if len(text) > 350 else text)
 
             with col:
                 st.markdown(f"""
@@ -185,7 +196,7 @@ else:
                 
                 # Fetch similar cases automatically (cached)
                 # Displayed outside the expander now
-                similar_cases = get_similar_cases_cached(text, case_id)
+                similar_cases = similar_by_case.get(case_id, [])
                 
                 st.markdown("<b>🔗 Similar Cases</b>", unsafe_allow_html=True)
                 
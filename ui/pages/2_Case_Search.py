@@ -66,7 +66,7 @@ if submit_button:
     else:
         with st.spinner("Searching similar cases..."):
             # Call API instead of local pipeline
-            results = api.search_cases(current_query)
+            results = api.search_cases(current_query, snippets=3)
 
         st.session_state["search_results"] = results
         if results:
@@ -146,16 +146,28 @@ if results:
                     else:
                         st.info("Score breakdown not available.")
 
+                query_str = st.session_state.get("query_text", "")
+
+                snippets = r.get("snippets") or []
+                if snippets:
+                    st.markdown("**Best Matching Passages:**")
+                    for snip in snippets:
+                        st.markdown(
+                            f"<div style='background-color:rgba(255,255,255,0.05); padding:10px; border-radius:5px; margin-bottom:6px;'>… {highlight_text(snip['text'], query_str)} …</div>",
+                            unsafe_allow_html=True
+                        )
+
                 with st.expander("📖 Read Full Case"):
                     if r.get("decision_reason"):
                         st.markdown("**Reasoning (Expert Summary):**")
                         st.success(r["decision_reason"])
 
-                    st.markdown("**Full Case Judgment:**")
-                    full_text = r.get("full_text", "N/A")
-                    query_str = st.session_state.get("query_text", "")
-                    highlighted = highlight_text(full_text, query_str)
-                    st.markdown(f"<div style='background-color:rgba(255,255,255,0.05); padding:15px; border-radius:5px;'>{highlighted}</div>", unsafe_allow_html=True)
+                    # Highlighting a whole judgment is only done on demand
+                    if st.checkbox("Show full judgment", key=f"full_{r['case_id']}"):
+                        st.markdown("**Full Case Judgment:**")
+                        full_text = r.get("full_text", "N/A")
+                        highlighted = highlight_text(full_text, query_str)
+                        st.markdown(f"<div style='background-color:rgba(255,255,255,0.05); padding:15px; border-radius:5px;'>{highlighted}</div>", unsafe_allow_html=True)
                 
                 st.divider()
 
@@ -198,22 +210,16 @@ if results:
                     font={'size': 14, 'face': 'Inter'}
                 )
 
-            # Add edges (mesh)
-            for i in range(len(filtered_results)):
-                for j in range(i + 1, len(filtered_results)):
-                    r1 = filtered_results[i]
-                    r2 = filtered_results[j]
-                    s1 = r1.get('embed_score', 0)
-                    s2 = r2.get('embed_score', 0)
-                    avg_sim = (s1 + s2) / 2
-                    
-                    net.add_edge(
-                        r1["case_id"],
-                        r2["case_id"],
-                        value=1,
-                        title=f"Similarity Score: {round(avg_sim * 100, 1)}%",
-                        color="rgba(255, 255, 255, 0.15)"
-                    )
+            # Add edges (true pairwise cosine similarity, computed server-side)
+            graph = api.fetch_similarity_graph(case_ids, k_neighbors=3)
+            for edge in (graph or {}).get("edges", []):
+                net.add_edge(
+                    edge["source"],
+                    edge["target"],
+                    value=edge["weight"],
+                    title=f"Similarity Score: {round(edge['weight'] * 100, 1)}%",
+                    color="rgba(255, 255, 255, 0.15)"
+                )
 
             # Render Graph
             with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp:
@@ -265,14 +271,16 @@ if results:
 
             with c2:
                 st.markdown("#### 📜 Full Judgment Text")
-                
-                query = st.session_state.get("query_text", "")
-                formatted_text = highlight_text(selected_case.get("full_text", ""), query)
 
-                st.markdown(
-                    f"<div style='height: 500px; overflow-y: auto; background-color: #1e1e1e; padding: 20px; border-radius: 8px; border: 1px solid #333; color: #ddd; line-height: 1.6;'>{formatted_text}</div>", 
-                    unsafe_allow_html=True
-                )
+                # Highlighting a whole judgment is only done on demand
+                if st.checkbox("Show full judgment", key=f"graph_full_{selected_case_id}"):
+                    query = st.session_state.get("query_text", "")
+                    formatted_text = highlight_text(selected_case.get("full_text", ""), query)
+
+                    st.markdown(
+                        f"<div style='height: 500px; overflow-y: auto; background-color: #1e1e1e; padding: 20px; border-radius: 8px; border: 1px solid #333; color: #ddd; line-height: 1.6;'>{formatted_text}</div>", 
+                        unsafe_allow_html=True
+                    )
 
 # --------------------------------------------------
 # Clear results
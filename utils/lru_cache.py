@@ -0,0 +1,44 @@
+import threading
+from collections import OrderedDict
+
+from utils.metrics import record_cache_lookup
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU map. Lookups are counted under `name` for the
+    cache hit-ratio gauge on /metrics. maxsize <= 0 disables the cache.
+    """
+
+    def __init__(self, maxsize, name):
+        self.maxsize = maxsize
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value or None."""
+        if self.maxsize <= 0:
+            return None
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+        record_cache_lookup(self.name, value is not None)
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,187 @@
+import bisect
+import contextlib
+import threading
+import time
+
+# --------------------------------------------------
+# Minimal in-process Prometheus-style metrics
+# --------------------------------------------------
+# Latency buckets in seconds (upper bounds, +Inf is implicit)
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.extend(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        return self._values.get(key, 0)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}{labels} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket_counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = sorted(
+                (k, (list(v[0]), v[1], v[2])) for k, v in self._series.items()
+            )
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.label_names, key, [("le", le)])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# --------------------------------------------------
+# Metric definitions
+# --------------------------------------------------
+STAGE_SECONDS = Histogram(
+    "case_search_stage_seconds",
+    "Time spent in each search pipeline stage.",
+    ["stage"],
+)
+
+REQUEST_SECONDS = Histogram(
+    "case_search_request_seconds",
+    "End-to-end HTTP request latency.",
+    ["method", "route", "status"],
+)
+
+REQUESTS_TOTAL = Counter(
+    "case_search_requests_total",
+    "HTTP requests served.",
+    ["method", "route", "status"],
+)
+
+CACHE_LOOKUPS = Counter(
+    "case_search_cache_lookups_total",
+    "Cache lookups by cache name and outcome (hit / miss).",
+    ["cache", "result"],
+)
+
+_ALL_METRICS = [STAGE_SECONDS, REQUEST_SECONDS, REQUESTS_TOTAL, CACHE_LOOKUPS]
+
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+@contextlib.contextmanager
+def timed(stage, timings=None):
+    """
+    Times a pipeline stage: always feeds the stage histogram and,
+    when a dict is passed, accumulates the duration (ms) into it.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = round(
+                timings.get(stage, 0.0) + elapsed * 1000, 3
+            )
+
+
+def record_cache_lookup(cache, hit):
+    """Counts a cache hit or miss for the hit-ratio gauge."""
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def register(metric):
+    """Adds a metric defined elsewhere to the /metrics output."""
+    _ALL_METRICS.append(metric)
+    return metric
+
+
+def _render_cache_ratios():
+    with CACHE_LOOKUPS._lock:
+        caches = sorted({key[0] for key in CACHE_LOOKUPS._values})
+    lines = [
+        "# HELP case_search_cache_hit_ratio Cache hits / lookups since start.",
+        "# TYPE case_search_cache_hit_ratio gauge",
+    ]
+    for cache in caches:
+        hits = CACHE_LOOKUPS.get(cache=cache, result="hit")
+        misses = CACHE_LOOKUPS.get(cache=cache, result="miss")
+        total = hits + misses
+        ratio = hits / total if total else 0.0
+        lines.append(f'case_search_cache_hit_ratio{{cache="{cache}"}} {ratio:.6f}')
+    return lines
+
+
+def render_metrics():
+    """Renders every metric in Prometheus text exposition format."""
+    lines = []
+    for metric in _ALL_METRICS:
+        lines.extend(metric.render())
+    lines.extend(_render_cache_ratios())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,69 @@
+import os
+
+# --------------------------------------------------
+# Model names (single source of truth)
+# --------------------------------------------------
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+CROSS_ENCODER_MODEL_NAME = os.getenv(
+    "CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+)
+
+# When enabled, models are resolved from the local Hugging Face cache only
+# and no request is ever made to the hub. Run `python -m utils.model_loading`
+# once (online) to populate the cache before deploying.
+MODEL_OFFLINE = os.getenv("MODEL_OFFLINE", "1") == "1"
+
+
+def configure_offline_mode():
+    """
+    Forces huggingface_hub / transformers into offline mode.
+
+    Must run BEFORE sentence_transformers (and therefore huggingface_hub)
+    is imported, because the hub library reads these flags at import time.
+    """
+    if MODEL_OFFLINE:
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+
+def load_embedding_model():
+    """Loads the bi-encoder used for query and case embeddings."""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def load_cross_encoder():
+    """Loads the cross-encoder used for stage-2 reranking."""
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(CROSS_ENCODER_MODEL_NAME)
+
+
+def load_cross_tokenizer():
+    """
+    Loads only the cross-encoder's tokenizer (no weights), for
+    pre-tokenizing case texts at ingestion time.
+    """
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(CROSS_ENCODER_MODEL_NAME)
+
+
+def download_models():
+    """
+    Downloads both models into the local cache (requires network).
+    """
+    from sentence_transformers import SentenceTransformer, CrossEncoder
+
+    print(f"[INFO] Downloading {EMBEDDING_MODEL_NAME}...")
+    SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+    print(f"[INFO] Downloading {CROSS_ENCODER_MODEL_NAME}...")
+    CrossEncoder(CROSS_ENCODER_MODEL_NAME)
+
+    print("[DONE] Models cached locally.")
+
+
+if __name__ == "__main__":
+    download_models()
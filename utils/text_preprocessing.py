@@ -1,5 +1,11 @@
 import re
 import string
+import functools
+from bisect import bisect_left, bisect_right
+
+# Bump whenever clean_text() changes output, so cached embeddings of
+# cleaned text are not reused across incompatible versions.
+PREPROCESSING_VERSION = "clean_text-v1"
 
 def clean_text(text):
     """
@@ -23,31 +29,147 @@ def clean_text(text):
     
     return text
 
+def normalize_query(query):
+    """
+    Canonical form of a search query for cache keys and the query log:
+    surrounding / repeated whitespace collapsed. Case is kept (it reaches the models).
+    """
+    return " ".join((query or "").split())
+
+# Simple set of stop words to ignore (can be expanded)
+STOP_WORDS = frozenset({"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "is", "are", "was", "were", "case", "legal", "court"})
+
+HIGHLIGHT_SPAN = '<span style="background-color: #ffd700; color: black; font-weight: bold; padding: 0 2px; border-radius: 3px;">{}</span>'
+
+def query_terms(query):
+    """
+    Significant query words: longer than 3 chars, not stop words,
+    de-duplicated case-insensitively (first spelling wins).
+    """
+    seen = {}
+    for w in re.split(r'\W+', query or ""):
+        if len(w) > 3 and w.lower() not in STOP_WORDS:
+            seen.setdefault(w.lower(), w)
+    return list(seen.values())
+
+@functools.lru_cache(maxsize=256)
+def query_pattern(query):
+    """
+    One compiled, case-insensitive alternation of all query terms with word
+    boundaries (longest terms first). None if the query has no terms.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    alternation = "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
 def highlight_text(text, query):
     """
     Highlights significant words from the query within the text using HTML.
-    Simple approach: Split query into words, ignore short stop-words, and highlight matches.
+    All terms are matched in a single pass over the text.
     """
     if not text or not query:
         return text or ""
-    
-    # Simple set of stop words to ignore (can be expanded)
-    stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for", "of", "with", "by", "is", "are", "was", "were", "case", "legal", "court"}
-    
-    words = [w for w in re.split(r'\W+', query) if len(w) > 3 and w.lower() not in stop_words]
-    
-    if not words:
+
+    pattern = query_pattern(query)
+    if pattern is None:
         return text
 
-    highlighted_text = text
-    
-    for w in words:
-        # Case insensitive regex replacement with yellow background
-        pattern = re.compile(re.escape(w), re.IGNORECASE)
-        # Use a lambda to replace with the exact matching case but wrapped
-        highlighted_text = pattern.sub(
-            lambda m: f'<span style="background-color: #ffd700; color: black; font-weight: bold; padding: 0 2px; border-radius: 3px;">{m.group(0)}</span>', 
-            highlighted_text
-        )
-        
-    return highlighted_text
+    # Use a lambda to replace with the exact matching case but wrapped
+    return pattern.sub(lambda m: HIGHLIGHT_SPAN.format(m.group(0)), text)
+
+def extract_snippets(text, query, n=3, window=400):
+    """
+    Returns up to `n` non-overlapping passages (~`window` chars) with the
+    densest query-term matches, best first.
+
+    Each snippet: {"start", "end", "text", "match_count", "terms"}
+    where start/end are character offsets into `text`.
+    """
+    if not text or not query or n <= 0:
+        return []
+
+    pattern = query_pattern(query)
+    if pattern is None:
+        return []
+
+    matches = [(m.start(), m.end(), m.group(0).lower()) for m in pattern.finditer(text)]
+    if not matches:
+        return []
+    # Matches do not overlap, so both lists are sorted
+    starts = [start for start, _, _ in matches]
+    ends = [end for _, end, _ in matches]
+
+    # One candidate passage per match; each is scored on exactly the span
+    # it would return (matches lying fully inside it)
+    scored = []
+    for start, _, _ in matches:
+        # Lead in a little before the match, then snap to word boundaries
+        begin = max(0, start - window // 8)
+        end = min(len(text), begin + window)
+        if begin > 0:
+            space = text.find(" ", begin, start)
+            begin = space + 1 if space != -1 else begin
+        if end < len(text):
+            space = text.rfind(" ", begin, end)
+            end = space if space > begin else end
+
+        lo, hi = bisect_left(starts, begin), bisect_right(ends, end)
+        terms = {term for _, _, term in matches[lo:hi]}
+        # Rank by distinct terms first, then by raw density
+        scored.append((len(terms), hi - lo, -begin, begin, end, lo, hi))
+
+    scored.sort(reverse=True)
+
+    snippets = []
+    taken = []
+    for _, count, _, begin, end, lo, hi in scored:
+        if len(snippets) >= n:
+            break
+        if any(begin < t_end and t_begin < end for t_begin, t_end in taken):
+            continue
+
+        taken.append((begin, end))
+        snippets.append({
+            "start": begin,
+            "end": end,
+            "text": text[begin:end],
+            "match_count": count,
+            "terms": sorted({term for _, _, term in matches[lo:hi]}),
+        })
+
+    return snippets
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(])')
+
+def extractive_summary(text, max_sentences=3, max_chars=600):
+    """
+    Frequency-based extractive summary: the sentences whose significant
+    words are most frequent across the whole text, kept in document order
+    and capped at max_chars. Precomputed at ingestion (cases.summary).
+    """
+    if not text or not isinstance(text, str):
+        return None
+
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if len(s.strip()) > 40]
+    if not sentences:
+        return text[:max_chars].strip() or None
+
+    frequencies = {}
+    for word in clean_text(text).split():
+        if len(word) > 3 and word not in STOP_WORDS:
+            frequencies[word] = frequencies.get(word, 0) + 1
+
+    def score(sentence):
+        words = [w for w in clean_text(sentence).split() if w in frequencies]
+        return sum(frequencies[w] for w in words) / (len(words) + 5) if words else 0.0
+
+    ranked = sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True)
+    chosen = sorted(ranked[:max_sentences])
+
+    summary = " ".join(sentences[i] for i in chosen)
+    if len(summary) > max_chars:
+        cut = summary.rfind(" ", 0, max_chars)
+        summary = summary[:cut if cut > 0 else max_chars] + "..."
+    return summary